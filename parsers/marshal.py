@@ -1,15 +1,27 @@
 from abc import ABC
+import array
 import base64
-from collections import OrderedDict
-from dataclasses import dataclass, make_dataclass
+from collections import deque, OrderedDict
+from contextlib import suppress
+from dataclasses import dataclass, field, make_dataclass
 from enum import Enum
 from frozendict import frozendict
 from functools import partial
+import hashlib
+import io
+import json
 import locale
 import math
+import mmap
+import os
+import pickle
 import re
 import struct
-from typing import Any, Callable, ClassVar, get_args, Iterable, Iterator, Optional, Sequence
+import tempfile
+from typing import (
+    Any, BinaryIO, Callable, ClassVar, get_args, Iterable, Iterator, Optional, Sequence, TextIO
+)
+import weakref
 
 # handy little ruby script for testing:
 #
@@ -21,14 +33,13 @@ from typing import Any, Callable, ClassVar, get_args, Iterable, Iterator, Option
 # print ords, "\n"
 # print hexs
 
-DEBUG = True
-DEBUGLOG = None
-
-if DEBUG:
-    DEBUGLOG = open('marshal-log.txt', 'w')
-
-def debug(message: str) -> None:
-    if DEBUG: print(message, file=DEBUGLOG)
+# Diagnostics for the ordinary `Loader` (the faster loaders don't record anything). When
+# DIAGNOSTICS is on, each loader keeps its last DIAGNOSTICS_LIMIT decode events in memory, and if it
+# raises a ParseError, they're attached to the error (as `error.diagnostics`) and written to
+# DIAGNOSTICS_PATH (unless that's None). When it's off, nothing is recorded.
+DIAGNOSTICS = False
+DIAGNOSTICS_LIMIT = 1000
+DIAGNOSTICS_PATH = 'marshal-log.txt'
 
 ###################################################################################################
 # References
@@ -68,6 +79,43 @@ class MarshalRef:
 def ref(s: str) -> MarshalRef:
     return MarshalRef(MarshalRefType(s[0]), int(s[1:]))
 
+# A more compact alternative to `MarshalRef`, used by `CompactMarshalGraph`: the ref is packed into
+# an int, with the index shifted left by two bits and the low two bits identifying the ref type
+# (0 for values, 1 for symbols, 2 for objects). The `type_` and `index` attributes work the same as
+# for `MarshalRef`.
+
+REF_TYPE_TAGS = {MarshalRefType.VALUE: 0, MarshalRefType.SYMBOL: 1, MarshalRefType.OBJECT: 2}
+REF_TYPES_BY_TAG = list(REF_TYPE_TAGS)
+
+class TaggedRef(int):
+    """
+    >>> r = TaggedRef.pack(ref('O3'))
+    >>> int(r), r.type_, r.index
+    (14, <MarshalRefType.OBJECT: 'O'>, 3)
+    >>> r
+    ref('O3')
+    """
+    __slots__ = ()
+
+    @classmethod
+    def pack(cls, ref: 'MarshalRef | TaggedRef') -> 'TaggedRef':
+        if isinstance(ref, TaggedRef): return ref
+        return cls(ref.index << 2 | REF_TYPE_TAGS[ref.type_])
+
+    @property
+    def type_(self) -> MarshalRefType:
+        return REF_TYPES_BY_TAG[self & 3]
+
+    @property
+    def index(self) -> int:
+        return self >> 2
+
+    def __str__(self):
+        return f'{self.type_.value}{self.index}'
+
+    def __repr__(self):
+        return f'ref({repr(str(self))})'
+
 ###################################################################################################
 # Vertices
 ###################################################################################################
@@ -196,9 +244,14 @@ class MarshalExtensibleVertex(MarshalVertex, ABC):
             #assert isinstance(module, RubySymbol) # for mypy
             #yield module    
 
+# The content of strings and user data may be a memoryview (a slice of the loader's input) rather
+# than a bytes object, if the data was loaded in zero-copy mode. To decode such content, use
+# `str(content, encoding)` or `bytes(content)` rather than calling `content.decode(encoding)`.
+ByteContent = bytes | memoryview
+
 @dataclass(frozen=True, eq=False)
 class RubyString(MarshalExtensibleVertex):
-    value: bytes
+    value: ByteContent
 
 @dataclass(frozen=True, eq=False)
 class RubyRegex(MarshalExtensibleVertex):
@@ -249,7 +302,7 @@ class MarshalUserObject(MarshalExtensibleVertex):
 @dataclass(frozen=True, eq=False)
 class MarshalUserData(MarshalExtensibleVertex):
     cls: MarshalRef # should have type_ == MarshalRefType.SYMBOL
-    data: bytes
+    data: ByteContent
 
 def vertex_ref_type(vertex: MarshalVertex) -> MarshalRefType:
     if isinstance(vertex, RubySymbol):
@@ -282,9 +335,17 @@ class MarshalGraph:
     # This dictionary is used for mapping vertices to references.
     refs: dict[MarshalVertex, MarshalRef]
 
+    # Caches for `get_symbol` and `get_string`, mapping the indices of symbols and string objects to
+    # their decoded values. The same few symbols (instance variable names, mostly) get looked up
+    # over and over again, so it's worth only decoding each of them once.
+    symbol_names: dict[int, str] = field(compare=False, repr=False)
+    strings: dict[int, str] = field(compare=False, repr=False)
+
     def __init__(self):
         self.vertices = {ref_type: [] for ref_type in MarshalRefType}
         self.refs = {}
+        self.symbol_names = {}
+        self.strings = {}
 
     def __getitem__(self, ref: MarshalRef) -> Optional[MarshalVertex]:
         return self.vertices[ref.type_][ref.index]
@@ -301,6 +362,11 @@ class MarshalGraph:
         if old_vertex is not None: del self.refs[old_vertex]
         self.refs[vertex] = ref
 
+        if ref_type == MarshalRefType.SYMBOL:
+            self.symbol_names.pop(index, None)
+        elif ref_type == MarshalRefType.OBJECT:
+            self.strings.pop(index, None)
+
     def add(self, vertex: Optional[MarshalVertex]) -> MarshalRef:
         """Add a vertex to the graph.
 
@@ -350,6 +416,200 @@ class MarshalGraph:
 
         return res
 
+    def __getstate__(self) -> dict[str, Any]:
+        # the caches are easily rebuilt, so they're left out
+        state = self.__dict__.copy()
+        del state['symbol_names']
+        del state['strings']
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.symbol_names = {}
+        self.strings = {}
+
+class LazyMarshalGraph(MarshalGraph):
+    """A graph whose object vertices are only decoded when they are first looked up.
+
+    This is produced by `LazyLoader`. Values and symbols are decoded up front, as are the leaf
+    objects that are cheap to decode (floats, bignums, regexes and class/module refs), but for
+    strings, arrays, hashes, regular objects, structs, wrappers and user data only the offset in
+    the data is recorded. Until an object is decoded, its entry in `self.objects` is None and it
+    has no entry in `self.refs`, so lookups should go through `graph[ref]` rather than the lists.
+    """
+
+    data: Sequence[int]
+
+    # Maps the index of each object which hasn't been decoded yet to the offset of its encoding
+    # (including any "I" or "e" wrappers around it).
+    offsets: dict[int, int]
+
+    # Maps the offset of the encoding of each object (again including wrappers; an object may
+    # appear more than once, if it is wrapped) to its index and the offset just after its encoding.
+    # This is what allows decoding to skip over the encodings of nested objects.
+    spans: dict[int, tuple[int, int]]
+
+    zero_copy: bool
+
+    def __init__(self, data: Sequence[int], *, zero_copy: bool=False):
+        super().__init__()
+        self.data = data
+        self.offsets = {}
+        self.spans = {}
+        self.zero_copy = zero_copy
+
+    def __getitem__(self, ref: MarshalRef) -> Optional[MarshalVertex]:
+        vertex = self.vertices[ref.type_][ref.index]
+
+        if vertex is None and ref.type_ == MarshalRefType.OBJECT and ref.index in self.offsets:
+            vertex = self.decode(ref.index)
+
+        return vertex
+
+    def decode(self, index: int) -> MarshalVertex:
+        decoder = LazyDecoder(self, index)
+        decoder.HANDLERS[decoder.read_byte()](decoder)
+        del self.offsets[index]
+        return self.objects[index]
+
+    def decode_all(self) -> None:
+        for index in list(self.offsets):
+            if index in self.offsets:
+                self.decode(index)
+
+class CompactMarshalGraph(MarshalGraph):
+    """A read-only graph which stores its objects in flat arrays rather than as vertex objects.
+
+    This is produced by `CompactLoader`. Values and symbols are stored in the same way as in an
+    ordinary `MarshalGraph` (there are few of them, since they're deduplicated), but for each
+    object only a type code byte, a payload (for leaf objects; None otherwise) and ranges into a
+    shared array of child refs are stored. Refs are `TaggedRef`s, which are stored in the child
+    array as plain 64-bit ints.
+
+    Looking up an object with `graph[ref]` constructs an ordinary vertex for it on the fly, so all
+    of the `get_*` functions work as usual, but the vertex isn't kept: the idea is that most
+    objects are only looked at once, so there's no point in keeping millions of vertices alive.
+
+    The children of each object are stored as follows (where "pairs" means keys and values
+    alternately):
+
+      - arrays: the items
+      - hashes: the pairs, followed by the default value if the type code is "}"
+      - regular objects: the class name, followed by the instance variable pairs
+      - structs: the struct name, followed by the member pairs
+      - wrappers (user builtins, user objects and wrapped pointers): the class name, followed by
+        the wrapped object
+      - user data: the class name
+
+    Instance variables attached via "I" are stored as pairs in a separate range.
+    """
+
+    kinds: bytearray
+    child_starts: array.array
+    child_ends: array.array
+    inst_var_starts: array.array
+    inst_var_ends: array.array
+    children: array.array
+    payloads: list[Any]
+    module_exts: dict[int, list[int]]
+
+    # the same lists as `self.values` and `self.symbols`, kept here to save a lookup
+    value_list: list[MarshalVertex]
+    symbol_list: list[MarshalVertex]
+
+    def __init__(self):
+        super().__init__()
+        self.value_list = self.values
+        self.symbol_list = self.symbols
+        self.kinds = bytearray()
+        self.child_starts = array.array('L')
+        self.child_ends = array.array('L')
+        self.inst_var_starts = array.array('L')
+        self.inst_var_ends = array.array('L')
+        self.children = array.array('q')
+        self.payloads = []
+        self.module_exts = {}
+
+    @property
+    def object_count(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, ref: MarshalRef | TaggedRef) -> Optional[MarshalVertex]:
+        if type(ref) is not TaggedRef:
+            ref = TaggedRef.pack(ref)
+
+        tag = ref & 3
+        index = ref >> 2
+        if tag == 0: return self.value_list[index]
+        if tag == 1: return self.symbol_list[index]
+
+        kind = self.kinds[index]
+        if kind == 0: return None # still under construction
+        children = list(map(TaggedRef, self.children[self.child_starts[index]:self.child_ends[index]]))
+        inst_vars = self.pairs(self.inst_var_starts[index], self.inst_var_ends[index])
+        module_ext = list(map(TaggedRef, self.module_exts.get(index, ())))
+        payload = self.payloads[index]
+
+        match chr(kind):
+            case '"': return RubyString(inst_vars, module_ext, payload)
+            case '/': return RubyRegex(inst_vars, module_ext, *payload)
+            case '[': return MarshalArray(inst_vars, module_ext, children)
+            case '{': return MarshalHash(inst_vars, module_ext, list(zip(children[::2], children[1::2])), None)
+
+            case '}':
+                pairs = list(zip(children[:-1:2], children[1:-1:2]))
+                return MarshalHash(inst_vars, module_ext, pairs, children[-1])
+
+            case 'o':
+                pairs = list(zip(children[1::2], children[2::2]))
+                return MarshalRegObj(pairs + inst_vars, module_ext, children[0])
+
+            case 'S':
+                pairs = list(zip(children[1::2], children[2::2]))
+                return MarshalStruct(inst_vars, module_ext, children[0], pairs)
+
+            case 'C': return MarshalUserBuiltin(inst_vars, module_ext, *children)
+            case 'd': return MarshalWrappedExtPtr(inst_vars, module_ext, *children)
+            case 'U': return MarshalUserObject(inst_vars, module_ext, *children)
+            case 'u': return MarshalUserData(inst_vars, module_ext, children[0], payload)
+            case 'l': return RubyBignum(payload)
+            case 'f': return RubyFloat(payload)
+            case 'c': return RubyClassRef(payload)
+            case 'm': return RubyModuleRef(payload)
+            case 'M': return RubyClassOrModuleRef(payload)
+
+        raise ValueError(f'unknown object kind "{chr(kind)}" at {ref}')
+
+    def pairs(self, start: int, end: int) -> list[tuple[TaggedRef, TaggedRef]]:
+        if start == end: return []
+        items = list(map(TaggedRef, self.children[start:end]))
+        return list(zip(items[::2], items[1::2]))
+
+    def __setitem__(self, ref: MarshalRef, vertex: MarshalVertex) -> None:
+        raise TypeError('CompactMarshalGraph is read-only')
+
+    def add(self, vertex: Optional[MarshalVertex]) -> MarshalRef:
+        # only used by CompactLoader, for values and symbols
+        if vertex is None or vertex_ref_type(vertex) == MarshalRefType.OBJECT:
+            raise TypeError('objects cannot be added to a CompactMarshalGraph via add()')
+
+        return super().add(vertex)
+
+    def root_ref(self) -> TaggedRef:
+        if self.object_count: return TaggedRef(2)
+        return TaggedRef.pack(super().root_ref())
+
+    def __getstate__(self) -> dict[str, Any]:
+        # memoryviews can't be pickled, so zero-copy content has to be copied out
+        state = super().__getstate__()
+
+        state['payloads'] = [
+            bytes(payload) if isinstance(payload, memoryview) else payload
+            for payload in self.payloads
+        ]
+
+        return state
+
 @dataclass
 class MarshalFile:
     """The parsed result of a call to Ruby's `Marshal.dump` function.
@@ -390,39 +650,75 @@ class MarshalFile:
 ###################################################################################################
 
 class ParseError(Exception):
+    diagnostics: list[str] # see `FlightRecorder`
+
     def __init__(self, offset: int, message: str) -> None:
         super().__init__(f'offset {hex(offset)}: {message}')
+        self.diagnostics = []
+
+class FlightRecorder:
+    """A ring buffer of the last few things a `Loader` did, for working out what went wrong when it
+    fails to parse something.
+
+    To keep recording cheap, events are stored unformatted (as an offset, a format string and the
+    arguments for it) and only formatted if the buffer is dumped.
+
+    >>> recorder = FlightRecorder(2)
+    >>> for offset in range(3): recorder.record(offset, 'event {}', (offset,))
+    >>> list(recorder.format(bytes(range(10))))
+    ['0x1 [00 01 02 03 04 05...]: event 1', '0x2 [00 01 02 03 04 05 06...]: event 2']
+    """
+
+    events: deque[tuple[int, str, tuple[Any, ...]]]
+
+    def __init__(self, limit: int) -> None:
+        self.events = deque(maxlen=limit)
+
+    def record(self, offset: int, message: str, args: tuple[Any, ...]) -> None:
+        self.events.append((offset, message, args))
+
+    def format(self, data: Sequence[int]) -> Iterator[str]:
+        for offset, message, args in self.events:
+            segment = ' '.join(f'{byte:02x}' for byte in data[max(0, offset - 5):offset + 5])
+            if offset > 5: segment = '...' + segment
+            if offset < len(data) - 5: segment += '...'
+            yield f'{hex(offset)} [{segment}]: {message.format(*args)}'
+
+    def dump(self, data: Sequence[int], error: ParseError) -> None:
+        error.diagnostics = list(self.format(data))
+
+        if DIAGNOSTICS_PATH is not None:
+            with open(DIAGNOSTICS_PATH, 'w', encoding='utf-8') as f:
+                for line in error.diagnostics: print(line, file=f)
+                print(f'error: {error}', file=f)
 
 class Loader:
     data: Sequence[int]
     offset: int
     graph: MarshalGraph
+    recorder: Optional[FlightRecorder]
 
     def __init__(self, data: Sequence[int]) -> None:
         self.data = data
         self.offset = 0
         self.graph = MarshalGraph()
+        self.recorder = FlightRecorder(DIAGNOSTICS_LIMIT) if DIAGNOSTICS else None
 
     @property
     def done(self):
         return self.offset >= len(self.data)
 
     def error(self, message: str) -> None:
-        raise ParseError(self.offset, message) from None
+        error = ParseError(self.offset, message)
+        if self.recorder is not None: self.recorder.dump(self.data, error)
+        raise error from None
         
     def warning(self, message: str) -> None:
         print(f'WARNING: {hex(self.offset)}: {message}')
 
-    def debug(self, message: str) -> None:
-        if DEBUG:
-            segment = ' '.join(
-                hex(byte)[2:].zfill(2)
-                for byte in self.data[max(0, self.offset - 5):self.offset + 5]
-            )
-
-            if self.offset > 5: segment = '...' + segment
-            if self.offset < len(self.data) - 5: segment += '...' 
-            print(f'{hex(self.offset)} [{segment}]: {message}', file=DEBUGLOG)
+    def debug(self, message: str, *args: Any) -> None:
+        # `message` is a format string for `args`; it's only formatted if the recorder is dumped
+        if self.recorder is not None: self.recorder.record(self.offset, message, args)
 
     def load(self) -> MarshalFile:
         self.debug('begin load')
@@ -635,6 +931,25 @@ class Loader:
 
     REGEX_OPTIONS_TABLE: ClassVar[list[re.RegexFlag]] = [re.I, re.X, re.M]
 
+    def read_bignum(self) -> int:
+        """Read the sign and magnitude of a bignum (i.e. what follows the "l" type code).
+
+        The magnitude is stored unsigned, as a sequence of little-endian 16-bit words, so a top
+        byte with its high bit set doesn't make the value negative; only the sign byte does.
+
+        >>> Loader([43, 6, 1, 0]).read_bignum() # '+', 1 word
+        1
+        >>> Loader([43, 6, 0, 128]).read_bignum()
+        32768
+        >>> Loader([45, 7, 0, 0, 0, 128]).read_bignum() # '-', 2 words
+        -2147483648
+        >>> Loader([43, 7, 255, 255, 255, 255]).read_bignum()
+        4294967295
+        """
+        sign = {'+': 1, '-': -1}[chr(self.read_byte())]
+        word_length = self.read_long()
+        return sign * int.from_bytes(self.read_bytes(word_length * 2), 'little')
+
     def read_regex_options(self) -> set[re.RegexFlag]:
         bits = self.read_byte()
         res = set()
@@ -707,7 +1022,7 @@ class Loader:
 
     def load_hash_items(self, *, symbol_keys=False) -> list[tuple[MarshalRef, MarshalRef]]:
         length = self.read_long()
-        self.debug(f'list of pairs of length {length}')
+        self.debug('list of pairs of length {}', length)
         items = []
 
         for _ in range(length):
@@ -725,54 +1040,49 @@ class Loader:
         if type_code == ';':
             index = self.read_long()
             ref = MarshalRef(MarshalRefType.SYMBOL, index)
-            self.debug(f'-> {ref}: {self.graph[ref]}')
+            self.debug('-> {}: {}', ref, self.graph[ref])
             return ref
         
         if type_code == '@':
             index = self.read_long()
             ref = MarshalRef(MarshalRefType.OBJECT, index)
-            self.debug(f'-> {ref}: {self.graph[ref]}')
+            self.debug('-> {}: {}', ref, self.graph[ref])
             return ref
 
         try: vertex = {'T': RUBY_TRUE, 'F': RUBY_FALSE, '0': RUBY_NIL}[type_code]
         except KeyError: pass
         else:
             ref = self.graph.add(vertex)
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
 
         if type_code == 'i':
             ref = self.graph.add(RubyFixnum(self.read_long()))
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
 
         if type_code == 'l':
-            sign = {'+': 1, '-': -1}[chr(self.read_byte())]
-            word_length = self.read_long()
-            
-            ref = self.graph.add(RubyBignum(sign * int.from_bytes(
-                self.read_bytes(word_length * 2), 'little', signed=True
-            )))
+            ref = self.graph.add(RubyBignum(self.read_bignum()))
 
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
 
         if type_code == 'f':
             ref = self.graph.add(RubyFloat(self.read_float()))
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
 
         if type_code == '"':
             bytes_ = self.read_byte_seq()
             ref = self.graph.add(RubyString([], [], bytes_))
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
 
         if type_code == '/':
             source = self.read_byte_seq()
             options = self.read_regex_options()
             ref = self.graph.add(RubyRegex([], [], source, options))
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
 
         try:
@@ -784,7 +1094,7 @@ class Loader:
         else:
             name = self.read_byte_seq()
             ref = self.graph.add(vertex_type(name))
-            self.debug(f'{ref}: {self.graph[ref]}')
+            self.debug('{}: {}', ref, self.graph[ref])
             return ref
             
         if type_code == 'I':
@@ -819,30 +1129,30 @@ class Loader:
             return ref
 
         ref = self.graph.add(None)
-        self.debug(f'{ref} begin')
+        self.debug('{} begin', ref)
 
         if type_code == '[':
             length = self.read_long()
-            self.debug(f'array of length {length}')
+            self.debug('array of length {}', length)
             items = [self.load_object() for _ in range(length)]
             self.graph[ref] = MarshalArray([], [], items)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
 
         if type_code == '{':
             self.debug('hash without default')
             pairs = self.load_hash_items()
             self.graph[ref] = MarshalHash([], [], pairs, None)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
 
         if type_code == '}':
             self.debug('hash with default')
             pairs = self.load_hash_items()
-            self.debug(f'default for {ref}')
+            self.debug('default for {}', ref)
             default = self.load_object()
             self.graph[ref] = MarshalHash([], [], pairs, default)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
         
         if type_code == 'o':
@@ -850,7 +1160,7 @@ class Loader:
             cls_ref = self.load_symbol()
             inst_vars = self.load_vars()
             self.graph[ref] = MarshalRegObj(inst_vars, [], cls_ref)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
         
         if type_code == 'S':
@@ -858,7 +1168,7 @@ class Loader:
             name_ref = self.load_symbol()
             members = self.load_vars()
             self.graph[ref] = MarshalStruct([], [], name_ref, members)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
             
         try:
@@ -868,11 +1178,11 @@ class Loader:
         except KeyError:
             pass
         else:
-            self.debug(f'{vertex_type2} wrapper')
+            self.debug('{} wrapper', vertex_type2)
             cls_ref = self.load_symbol()
             obj_ref = self.load_object()
             self.graph[ref] = vertex_type2([], [], cls_ref, obj_ref)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
             
         if type_code == 'u':
@@ -880,12 +1190,961 @@ class Loader:
             cls_ref = self.load_symbol()
             data = self.read_byte_seq()
             self.graph[ref] = MarshalUserData([], [], cls_ref, data)
-            self.debug(f'{ref} end')
+            self.debug('{} end', ref)
             return ref
 
         self.error(f'invalid type code "{type_code}"')
         assert False
 
+class FastLoader(Loader):
+    """A loader which produces the same graph as `Loader`, but is optimized for speed rather than
+    for ease of debugging.
+
+    Rather than going through the chain of conditionals in `load_object_without_type_code`, the
+    type code byte is used as an index into a precomputed table of handler methods. No debug
+    messages are produced.
+
+    If `zero_copy` is true, the content of strings and user data is not copied out of the input;
+    instead, the vertices hold memoryview slices of it. This is what `load_file` uses for
+    memory-mapped files. Symbol names are always copied.
+
+    >>> loader = FastLoader([91, 8, 105, 6, 105, 6, 64, 0])
+    >>> loader.load_object()
+    ref('O0')
+    >>> loader.graph.values
+    [RubyFixnum(value=1)]
+    >>> loader.graph.objects
+    [MarshalArray(inst_vars=[], module_ext=[], items=[ref('V0'), ref('V0'), ref('O0')])]
+    """
+
+    # Maps each type code (as a byte) to the method which handles it. Filled in below the class
+    # definition.
+    HANDLERS: ClassVar[list[Callable[['FastLoader'], MarshalRef]]]
+
+    # Refs for RubyFixnum vertices that have already been added to the graph, keyed by value. This
+    # saves us from hashing a new RubyFixnum for every fixnum we load.
+    fixnum_refs: dict[int, MarshalRef]
+
+    # Refs for symbols, keyed by index, so that symbol links don't each need a new MarshalRef.
+    symbol_refs: dict[int, MarshalRef]
+
+    zero_copy: bool
+
+    def __init__(self, data: Sequence[int], *, zero_copy: bool=False) -> None:
+        super().__init__(memoryview(data) if zero_copy else data)
+        self.fixnum_refs = {}
+        self.symbol_refs = {}
+        self.zero_copy = zero_copy
+        self.recorder = None
+
+    def debug(self, message: str, *args: Any) -> None:
+        pass
+
+    def read_byte(self) -> int:
+        offset = self.offset
+
+        try:
+            byte = self.data[offset]
+        except IndexError:
+            self.error('incomplete input')
+            assert False
+
+        self.offset = offset + 1
+        return byte
+
+    def read_long(self) -> int:
+        """
+        >>> [FastLoader(data).read_long() for data in (
+        ...     [0], [1, 255], [2, 0, 255], [4, 0, 0, 0, 255], [6], [128], [250],
+        ...     [252, 255, 255, 255, 0], [255, 0], [255, 255]
+        ... )]
+        [0, 255, 65280, 4278190080, 1, -123, -1, -4278190081, -256, -1]
+        """
+        header = self.read_byte()
+        if header == 0: return 0
+        if 5 <= header < 128: return header - 5
+        if 128 <= header <= 251: return header - 251
+        value = int.from_bytes(self.read_byte_slice(header if header < 5 else 256 - header), 'little')
+        return value if header < 5 else value - 2**(8*(256 - header))
+
+    def read_byte_slice(self, length: int) -> Sequence[int]:
+        start = self.offset
+        end = start + length
+
+        if end > len(self.data):
+            self.offset = len(self.data)
+            self.error('incomplete input')
+
+        self.offset = end
+        return self.data[start:end]
+
+    def read_bytes(self, length: int) -> Iterator[int]:
+        return iter(self.read_byte_slice(length))
+
+    def read_byte_seq(self) -> bytes:
+        return bytes(self.read_byte_slice(self.read_long()))
+
+    def read_content(self) -> ByteContent:
+        """Read a byte sequence forming the content of a string or user data vertex.
+
+        In zero-copy mode, the result is a view into the input."""
+        slice_ = self.read_byte_slice(self.read_long())
+        return slice_ if self.zero_copy else bytes(slice_)
+
+    def load_object(self) -> MarshalRef:
+        return self.HANDLERS[self.read_byte()](self)
+
+    def load_symbol(self) -> MarshalRef:
+        type_code = self.read_byte()
+
+        if type_code not in (0x3a, 0x3b): # ':', ';'
+            self.error(f'expected to be loading a symbol, but the type code is "{chr(type_code)}"')
+
+        return self.HANDLERS[type_code](self)
+
+    def load_object_without_type_code(self, type_code: str) -> MarshalRef:
+        return self.HANDLERS[ord(type_code)](self)
+
+    def load_invalid(self) -> MarshalRef:
+        self.error(f'invalid type code "{chr(self.data[self.offset - 1])}"')
+        assert False
+
+    def load_symbol_link(self) -> MarshalRef:
+        index = self.read_long()
+        ref = self.symbol_refs.get(index)
+
+        if ref is None:
+            ref = self.symbol_refs[index] = MarshalRef(MarshalRefType.SYMBOL, index)
+
+        return ref
+
+    def load_object_link(self) -> MarshalRef:
+        return MarshalRef(MarshalRefType.OBJECT, self.read_long())
+
+    def load_true(self) -> MarshalRef:
+        return self.graph.add(RUBY_TRUE)
+
+    def load_false(self) -> MarshalRef:
+        return self.graph.add(RUBY_FALSE)
+
+    def load_nil(self) -> MarshalRef:
+        return self.graph.add(RUBY_NIL)
+
+    def load_fixnum(self) -> MarshalRef:
+        value = self.read_long()
+        ref = self.fixnum_refs.get(value)
+
+        if ref is None:
+            ref = self.fixnum_refs[value] = self.graph.add(RubyFixnum(value))
+
+        return ref
+
+    def load_bignum(self) -> MarshalRef:
+        return self.graph.add(RubyBignum(self.read_bignum()))
+
+    def load_float(self) -> MarshalRef:
+        return self.graph.add(RubyFloat(self.read_float()))
+
+    def add_object(self, vertex: MarshalVertex) -> MarshalRef:
+        # equivalent to self.graph.add(vertex), for vertices that compare by identity
+        objects = self.graph.objects
+        ref = MarshalRef(MarshalRefType.OBJECT, len(objects))
+        objects.append(vertex)
+        self.graph.refs[vertex] = ref
+        return ref
+
+    def reserve_object(self) -> MarshalRef:
+        # equivalent to self.graph.add(None)
+        objects = self.graph.objects
+        ref = MarshalRef(MarshalRefType.OBJECT, len(objects))
+        objects.append(None)
+        return ref
+
+    def set_object(self, ref: MarshalRef, vertex: MarshalVertex) -> MarshalRef:
+        # equivalent to self.graph[ref] = vertex, for refs obtained from reserve_object
+        self.graph.objects[ref.index] = vertex
+        self.graph.refs[vertex] = ref
+        return ref
+
+    def load_string(self) -> MarshalRef:
+        return self.add_object(RubyString([], [], self.read_content()))
+
+    def load_regex(self) -> MarshalRef:
+        source = self.read_byte_seq()
+        options = self.read_regex_options()
+        return self.add_object(RubyRegex([], [], source, options))
+
+    def load_symbol_vertex(self) -> MarshalRef:
+        return self.graph.add(RubySymbol(self.read_byte_seq()))
+
+    def load_class_ref(self) -> MarshalRef:
+        return self.graph.add(RubyClassRef(self.read_byte_seq()))
+
+    def load_module_ref(self) -> MarshalRef:
+        return self.graph.add(RubyModuleRef(self.read_byte_seq()))
+
+    def load_class_or_module_ref(self) -> MarshalRef:
+        return self.graph.add(RubyClassOrModuleRef(self.read_byte_seq()))
+
+    def load_with_inst_vars(self) -> MarshalRef:
+        ref = self.load_object()
+        inst_vars = self.load_vars()
+        self.attach_inst_vars(ref, inst_vars)
+        return ref
+
+    def attach_inst_vars(self, ref: MarshalRef, inst_vars: list[tuple[MarshalRef, MarshalRef]]) -> None:
+        obj = self.graph[ref]
+
+        if isinstance(obj, MarshalExtensibleVertex):
+            obj.inst_vars.extend(inst_vars)
+        else:
+            self.warning(f'found instance variables attached to an object of type {type(obj)}; these will be ignored')
+
+    def load_with_module_ext(self) -> MarshalRef:
+        module_ref = self.load_symbol()
+        ref = self.load_object()
+        self.attach_module_ext(ref, module_ref)
+        return ref
+
+    def attach_module_ext(self, ref: MarshalRef, module_ref: MarshalRef) -> None:
+        obj = self.graph[ref]
+
+        if isinstance(obj, MarshalExtensibleVertex):
+            obj.module_ext.append(module_ref)
+        else:
+            self.warning(f'found object of type {type(obj)}) extended by a module; this will be ignored')
+
+    def load_hash_items(self, *, symbol_keys=False) -> list[tuple[MarshalRef, MarshalRef]]:
+        load_key = self.load_symbol if symbol_keys else self.load_object
+        load_value = self.load_object
+        return [(load_key(), load_value()) for _ in range(self.read_long())]
+
+    def load_array(self) -> MarshalRef:
+        ref = self.reserve_object()
+        load_item = self.load_object
+        items = [load_item() for _ in range(self.read_long())]
+        return self.set_object(ref, MarshalArray([], [], items))
+
+    def load_hash(self) -> MarshalRef:
+        ref = self.reserve_object()
+        pairs = self.load_hash_items()
+        return self.set_object(ref, MarshalHash([], [], pairs, None))
+
+    def load_default_hash(self) -> MarshalRef:
+        ref = self.reserve_object()
+        pairs = self.load_hash_items()
+        default = self.load_object()
+        return self.set_object(ref, MarshalHash([], [], pairs, default))
+
+    def load_reg_obj(self) -> MarshalRef:
+        ref = self.reserve_object()
+        cls_ref = self.load_symbol()
+        inst_vars = self.load_vars()
+        return self.set_object(ref, MarshalRegObj(inst_vars, [], cls_ref))
+
+    def load_struct(self) -> MarshalRef:
+        ref = self.reserve_object()
+        name_ref = self.load_symbol()
+        members = self.load_vars()
+        return self.set_object(ref, MarshalStruct([], [], name_ref, members))
+
+    def load_wrapper(self, vertex_type: type) -> MarshalRef:
+        ref = self.reserve_object()
+        cls_ref = self.load_symbol()
+        obj_ref = self.load_object()
+        return self.set_object(ref, vertex_type([], [], cls_ref, obj_ref))
+
+    def load_user_data(self) -> MarshalRef:
+        ref = self.reserve_object()
+        cls_ref = self.load_symbol()
+        data = self.read_content()
+        return self.set_object(ref, MarshalUserData([], [], cls_ref, data))
+
+FastLoader.HANDLERS = [FastLoader.load_invalid] * 256
+
+for _type_code, _handler in {
+    ';': FastLoader.load_symbol_link, '@': FastLoader.load_object_link,
+    'T': FastLoader.load_true, 'F': FastLoader.load_false, '0': FastLoader.load_nil,
+    'i': FastLoader.load_fixnum, 'l': FastLoader.load_bignum, 'f': FastLoader.load_float,
+    '"': FastLoader.load_string, '/': FastLoader.load_regex,
+    ':': FastLoader.load_symbol_vertex, 'c': FastLoader.load_class_ref,
+    'm': FastLoader.load_module_ref, 'M': FastLoader.load_class_or_module_ref,
+    'I': FastLoader.load_with_inst_vars, 'e': FastLoader.load_with_module_ext,
+    '[': FastLoader.load_array, '{': FastLoader.load_hash, '}': FastLoader.load_default_hash,
+    'o': FastLoader.load_reg_obj, 'S': FastLoader.load_struct,
+    'C': partial(FastLoader.load_wrapper, vertex_type=MarshalUserBuiltin),
+    'd': partial(FastLoader.load_wrapper, vertex_type=MarshalWrappedExtPtr),
+    'U': partial(FastLoader.load_wrapper, vertex_type=MarshalUserObject),
+    'u': FastLoader.load_user_data,
+}.items():
+    FastLoader.HANDLERS[ord(_type_code)] = _handler
+
+class LazyLoader(FastLoader):
+    """A loader which produces a `LazyMarshalGraph`.
+
+    The whole of the input still has to be scanned, since there's no way to find where an object's
+    encoding ends without parsing everything nested inside it, but no vertices are constructed for
+    the objects which are left undecoded (and their strings and user data aren't copied).
+
+    >>> graph = LazyLoader([4, 8, 91, 7, 34, 6, 97, 91, 6, 105, 6]).load().graph
+    >>> graph.objects
+    [None, None, None]
+    >>> graph[ref('O2')]
+    MarshalArray(inst_vars=[], module_ext=[], items=[ref('V0')])
+    >>> graph.objects
+    [None, None, MarshalArray(inst_vars=[], module_ext=[], items=[ref('V0')])]
+    >>> graph[ref('O0')]
+    MarshalArray(inst_vars=[], module_ext=[], items=[ref('O1'), ref('O2')])
+    >>> get_string(graph, ref('O1'))
+    'a'
+    """
+
+    graph: LazyMarshalGraph
+
+    def __init__(self, data: Sequence[int], *, zero_copy: bool=False) -> None:
+        super().__init__(data, zero_copy=zero_copy)
+        self.graph = LazyMarshalGraph(self.data, zero_copy=zero_copy)
+
+    def is_pending(self, ref: MarshalRef) -> bool:
+        return ref.type_ == MarshalRefType.OBJECT and ref.index in self.graph.offsets
+
+    def record(self, start: int, count: int, ref: MarshalRef) -> None:
+        # `count` is the number of objects there were before we started on the encoding at `start`;
+        # if `ref` is older than that, the encoding didn't allocate a new index (e.g. it was a
+        # float that had already been seen) and there's nothing to record.
+        if ref.type_ != MarshalRefType.OBJECT or ref.index < count:
+            return
+
+        self.graph.spans[start] = (ref.index, self.offset)
+
+        if ref.index in self.graph.offsets:
+            self.graph.offsets[ref.index] = start
+
+    def index_lazy(self, skip: Callable[['LazyLoader'], None]) -> MarshalRef:
+        start = self.offset - 1
+        ref = self.reserve_object()
+        self.graph.offsets[ref.index] = start
+        skip(self)
+        self.record(start, ref.index, ref)
+        return ref
+
+    def index_eager(self, handler: Callable[['LazyLoader'], MarshalRef]) -> MarshalRef:
+        start = self.offset - 1
+        count = len(self.graph.objects)
+        ref = handler(self)
+        self.record(start, count, ref)
+        return ref
+
+    def index_with_inst_vars(self) -> MarshalRef:
+        start = self.offset - 1
+        count = len(self.graph.objects)
+        ref = self.load_object()
+        inst_vars = self.load_vars()
+
+        # If the object is pending, its instance variables will be picked up when it's decoded.
+        if not self.is_pending(ref):
+            self.attach_inst_vars(ref, inst_vars)
+        elif ref.index < count:
+            self.error('instance variables attached to an object link are not supported in lazy mode')
+
+        self.record(start, count, ref)
+        return ref
+
+    def index_with_module_ext(self) -> MarshalRef:
+        start = self.offset - 1
+        count = len(self.graph.objects)
+        module_ref = self.load_symbol()
+        ref = self.load_object()
+
+        if not self.is_pending(ref):
+            self.attach_module_ext(ref, module_ref)
+        elif ref.index < count:
+            self.error('module extension of an object link is not supported in lazy mode')
+
+        self.record(start, count, ref)
+        return ref
+
+    def skip_content(self) -> None:
+        self.read_byte_slice(self.read_long())
+
+    def skip_array(self) -> None:
+        for _ in range(self.read_long()):
+            self.load_object()
+
+    def skip_hash(self) -> None:
+        for _ in range(self.read_long()):
+            self.load_object()
+            self.load_object()
+
+    def skip_default_hash(self) -> None:
+        self.skip_hash()
+        self.load_object()
+
+    def skip_vars(self) -> None:
+        self.load_symbol()
+        self.load_vars()
+
+    def skip_wrapper(self) -> None:
+        self.load_symbol()
+        self.load_object()
+
+    def skip_user_data(self) -> None:
+        self.load_symbol()
+        self.skip_content()
+
+LazyLoader.HANDLERS = FastLoader.HANDLERS.copy()
+
+for _type_code, _handler in {
+    '"': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_content),
+    '[': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_array),
+    '{': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_hash),
+    '}': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_default_hash),
+    'o': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_vars),
+    'S': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_vars),
+    'C': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_wrapper),
+    'd': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_wrapper),
+    'U': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_wrapper),
+    'u': partial(LazyLoader.index_lazy, skip=LazyLoader.skip_user_data),
+    'I': LazyLoader.index_with_inst_vars, 'e': LazyLoader.index_with_module_ext,
+}.items():
+    LazyLoader.HANDLERS[ord(_type_code)] = _handler
+
+for _type_code in 'lf/cmM':
+    LazyLoader.HANDLERS[ord(_type_code)] = partial(
+        LazyLoader.index_eager, handler=FastLoader.HANDLERS[ord(_type_code)]
+    )
+
+class LazyDecoder(FastLoader):
+    """Decodes a single object of a `LazyMarshalGraph`, given its index.
+
+    Any objects nested inside it are skipped over, using the spans recorded by `LazyLoader`. Values
+    and symbols are looked up in the graph, which already contains them all."""
+
+    index: int
+
+    def __init__(self, graph: LazyMarshalGraph, index: int) -> None:
+        super().__init__(graph.data, zero_copy=graph.zero_copy)
+        self.graph = graph
+        self.index = index
+        self.offset = graph.offsets[index]
+
+    def load_object(self) -> MarshalRef:
+        span = self.graph.spans.get(self.offset)
+
+        if span is not None and span[0] != self.index:
+            index, self.offset = span
+            return MarshalRef(MarshalRefType.OBJECT, index)
+
+        return self.HANDLERS[self.read_byte()](self)
+
+    def reserve_object(self) -> MarshalRef:
+        return MarshalRef(MarshalRefType.OBJECT, self.index)
+
+    def add_object(self, vertex: MarshalVertex) -> MarshalRef:
+        return self.set_object(self.reserve_object(), vertex)
+
+    def load_symbol_vertex(self) -> MarshalRef:
+        # the symbol was already added to the graph by the LazyLoader
+        return self.graph.refs[RubySymbol(self.read_byte_seq())]
+
+LazyDecoder.HANDLERS = FastLoader.HANDLERS.copy()
+LazyDecoder.HANDLERS[ord(':')] = LazyDecoder.load_symbol_vertex
+
+class CompactLoader(FastLoader):
+    """A loader which produces a `CompactMarshalGraph`.
+
+    The handler methods return refs as plain ints in the `TaggedRef` encoding, so that they can go
+    straight into the graph's child array.
+
+    >>> graph = CompactLoader([4, 8, 91, 7, 73, 34, 6, 97, 6, 58, 6, 69, 84, 64, 6]).load().graph
+    >>> graph.object_count
+    2
+    >>> graph[graph.root_ref()]
+    MarshalArray(inst_vars=[], module_ext=[], items=[ref('O1'), ref('O1')])
+    >>> get_array(graph, graph.root_ref(), get_string)
+    ['a', 'a']
+    """
+
+    graph: CompactMarshalGraph
+
+    # Tags for the values that have already been added to the graph, keyed by the Python value
+    # (with True, False and None keyed by the vertex, since True == 1 and False == 0).
+    value_tags: dict[Any, int]
+
+    # Tags for the leaf objects which `Loader` deduplicates (floats and class/module refs), keyed
+    # by type code and payload.
+    leaf_tags: dict[tuple[str, Any], int]
+
+    def __init__(self, data: Sequence[int], *, zero_copy: bool=False) -> None:
+        super().__init__(data, zero_copy=zero_copy)
+        self.graph = CompactMarshalGraph()
+        self.value_tags = {}
+        self.leaf_tags = {}
+
+    def load(self) -> MarshalFile:
+        major_version, minor_version = self.read_bytes(2)
+        self.load_object()
+
+        if self.done:
+            return MarshalFile(major_version, minor_version, self.graph)
+
+        self.error('parsing has finished but not all of the input was consumed')
+        assert False
+
+    def load_symbol_link(self) -> int:
+        return self.read_long() << 2 | 1
+
+    def load_object_link(self) -> int:
+        return self.read_long() << 2 | 2
+
+    def value_tag(self, key: Any, vertex: MarshalVertex) -> int:
+        tag = self.value_tags.get(key)
+
+        if tag is None:
+            tag = self.value_tags[key] = self.graph.add(vertex).index << 2
+
+        return tag
+
+    def load_true(self) -> int: return self.value_tag(RUBY_TRUE, RUBY_TRUE)
+    def load_false(self) -> int: return self.value_tag(RUBY_FALSE, RUBY_FALSE)
+    def load_nil(self) -> int: return self.value_tag(RUBY_NIL, RUBY_NIL)
+
+    def load_fixnum(self) -> int:
+        value = self.read_long()
+        tag = self.value_tags.get(value)
+
+        if tag is None:
+            tag = self.value_tags[value] = self.graph.add(RubyFixnum(value)).index << 2
+
+        return tag
+
+    def load_symbol_vertex(self) -> int:
+        return self.graph.add(RubySymbol(self.read_byte_seq())).index << 2 | 1
+
+    def reserve_object(self) -> int:
+        graph = self.graph
+        index = len(graph.kinds)
+        graph.kinds.append(0)
+        graph.child_starts.append(0)
+        graph.child_ends.append(0)
+        graph.inst_var_starts.append(0)
+        graph.inst_var_ends.append(0)
+        graph.payloads.append(None)
+        return index
+
+    def finish_object(self, index: int, type_code: str, children: Iterable[int]=(), payload: Any=None) -> int:
+        graph = self.graph
+        graph.kinds[index] = ord(type_code)
+        graph.child_starts[index] = len(graph.children)
+        graph.children.extend(children)
+        graph.child_ends[index] = len(graph.children)
+        graph.payloads[index] = payload
+        return index << 2 | 2
+
+    def add_leaf(self, type_code: str, payload: Any) -> int:
+        return self.finish_object(self.reserve_object(), type_code, payload=payload)
+
+    def add_shared_leaf(self, type_code: str, payload: Any) -> int:
+        # for the leaf objects that `MarshalGraph.add` deduplicates, because their vertices compare
+        # by value
+        key = (type_code, payload)
+        tag = self.leaf_tags.get(key)
+
+        if tag is None:
+            tag = self.leaf_tags[key] = self.add_leaf(type_code, payload)
+
+        return tag
+
+    def load_bignum(self) -> int:
+        return self.add_leaf('l', self.read_bignum())
+
+    def load_float(self) -> int:
+        return self.add_shared_leaf('f', self.read_float())
+
+    def load_string(self) -> int:
+        return self.add_leaf('"', self.read_content())
+
+    def load_regex(self) -> int:
+        source = self.read_byte_seq()
+        options = self.read_regex_options()
+        return self.add_leaf('/', (source, options))
+
+    def load_class_ref(self) -> int:
+        return self.add_shared_leaf('c', self.read_byte_seq())
+
+    def load_module_ref(self) -> int:
+        return self.add_shared_leaf('m', self.read_byte_seq())
+
+    def load_class_or_module_ref(self) -> int:
+        return self.add_shared_leaf('M', self.read_byte_seq())
+
+    def load_flat_pairs(self, *, symbol_keys=False) -> list[int]:
+        load_key = self.load_symbol if symbol_keys else self.load_object
+        load_value = self.load_object
+        items = []
+
+        for _ in range(self.read_long()):
+            items.append(load_key())
+            items.append(load_value())
+
+        return items
+
+    def load_with_inst_vars(self) -> int:
+        tag = self.load_object()
+        items = self.load_flat_pairs(symbol_keys=True)
+        graph = self.graph
+        index = tag >> 2
+
+        if tag & 3 != 2 or chr(graph.kinds[index]) in 'lfcmM':
+            self.warning(f'found instance variables attached to {TaggedRef(tag)}, which cannot have them; these will be ignored')
+            return tag
+
+        start, end = graph.inst_var_starts[index], graph.inst_var_ends[index]
+        items = [*graph.children[start:end], *items]
+        graph.inst_var_starts[index] = len(graph.children)
+        graph.children.extend(items)
+        graph.inst_var_ends[index] = len(graph.children)
+        return tag
+
+    def load_with_module_ext(self) -> int:
+        module_tag = self.load_symbol()
+        tag = self.load_object()
+
+        if tag & 3 != 2 or chr(self.graph.kinds[tag >> 2]) in 'lfcmM':
+            self.warning(f'found {TaggedRef(tag)} extended by a module, which cannot be; this will be ignored')
+            return tag
+
+        self.graph.module_exts.setdefault(tag >> 2, []).append(module_tag)
+        return tag
+
+    def load_array(self) -> int:
+        index = self.reserve_object()
+        load_item = self.load_object
+        items = [load_item() for _ in range(self.read_long())]
+        return self.finish_object(index, '[', items)
+
+    def load_hash(self) -> int:
+        index = self.reserve_object()
+        return self.finish_object(index, '{', self.load_flat_pairs())
+
+    def load_default_hash(self) -> int:
+        index = self.reserve_object()
+        items = self.load_flat_pairs()
+        items.append(self.load_object())
+        return self.finish_object(index, '}', items)
+
+    def load_reg_obj(self) -> int:
+        index = self.reserve_object()
+        cls_tag = self.load_symbol()
+        return self.finish_object(index, 'o', [cls_tag, *self.load_flat_pairs(symbol_keys=True)])
+
+    def load_struct(self) -> int:
+        index = self.reserve_object()
+        name_tag = self.load_symbol()
+        return self.finish_object(index, 'S', [name_tag, *self.load_flat_pairs(symbol_keys=True)])
+
+    def load_compact_wrapper(self, type_code: str) -> int:
+        index = self.reserve_object()
+        cls_tag = self.load_symbol()
+        obj_tag = self.load_object()
+        return self.finish_object(index, type_code, [cls_tag, obj_tag])
+
+    def load_user_data(self) -> int:
+        index = self.reserve_object()
+        cls_tag = self.load_symbol()
+        return self.finish_object(index, 'u', [cls_tag], self.read_content())
+
+CompactLoader.HANDLERS = [CompactLoader.load_invalid] * 256
+
+for _type_code, _handler in {
+    ';': CompactLoader.load_symbol_link, '@': CompactLoader.load_object_link,
+    'T': CompactLoader.load_true, 'F': CompactLoader.load_false, '0': CompactLoader.load_nil,
+    'i': CompactLoader.load_fixnum, 'l': CompactLoader.load_bignum, 'f': CompactLoader.load_float,
+    '"': CompactLoader.load_string, '/': CompactLoader.load_regex,
+    ':': CompactLoader.load_symbol_vertex, 'c': CompactLoader.load_class_ref,
+    'm': CompactLoader.load_module_ref, 'M': CompactLoader.load_class_or_module_ref,
+    'I': CompactLoader.load_with_inst_vars, 'e': CompactLoader.load_with_module_ext,
+    '[': CompactLoader.load_array, '{': CompactLoader.load_hash,
+    '}': CompactLoader.load_default_hash, 'o': CompactLoader.load_reg_obj,
+    'S': CompactLoader.load_struct, 'u': CompactLoader.load_user_data,
+    **{
+        _type_code: partial(CompactLoader.load_compact_wrapper, type_code=_type_code)
+        for _type_code in 'CdU'
+    },
+}.items():
+    CompactLoader.HANDLERS[ord(_type_code)] = _handler
+
+###################################################################################################
+# Streaming
+###################################################################################################
+
+# For consumers which only need to walk through a file once, from top to bottom, building a full
+# `MarshalGraph` is wasteful. The `EventReader` class instead yields a stream of parse events, in
+# the style of `xml.etree.ElementTree.iterparse`. Each event is a tuple `(event_type, ref, value)`:
+#
+#   - `(START, ref, compound)` and `(END, ref, compound)` enclose the contents of an array, hash,
+#     regular object, struct, user data or wrapper object. `compound` is a `Compound` describing
+#     the object. The contents of a hash are its keys and values, alternately (followed by the
+#     default value, for hashes with defaults). The contents of a regular object or struct are
+#     `NAME` events, each followed by the value of the instance variable or member. The contents of
+#     user data are a single `SCALAR` event giving the data.
+#   - `(SCALAR, ref, value)` gives a leaf value: `None`, `True`, `False`, an `int`, a `float`, a
+#     `str` (for strings, which are decoded in the same way as `get_string` does), or a vertex (for
+#     regexes and class/module refs).
+#   - `(SYMBOL, ref, name)` gives a symbol, and `(NAME, ref, name)` gives the name of an instance
+#     variable or struct member.
+#   - `(LINK, ref, compound)` is a back-reference to a compound object that has already started.
+#
+# The refs are the same as those in the `MarshalGraph` that `Loader` would produce for the same
+# data, except that values (true, false, nil and fixnums) have a ref of None. Back-references to
+# leaf objects (strings, floats, bignums etc.) are resolved to `SCALAR` events by the reader, so
+# consumers only ever see `LINK` events for compound objects.
+#
+# Instance variables attached via "I" to a string, regex or symbol are used to determine its
+# encoding. Instance variables attached via "I" to anything else are given as a compound of kind
+# 'inst_vars' directly after the object they belong to; a module extension via "e" is given as a
+# compound of kind 'extended' enclosing the object which is extended.
+
+class ParseEventType(Enum):
+    START = 'start'
+    END = 'end'
+    SCALAR = 'scalar'
+    SYMBOL = 'symbol'
+    NAME = 'name'
+    LINK = 'link'
+
+START = ParseEventType.START
+END = ParseEventType.END
+SCALAR = ParseEventType.SCALAR
+SYMBOL = ParseEventType.SYMBOL
+NAME = ParseEventType.NAME
+LINK = ParseEventType.LINK
+
+@dataclass(frozen=True)
+class Compound:
+    # one of 'array', 'hash', 'default_hash', 'object', 'struct', 'user_data', 'user_builtin',
+    # 'data', 'user_object', 'inst_vars', 'extended'
+    kind: str
+
+    # the class name for objects, user data and wrappers; the struct name for structs; the module
+    # name for module extensions
+    class_name: Optional[str] = None
+
+    # the number of items, pairs, instance variables or members, where applicable
+    length: Optional[int] = None
+
+ParseEvent = tuple[ParseEventType, Optional[MarshalRef], Any]
+
+class EventReader(FastLoader):
+    """Reads Marshal data as a stream of parse events, without building a graph.
+
+    The only state kept is the table of symbol names (needed to resolve symbol links) and a table
+    with one entry per object index (needed to resolve object links). For leaf objects the entry is
+    the decoded value, and for compound objects it is just the `Compound` describing the object.
+
+    >>> for event in EventReader([4, 8, 91, 7, 73, 34, 6, 97, 6, 58, 6, 69, 84, 64, 6]).iterparse():
+    ...     print(event)
+    (<ParseEventType.START: 'start'>, ref('O0'), Compound(kind='array', class_name=None, length=2))
+    (<ParseEventType.SCALAR: 'scalar'>, ref('O1'), 'a')
+    (<ParseEventType.SCALAR: 'scalar'>, ref('O1'), 'a')
+    (<ParseEventType.END: 'end'>, ref('O0'), Compound(kind='array', class_name=None, length=2))
+    """
+
+    symbol_names: list[str]
+    backrefs: list[Any]
+
+    # Type codes of objects which are yielded as SCALAR or SYMBOL events.
+    LEAF_TYPE_CODES: ClassVar[frozenset[str]] = frozenset('TF0ilf"/:;cmM')
+
+    def __init__(self, data: Sequence[int], *, zero_copy: bool=False) -> None:
+        super().__init__(data, zero_copy=zero_copy)
+        self.symbol_names = []
+        self.backrefs = []
+
+    def iterparse(self) -> Iterator[ParseEvent]:
+        self.read_byte_slice(2) # major and minor version
+        yield from self.iter_object()
+
+        if not self.done:
+            self.error('parsing has finished but not all of the input was consumed')
+
+    def add_backref(self, entry: Any) -> MarshalRef:
+        ref = MarshalRef(MarshalRefType.OBJECT, len(self.backrefs))
+        self.backrefs.append(entry)
+        return ref
+
+    def read_symbol_name(self, type_code: str) -> tuple[MarshalRef, str]:
+        if type_code == ':':
+            ref = MarshalRef(MarshalRefType.SYMBOL, len(self.symbol_names))
+            self.symbol_names.append(self.read_byte_seq().decode('utf-8', 'surrogateescape'))
+            return ref, self.symbol_names[-1]
+
+        if type_code == ';':
+            index = self.read_long()
+
+            try:
+                return MarshalRef(MarshalRefType.SYMBOL, index), self.symbol_names[index]
+            except IndexError:
+                self.error(f'link to symbol {index}, which has not been loaded yet')
+
+        self.error(f'expected to be loading a symbol, but the type code is "{type_code}"')
+        assert False
+
+    def read_leaf(self, type_code: str) -> ParseEvent:
+        if type_code == 'T': return SCALAR, None, True
+        if type_code == 'F': return SCALAR, None, False
+        if type_code == '0': return SCALAR, None, None
+        if type_code == 'i': return SCALAR, None, self.read_long()
+
+        if type_code in (':', ';'):
+            return SYMBOL, *self.read_symbol_name(type_code)
+
+        if type_code == 'l':
+            value = self.read_bignum()
+        elif type_code == 'f':
+            value = self.read_float()
+        elif type_code == '"':
+            value = self.read_content()
+        elif type_code == '/':
+            source = self.read_byte_seq()
+            value = RubyRegex([], [], source, self.read_regex_options())
+        else:
+            vertex_type = {'c': RubyClassRef, 'm': RubyModuleRef, 'M': RubyClassOrModuleRef}[type_code]
+            value = vertex_type(self.read_byte_seq())
+
+        return SCALAR, self.add_backref(value), value
+
+    def read_scalar(self) -> Any:
+        events = list(self.iter_object())
+
+        if len(events) != 1 or events[0][0] != SCALAR:
+            self.error('expected a leaf value')
+
+        return events[0][2]
+
+    def read_encoding(self) -> Optional[str]:
+        encoding = None
+
+        for _ in range(self.read_long()):
+            _, name = self.read_symbol_name(chr(self.read_byte()))
+            value = self.read_scalar()
+
+            if name == 'E':
+                encoding = 'utf-8' if value else 'us-ascii'
+            elif name == 'encoding':
+                encoding = value
+            else:
+                self.warning(f'found instance variable {name} attached to a leaf object; it will be ignored')
+
+        return encoding
+
+    def decode(self, event: ParseEvent, encoding: Optional[str]) -> ParseEvent:
+        event_type, ref, value = event
+        decode_args = ('utf-8', 'surrogateescape') if encoding is None else (encoding,)
+
+        if event_type == SYMBOL:
+            if ref.index == len(self.symbol_names) - 1:
+                value = self.symbol_names[-1] = value.encode('utf-8', 'surrogateescape').decode(*decode_args)
+        elif isinstance(value, (bytes, memoryview)):
+            value = self.backrefs[ref.index] = str(value, *decode_args)
+
+        return event_type, ref, value
+
+    def iter_vars(self, length: int) -> Iterator[ParseEvent]:
+        for _ in range(length):
+            yield NAME, *self.read_symbol_name(chr(self.read_byte()))
+            yield from self.iter_object()
+
+    def iter_object(self) -> Iterator[ParseEvent]:
+        type_code = chr(self.read_byte())
+
+        if type_code in self.LEAF_TYPE_CODES:
+            yield self.decode(self.read_leaf(type_code), None)
+            return
+
+        if type_code == '@':
+            index = self.read_long()
+
+            try:
+                entry = self.backrefs[index]
+            except IndexError:
+                self.error(f'link to object {index}, which has not been loaded yet')
+
+            event_type = LINK if isinstance(entry, Compound) else SCALAR
+            yield event_type, MarshalRef(MarshalRefType.OBJECT, index), entry
+            return
+
+        if type_code == 'I':
+            inner_type_code = chr(self.read_byte())
+
+            if inner_type_code in self.LEAF_TYPE_CODES:
+                event = self.read_leaf(inner_type_code)
+                yield self.decode(event, self.read_encoding())
+                return
+
+            ref = MarshalRef(MarshalRefType.OBJECT, len(self.backrefs))
+            yield from self.iter_object_with_type_code(inner_type_code)
+            compound = Compound('inst_vars', length=self.read_long())
+            yield START, ref, compound
+            yield from self.iter_vars(compound.length)
+            yield END, ref, compound
+            return
+
+        if type_code == 'e':
+            _, module_name = self.read_symbol_name(chr(self.read_byte()))
+            compound = Compound('extended', module_name)
+            ref = MarshalRef(MarshalRefType.OBJECT, len(self.backrefs))
+            yield START, ref, compound
+            yield from self.iter_object()
+            yield END, ref, compound
+            return
+
+        yield from self.iter_object_with_type_code(type_code)
+
+    def iter_object_with_type_code(self, type_code: str) -> Iterator[ParseEvent]:
+        if type_code in ('[', '{', '}'):
+            kind = {'[': 'array', '{': 'hash', '}': 'default_hash'}[type_code]
+            compound = Compound(kind, length=self.read_long())
+            ref = self.add_backref(compound)
+            yield START, ref, compound
+
+            if type_code == '[':
+                for _ in range(compound.length):
+                    yield from self.iter_object()
+            else:
+                for _ in range(compound.length * 2 + (type_code == '}')):
+                    yield from self.iter_object()
+        elif type_code in ('o', 'S'):
+            # The object index has to be allocated before the class name is read, in order for the
+            # indices to match up with those allocated by `Loader`. (The class name is a symbol,
+            # so it doesn't allocate an object index itself, but we keep the same order anyway.)
+            ref = self.add_backref(None)
+            _, class_name = self.read_symbol_name(chr(self.read_byte()))
+            kind = 'object' if type_code == 'o' else 'struct'
+            compound = self.backrefs[ref.index] = Compound(kind, class_name, self.read_long())
+            yield START, ref, compound
+            yield from self.iter_vars(compound.length)
+        elif type_code in ('C', 'd', 'U', 'u'):
+            ref = self.add_backref(None)
+            _, class_name = self.read_symbol_name(chr(self.read_byte()))
+
+            kind = {
+                'C': 'user_builtin', 'd': 'data', 'U': 'user_object', 'u': 'user_data'
+            }[type_code]
+
+            compound = self.backrefs[ref.index] = Compound(kind, class_name)
+            yield START, ref, compound
+
+            if type_code == 'u':
+                yield SCALAR, None, self.read_content()
+            else:
+                yield from self.iter_object()
+        else:
+            self.error(f'invalid type code "{type_code}"')
+            assert False
+
+        yield END, ref, compound
+
 ###################################################################################################
 # Dump
 ###################################################################################################
@@ -1123,9 +2382,16 @@ def get_fixnum(graph: MarshalGraph, ref: MarshalRef) -> int:
     return vertex.value
 
 def get_symbol(graph: MarshalGraph, ref: MarshalRef) -> str:
+    if ref.type_ is MarshalRefType.SYMBOL:
+        try:
+            return graph.symbol_names[ref.index]
+        except KeyError:
+            pass
+
     vertex = graph[ref]
     assert isinstance(vertex, RubySymbol)
-    return vertex.name.decode('utf-8', 'surrogateescape')
+    name = graph.symbol_names[ref.index] = vertex.name.decode('utf-8', 'surrogateescape')
+    return name
 
 def get_inst_vars(graph: MarshalGraph, ref: MarshalRef) -> OrderedDict[str, MarshalRef]:
     vertex = graph[ref]
@@ -1158,7 +2424,7 @@ def get_encoding(graph: MarshalGraph, ref: MarshalRef) -> str:
         )
         
     try:           
-        name = vertex.value.decode('us-ascii')
+        name = str(vertex.value, 'us-ascii')
     except UnicodeDecodeError:
         raise ValueError(
             'this Ruby string which I think is an encoding name is not ASCII-decodable, which '
@@ -1186,12 +2452,19 @@ def get_encoding_from_inst_vars(
     return encoding, new_inst_vars
         
 def get_string(graph: MarshalGraph, ref: MarshalRef) -> str:
+    if ref.type_ is MarshalRefType.OBJECT:
+        try:
+            return graph.strings[ref.index]
+        except KeyError:
+            pass
+
     vertex = graph[ref]
     assert isinstance(vertex, RubyString)
     encoding, inst_vars = get_encoding_from_inst_vars(graph, ref)
     decode_args = ('utf-8', 'surrogateescape') if encoding is None else (encoding,)
     assert not inst_vars
-    return vertex.value.decode(*decode_args)
+    string = graph.strings[ref.index] = str(vertex.value, *decode_args)
+    return string
 
 def get_array(graph: MarshalGraph, ref: MarshalRef, callback: Lookup=get_ref) -> list:
     vertex = graph[ref]
@@ -1268,7 +2541,174 @@ def get_inst(
             
     return ctor(**inst_vars)
 
-def get_user_data(graph: MarshalGraph, ref: MarshalRef, class_name: str) -> bytes:
+class PerGraph:
+    """Keeps a separate state object for each graph, made by calling `factory` the first time the
+    state for that graph is asked for, and dropped when the graph is garbage-collected.
+
+    This is for decoders that are shared (e.g. the module-level `InstDecoder`s) but remember things
+    about the graph they're decoding. Since no state is shared between graphs, different graphs can
+    be decoded at once in different threads. The state for the most recently seen graph is kept at
+    hand, since objects generally all get decoded from one graph before moving on to the next.
+
+    >>> per_graph = PerGraph(dict)
+    >>> graph1, graph2 = MarshalGraph(), MarshalGraph()
+    >>> per_graph.get(graph1)['a'] = 1
+    >>> per_graph.get(graph2)
+    {}
+    >>> per_graph.get(graph1)
+    {'a': 1}
+    >>> del graph1
+    >>> len(per_graph.states)
+    1
+    """
+
+    factory: Callable[[], Any]
+    states: dict[int, Any] # id(graph) -> state
+    last: Optional[tuple[weakref.ref, Any]] # (weak reference to a graph, its state)
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self.factory = factory
+        self.states = {}
+        self.last = None
+
+    def get(self, graph: MarshalGraph) -> Any:
+        # The graph and its state are read and written together as one tuple, so that another
+        # thread can't pair a graph with a state that isn't its own.
+        last = self.last
+        if last is not None and last[0]() is graph: return last[1]
+        key = id(graph)
+        state = self.states.get(key)
+
+        if state is None:
+            state = self.states.setdefault(key, self.factory())
+
+            # The entry is removed while the graph is being collected, so its ID can't be reused
+            # for another graph before then.
+            weakref.finalize(graph, self.states.pop, key, None)
+
+        self.last = (weakref.ref(graph), state)
+        return state
+
+# Placeholder for instance variables that haven't been seen yet in `InstDecoder.__call__`.
+_MISSING = object()
+
+@dataclass
+class InstDecoderGraphState:
+    """What an `InstDecoder` has learned about the symbols of a particular graph."""
+    class_symbol_index: Optional[int] = None
+    slot_by_symbol_index: dict[int, int] = field(default_factory=dict)
+
+class InstDecoder:
+    """A compiled version of `get_inst`, for a fixed class name and set of instance variables.
+
+    Calling it does the same thing as calling `get_inst` with the same arguments, but does less
+    work per object: the callbacks are kept in a list indexed by slot position, and the class name
+    and instance variable names are only decoded the first time their symbols are seen in a given
+    graph (after that, the symbol indices are mapped straight to slot positions).
+
+    If `renames` is given, it maps instance variable names to the keyword argument names which
+    should be used for them when calling `ctor`.
+
+    >>> decoder = InstDecoder('Point', lambda **kwargs: kwargs, {'x': get_fixnum, 'y': get_fixnum})
+    >>> graph = load(bytes([4, 8, 111, 58, 10, 80, 111, 105, 110, 116, 7, 58, 7, 64, 120, 105, 6,
+    ...                     58, 7, 64, 121, 105, 7])).graph
+    >>> decoder(graph, graph.root_ref())
+    {'x': 1, 'y': 2}
+    """
+
+    class_name: str
+    ctor: Callable[..., Any]
+    inst_var_callbacks: dict[str, Lookup]
+    renames: dict[str, str]
+    names: list[str]
+    kwarg_names: list[str]
+    callbacks: list[Lookup]
+
+    # Maps each instance variable name, including the "@", to its slot position.
+    slot_by_key: dict[str, int]
+
+    # The `InstDecoderGraphState` for each graph.
+    graph_states: PerGraph
+
+    def __init__(
+        self, class_name: str, ctor: Callable[..., Any], inst_var_callbacks: dict[str, Lookup],
+        *, renames: Optional[dict[str, str]]=None
+    ) -> None:
+        self.class_name = class_name
+        self.ctor = ctor
+        self.inst_var_callbacks = inst_var_callbacks
+        self.renames = renames or {}
+        self.names = list(inst_var_callbacks)
+        self.kwarg_names = [self.renames.get(name, name) for name in self.names]
+        self.callbacks = list(inst_var_callbacks.values())
+        self.slot_by_key = {'@' + name: slot for slot, name in enumerate(self.names)}
+        self.graph_states = PerGraph(InstDecoderGraphState)
+
+    def __call__(self, graph: MarshalGraph, ref: MarshalRef) -> Any:
+        return self.ctor(**dict(zip(self.kwarg_names, self.get_values(graph, ref))))
+
+    def get_values(self, graph: MarshalGraph, ref: MarshalRef) -> list[Any]:
+        """Return the results of the instance variable callbacks, in the order of the schema,
+        without calling the constructor."""
+        vertex = graph[ref]
+
+        if not isinstance(vertex, MarshalRegObj):
+            raise ValueError(f'vertex at ref {ref} is not a regular object')
+
+        state = self.graph_states.get(graph)
+
+        if vertex.cls.index != state.class_symbol_index:
+            actual_class_name = get_symbol(graph, vertex.cls)
+
+            if actual_class_name != self.class_name:
+                raise ValueError(
+                    f'expected an instance of \'{self.class_name}\', got an instance of '
+                    f'\'{actual_class_name}\''
+                )
+
+            state.class_symbol_index = vertex.cls.index
+
+        assert not vertex.module_ext
+        slot_by_symbol_index = state.slot_by_symbol_index
+        callbacks = self.callbacks
+        values = [_MISSING] * len(callbacks)
+
+        for key_ref, value_ref in vertex.inst_vars:
+            slot = slot_by_symbol_index.get(key_ref.index)
+
+            if slot is None:
+                slot = self.resolve_slot(graph, state, key_ref)
+
+            values[slot] = callbacks[slot](graph, value_ref)
+
+        if _MISSING in values:
+            name = self.names[values.index(_MISSING)]
+            raise ValueError(f'expected instance variable "{name}" for class "{self.class_name}"')
+
+        return values
+
+    def resolve_slot(
+        self, graph: MarshalGraph, state: 'InstDecoderGraphState', key_ref: MarshalRef
+    ) -> int:
+        key = get_symbol(graph, key_ref)
+        assert key[0] == '@'
+
+        try:
+            slot = self.slot_by_key[key]
+        except KeyError:
+            raise ValueError(f'unexpected instance variable "{key[1:]}" for class "{self.class_name}"')
+
+        state.slot_by_symbol_index[key_ref.index] = slot
+        return slot
+
+def compile_inst(
+    class_name: str, ctor: Callable[..., Any], inst_var_callbacks: dict[str, Lookup],
+    *, renames: Optional[dict[str, str]]=None
+) -> InstDecoder:
+    """Compile a `get_inst` schema into an `InstDecoder`, which can be used as a `Lookup`."""
+    return InstDecoder(class_name, ctor, inst_var_callbacks, renames=renames)
+
+def get_user_data(graph: MarshalGraph, ref: MarshalRef, class_name: str) -> ByteContent:
     vertex = graph[ref]
     assert isinstance(vertex, MarshalUserData)
     assert get_symbol(graph, vertex.cls) == class_name
@@ -1325,7 +2765,7 @@ class JsonishFormatter:
         if isinstance(vertex, RubyString):
             encoding, inst_vars = get_encoding_from_inst_vars(self.graph, ref)
             decode_args = ('utf-8', 'surrogateescape') if encoding is None else (encoding,)
-            res |= {'type': 'string', 'value': vertex.value.decode(*decode_args)}
+            res |= {'type': 'string', 'value': str(vertex.value, *decode_args)}
         elif isinstance(vertex, RubyRegex):
             encoding, inst_vars = get_encoding_from_inst_vars(self.graph, ref)
             decode_args = ('utf-8', 'surrogateescape') if encoding is None else (encoding,)
@@ -1393,130 +2833,332 @@ class JsonishFormatter:
         
 ###################################################################################################
 
-def load(data: Sequence[int]) -> MarshalFile:
-    return Loader(data).load()
+def load(
+    data: Sequence[int], *, fast: bool=False, zero_copy: bool=False, lazy: bool=False,
+    compact: bool=False
+) -> MarshalFile:
+    """Parse Marshal data.
+
+    If `fast` is true, a `FastLoader` is used rather than a `Loader`. The result is the same, but
+    it is produced more quickly and without any debug logging.
+
+    If `zero_copy` is true (which implies `fast`), the content of strings and user data in the
+    result will be memoryview slices of `data`, which must support the buffer protocol.
+
+    If `lazy` is true (which also implies `fast`), the result's graph is a `LazyMarshalGraph`,
+    whose objects are decoded on demand.
+
+    If `compact` is true (which also implies `fast`), the result's graph is a
+    `CompactMarshalGraph`, which uses much less memory but constructs vertices on every lookup."""
+    if lazy and compact: raise ValueError('lazy and compact modes cannot be combined')
+    if lazy: return LazyLoader(data, zero_copy=zero_copy).load()
+    if compact: return CompactLoader(data, zero_copy=zero_copy).load()
+    if zero_copy: return FastLoader(data, zero_copy=True).load()
+    return (FastLoader if fast else Loader)(data).load()
+
+def load_file(
+    filename: str, *, fast: bool=False, zero_copy: bool=False, lazy: bool=False,
+    compact: bool=False
+) -> MarshalFile:
+    """Parse a file containing Marshal data.
+
+    If `zero_copy` is true, the file is memory-mapped rather than read into memory, and the content
+    of strings and user data in the result will be views into the mapping. The mapping stays open
+    for as long as any of these views are alive (or, with `lazy`, for as long as the graph is
+    alive)."""
+    with open(filename, 'rb') as f:
+        if not zero_copy:
+            data = f.read()
+            return load(data, fast=fast, lazy=lazy, compact=compact)
+
+        if os.fstat(f.fileno()).st_size == 0:
+            return load(b'', zero_copy=True, lazy=lazy, compact=compact)
+
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return load(data, zero_copy=True, lazy=lazy, compact=compact)
+
+# The version of the cache format used by `load_file_cached`. This should be bumped whenever
+# anything changes about the graphs that `CompactLoader` produces (including changes to the vertex
+# classes), so that existing cache entries are no longer used.
+CACHE_FORMAT_VERSION = 2
+
+def load_file_cached(filename: str, cache_dir: Optional[str]) -> MarshalFile:
+    """Parse a file containing Marshal data into a `CompactMarshalGraph`, using a cache.
+
+    The parsed result is pickled into `cache_dir`, under a name derived from the file name, the
+    hash of its content and `CACHE_FORMAT_VERSION`. If there's already an entry for the same
+    content, it's loaded from there rather than parsed again. When a new entry is written, any
+    other entries for a file with the same name are deleted, since they must be stale.
 
-def load_file(filename: str) -> MarshalFile:
+    The file is memory-mapped, and when it has to be parsed (including when `cache_dir` is None,
+    in which case the file is just parsed without caching), that's done as by `load_file` with
+    `zero_copy`, so the content of strings, user data and tables is views into the mapping. A
+    result loaded from the cache holds its own copies of them instead."""
     with open(filename, 'rb') as f:
-        data = f.read()
-        return load(data)
+        if os.fstat(f.fileno()).st_size == 0:
+            data = b''
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if cache_dir is None:
+        return load(data, zero_copy=True, compact=True)
+
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    prefix = os.path.basename(filename) + '.'
+    entry_name = f'{prefix}{CACHE_FORMAT_VERSION}.{digest}.pickle'
+    entry_path = os.path.join(cache_dir, entry_name)
+
+    try:
+        with open(entry_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        print(f'WARNING: ignoring unreadable cache entry {entry_path}: {e}')
+
+    result = load(data, zero_copy=True, compact=True)
+    write_cache_entry(
+        cache_dir, prefix, entry_name,
+        lambda f: pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+    return result
+
+def write_cache_entry(
+    cache_dir: str | os.PathLike, prefix: str, entry_name: str,
+    write: Callable[[BinaryIO], None]
+) -> None:
+    """Write an entry named `entry_name` (which should start with `prefix`) into the cache
+    directory `cache_dir`, by calling `write` with a file open for writing, and then delete any
+    other entries whose names start with `prefix` and have the same extension, since they must be
+    stale. This is shared by the on-disk caches (see `load_file_cached`).
+
+    The entry is written to a uniquely named temporary file first and then renamed, so that an
+    interrupted write doesn't leave a truncated entry behind, and so that several threads or
+    processes can write entries at once (e.g. when two extractors both load a changed file). For
+    the same reason, entries that another writer has already deleted are skipped. Since the cache
+    is only there to save time, an error here is reported as a warning rather than raised, so it
+    can't be mistaken for an error about the file being cached (e.g. a missing map file)."""
+    entry_path = os.path.join(cache_dir, entry_name)
+    extension = os.path.splitext(entry_name)[1]
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f'{entry_name}.', suffix='.tmp', dir=cache_dir)
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+
+            raise
+
+        for other_name in os.listdir(cache_dir):
+            if (
+                other_name.startswith(prefix) and other_name.endswith(extension)
+                and other_name != entry_name
+            ):
+                with suppress(FileNotFoundError):
+                    os.remove(os.path.join(cache_dir, other_name))
+    except OSError as e:
+        print(f'WARNING: couldn\'t write cache entry {entry_path}: {e}')
+
+def iterparse(filename: str) -> Iterator[ParseEvent]:
+    """Iterate over the parse events (see `EventReader`) for a file containing Marshal data.
+
+    The file is memory-mapped, so it isn't read into memory all at once."""
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            data = b''
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    yield from EventReader(data, zero_copy=True).iterparse()
 
 # why do all the prettyprinters suck. fine, i'll write my own
 # this should be suitable for pasting into an online json viewing tool --- my favourite is
 # http://jsonviewer.stack.hu/ although https://jsonformatter.curiousconcept.com/# is good for
 # when it doesn't validate 
-def dump_jsonish(data):
-    LIMIT = 120
-    
-    def json_dumps(data):
-        if data in (None, True, False) or isinstance(data, (int, float, str)):
-            return json.dumps(data)
-
-        # if data is None: return 'null'
-        # if data is True: return 'true'
-        # if data is False: return 'false'
-        # if isinstance(data, (int, float)): return str(data)
-        # if isinstance(data, str): return json.dumps(data)
-        #     repr_ = repr(data)
-        #     return f'"{repr_[1:-1]}"'
-            
+def dump_jsonish(data: Jsonish, file: Optional[TextIO]=None) -> Optional[str]:
+    """Pretty-print `data`, putting things on one line wherever they fit within `LIMIT` columns.
+
+    If `file` is given, the output is written to it line by line, and nothing is returned.
+    Otherwise the output is returned as a string.
+
+    >>> print(dump_jsonish({'a': [1, 2], 'b': [['spam'] * 9, ['eggs'] * 9, ['ham'] * 9]}))
+    {
+     "a": [1, 2],
+     "b": [
+      ["spam", "spam", "spam", "spam", "spam", "spam", "spam", "spam", "spam"],
+      ["eggs", "eggs", "eggs", "eggs", "eggs", "eggs", "eggs", "eggs", "eggs"],
+      ["ham", "ham", "ham", "ham", "ham", "ham", "ham", "ham", "ham"]
+     ]
+    }
+    """
+    if file is None:
+        stream = io.StringIO()
+        JsonishPrinter(stream).dump(data)
+        return stream.getvalue()[:-1]
+
+    JsonishPrinter(file).dump(data)
+
+class JsonishPrinter:
+    """The implementation of `dump_jsonish`.
+
+    Whether a subtree fits on one line is decided by `width`, which gives up as soon as the width
+    goes over the remaining space, so each check only looks at as much of the subtree as could fit
+    on a line. Only subtrees which are known to fit are actually serialized. Every line is written
+    out as soon as it's complete."""
+
+    LIMIT: ClassVar[int] = 120
+
+    file: TextIO
+
+    def __init__(self, file: TextIO) -> None:
+        self.file = file
+
+    def dump(self, data: Jsonish) -> None:
+        self.write(self.dump_lines(data, '', '', ''))
+
+    def write(self, line: str) -> None:
+        self.file.write(line)
+        self.file.write('\n')
+
+    @staticmethod
+    def is_scalar(data: Jsonish) -> bool:
+        return data is None or isinstance(data, (bool, int, float, str))
+
+    @staticmethod
+    def is_container(data: Jsonish) -> bool:
+        return isinstance(data, (tuple, list, dict, frozendict))
+
+    @staticmethod
+    def scalar_oneline(data: Jsonish) -> str:
+        # the same as json.dumps, but without the overhead for the common cases
+        if isinstance(data, str): return json.encoder.encode_basestring_ascii(data)
+        if data is None: return 'null'
+        if data is True: return 'true'
+        if data is False: return 'false'
+        if isinstance(data, int): return str(data)
+        return json.dumps(data)
+
+    def oneline(self, data: Jsonish) -> str:
+        if self.is_scalar(data):
+            return self.scalar_oneline(data)
+
         if isinstance(data, (list, tuple)):
-            itemreps = [json_dumps(item) for item in data]
-            return '[' + ', '.join(itemreps) + ']'
-            
+            return '[' + ', '.join(self.oneline(item) for item in data) + ']'
+
         if isinstance(data, (dict, frozendict)):
-            keyreps = [json_dumps(key) for key in data.keys()]
-            valuereps = [json_dumps(value) for value in data.values()]
-            pairreps = [f'{keyrep}: {valuerep}' for keyrep, valuerep in zip(keyreps, valuereps)]
-            return '{' + ', '.join(pairreps) + '}'
-            
-        assert False
-    
-    #json_dumps = partial(json.dumps, default=dict) # convert frozendicts to dicts
-    
-    def dumplines(data, indent, prefix, suffix):
-        res = []
-        
-        #if data is None: return [prefix + 'null' + suffix]
-        #if data is True: return [prefix + 'true' + suffix]
-        #if data is False: return [prefix + 'false' + suffix]
-        #if isinstance(data, (int, float)): return [prefix + str(data) + suffix]
-        #if isinstance(data, str): return [prefix + '"' + data + '"' + suffix]
-        
-        if data is None or isinstance(data, (bool, int, float, str)):
-            #if isinstance(data, str):
-                #data = data.encode('utf-8', 'surrogateescape')
-                
-            return [prefix + json_dumps(data) + suffix]
-    
+            return '{' + ', '.join(
+                f'{self.oneline(key)}: {self.oneline(value)}' for key, value in data.items()
+            ) + '}'
+
+        raise ValueError(f'{data} is not jsonish enough')
+
+    def width(self, data: Jsonish, budget: int) -> int:
+        """Return the length of `self.oneline(data)` if it's at most `budget`; otherwise return some
+        number greater than `budget`."""
+        if isinstance(data, str):
+            # the quotes add at least 2, so there's no need to escape a string that's too long
+            if len(data) + 2 > budget: return budget + 1
+            return len(json.encoder.encode_basestring_ascii(data))
+
         if isinstance(data, (tuple, list)):
-            oneline = prefix + json_dumps(data) + suffix
-            if len(oneline) <= LIMIT: return [oneline]
-            innerindent = indent + ' '
-            innerlines = []
-            
-            for i, item in enumerate(data):
-                innersuffix = ',' if i < len(data) - 1 else ''
-                innerlines.extend(dumplines(item, innerindent, innerindent, innersuffix))
-            
-            return [prefix + '[', *innerlines, indent + ']' + suffix]
-            
+            total = 2 + 2 * max(len(data) - 1, 0)
+
+            for item in data:
+                if total > budget: return budget + 1
+                total += self.width(item, budget - total)
+
+            return total
+
         if isinstance(data, (dict, frozendict)):
-            oneline = prefix + json_dumps(data) + suffix
-            if len(oneline) <= LIMIT: return [oneline]
-            innerindent = indent + ' '
-            innerlines = []
-            
-            for i, (key, value) in enumerate(data.items()):
-                innersuffix = ',' if i < len(data) - 1 else ''
-                
-                key_oneline = innerindent + json_dumps(key) + ': '
-                value_oneline = json_dumps(value) + innersuffix
-                keyvalue_oneline = key_oneline + value_oneline
-
-                if len(keyvalue_oneline) <= LIMIT:
-                    # both key and value on one line
-                    innerlines.append(keyvalue_oneline)
-                    continue
-                
-                key_lines = dumplines(key, innerindent, innerindent, ': ' + value_oneline)
-                value_lines = dumplines(value, innerindent, key_oneline, innersuffix)
+            total = 2 + 2 * max(len(data) - 1, 0) + 2 * len(data)
+
+            for key, value in data.items():
+                if total > budget: return budget + 1
+                total += self.width(key, budget - total)
+                if total > budget: return budget + 1
+                total += self.width(value, budget - total)
+
+            return total
+
+        if self.is_scalar(data):
+            return len(self.scalar_oneline(data))
 
-                if len(value_lines[0]) <= LIMIT:
-                    # key in one line, value on multiple lines
-                    innerlines.extend(value_lines)
-                    continue
-                
-                if len(key_lines[-1]) <= LIMIT:
-                    # key in multiple lines, value on one line
-                    innerlines.extend(key_lines)
-                    continue
-                    
-                # both key and value on multiple lines
-                key_lines = dumplines(key, innerindent, innerindent, ': ')
-                value_lines = dumplines(value, innerindent, key_lines[-1], innersuffix)
-                innerlines.extend(key_lines[:-1])
-                innerlines.extend(value_lines)
-                                                    
-            return [prefix + '{', *innerlines, indent + '}' + suffix]
-            
         raise ValueError(f'{data} is not jsonish enough')
-            
-    return '\n'.join(dumplines(data, '', '', ''))
 
+    def fits(self, data: Jsonish, prefix: str, suffix: str) -> bool:
+        budget = self.LIMIT - len(prefix) - len(suffix)
+        return budget >= 0 and self.width(data, budget) <= budget
+
+    def dump_lines(self, data: Jsonish, indent: str, prefix: str, suffix: str) -> str:
+        """Write the lines for `data`, except for the last one, which is returned so that the
+        caller can add more to it."""
+        if self.is_scalar(data):
+            return prefix + self.oneline(data) + suffix
+
+        if not self.is_container(data):
+            raise ValueError(f'{data} is not jsonish enough')
+
+        if self.fits(data, prefix, suffix):
+            return prefix + self.oneline(data) + suffix
+
+        innerindent = indent + ' '
+
+        if isinstance(data, (tuple, list)):
+            self.write(prefix + '[')
+
+            for i, item in enumerate(data):
+                innersuffix = ',' if i < len(data) - 1 else ''
+                self.write(self.dump_lines(item, innerindent, innerindent, innersuffix))
+
+            return indent + ']' + suffix
+
+        self.write(prefix + '{')
+
+        for i, (key, value) in enumerate(data.items()):
+            innersuffix = ',' if i < len(data) - 1 else ''
+            key_width = self.width(key, self.LIMIT)
+            value_width = self.width(value, self.LIMIT)
+            key_oneline_width = len(innerindent) + key_width + 2
+            value_oneline_width = value_width + len(innersuffix)
+
+            if key_oneline_width + value_oneline_width <= self.LIMIT:
+                # both key and value on one line
+                line = innerindent + self.oneline(key) + ': ' + self.oneline(value) + innersuffix
+            elif self.is_container(value) and key_oneline_width + 1 <= self.LIMIT:
+                # key in one line, value on multiple lines
+                key_oneline = innerindent + self.oneline(key) + ': '
+                line = self.dump_lines(value, innerindent, key_oneline, innersuffix)
+            elif self.is_container(key) and len(innerindent) + 3 + value_oneline_width <= self.LIMIT:
+                # key in multiple lines, value on one line
+                value_oneline = self.oneline(value) + innersuffix
+                line = self.dump_lines(key, innerindent, innerindent, ': ' + value_oneline)
+            else:
+                # both key and value on multiple lines
+                key_last_line = self.dump_lines(key, innerindent, innerindent, ': ')
+                line = self.dump_lines(value, innerindent, key_last_line, innersuffix)
+
+            self.write(line)
+
+        return indent + '}' + suffix
 
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
 
     from pathlib import Path
-    import json
     import pprint
     import sys
     
     path = Path(sys.argv[1])
-    graph = load_file(str(path)).graph
+    graph = load_file(str(path), compact=True).graph
 
     with open('marshal-output.txt', 'w', encoding='utf-8') as f:
         data = JsonishFormatter(graph).format()
-        print(dump_jsonish(data), file=f)
+        dump_jsonish(data, f)
@@ -1,6 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Type, TypeVar
+from functools import cached_property
+import io
+from pathlib import Path
+import struct
+from typing import BinaryIO, TextIO, Type, TypeVar
 import numpy as np
 
 from parsers import marshal
@@ -10,6 +14,13 @@ T = TypeVar('T')
 def get_bool_from_fixnum(graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> bool:
     return bool(marshal.get_fixnum(graph,  ref))
 
+def get_user_data_bytes(
+    graph: marshal.MarshalGraph, ref: marshal.MarshalRef, class_name: str
+) -> bytes:
+    # (copied, since in a zero-copy graph the data is a view into the file, which shouldn't be kept
+    # alive by small values like colours)
+    return bytes(marshal.get_user_data(graph, ref, class_name))
+
 class FixnumBasedEnum(Enum):
     @classmethod
     def get(cls: Type[T], graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> Type[T]:
@@ -160,25 +171,39 @@ class AudioFile:
     
     @classmethod
     def get(cls: Type[T], graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> Type[T]:
-        return marshal.get_inst(graph, ref, 'RPG::AudioFile', cls, {
-            'name': marshal.get_string, 'volume': marshal.get_fixnum, 'pitch': marshal.get_fixnum
-        })
+        return cls.decoder(graph, ref)
+
+AudioFile.decoder = marshal.compile_inst('RPG::AudioFile', AudioFile, {
+    'name': marshal.get_string, 'volume': marshal.get_fixnum, 'pitch': marshal.get_fixnum
+})
+
+TABLE_HEADER = struct.Struct('<5i')
 
 @dataclass
 class Table:
-    bytes_: bytes
-    array: np.array
+    # The tile data, as a view into the Marshal data (so it isn't copied; if the data was loaded in
+    # zero-copy mode, this is a view into the loader's input).
+    buffer: memoryview = field(repr=False)
+    width: int
+    height: int
+    depth: int
 
     @classmethod
     def get(
-        cls: Type[T], graph: marshal.MarshalGraph, ref: marshal.MarshalRef, expected_dimcount=None
+        cls: Type[T], graph: marshal.MarshalGraph, ref: marshal.MarshalRef, expected_dimcount=None,
+        lazy=False
     ) -> Type[T]:
+        """If `lazy` is true, the numpy array isn't built until the `array` attribute is first
+        accessed."""
     
         bytes_ = marshal.get_user_data(graph, ref, 'Table')
 
         # The data begins with a 32-bit signed integer giving the number of dimensions in the
-        # array.
-        dimcount = int.from_bytes(bytes_[:4], 'little', signed=True)
+        # array, followed by three more giving the size of each dimension, in number of tiles.
+        # Order is width, height, depth. If the number of dimensions is less than 3 then the
+        # remaining dimensions will be 1. Then comes a final 32-bit signed integer which is simply
+        # equal to the product of the dimensions, giving us no new information.
+        dimcount, width, height, depth, datalen = TABLE_HEADER.unpack_from(bytes_)
         assert 1 <= dimcount <= 3
 
         if expected_dimcount is not None and dimcount != expected_dimcount:
@@ -186,68 +211,110 @@ class Table:
                 f'Table object at ref {ref} has {dimcount} dimensions, expected '
                 f'{expected_dimcount}'
             )
- 
-        # Next come three more 32-bit signed integers giving the size of each dimension, in number
-        # of tiles. Order is width, height, depth. If the number of dimensions is less than 3 then
-        # the remaining dimensions will be 1.
-
-        dimensions = []
-
-        for i in range(3):
-            size = int.from_bytes(bytes_[4 * (i + 1):4 * (i + 2)], 'little', signed=True)
-            if i >= dimcount: assert size == 1
-            dimensions.append(size)
 
-        width, height, depth = dimensions
-
-        # Next comes a final 32-bit signed integer which is simply equal to the product of the
-        # dimensions, giving us no new information.
-        datalen = int.from_bytes(bytes_[16:20], 'little', signed=True)
+        if dimcount < 3: assert depth == 1
+        if dimcount < 2: assert height == 1
         assert datalen == width * height * depth
 
         # The remaining data consists of 16-bit signed integers, which reference tiles from the
         # map's tileset. There is one of these for each tile, and the number of tiles is equal to
         # the product of the dimensions, so the total length of the remaning data is twice the
         # integer that we just read (datalen).
-        tiledata = bytes_[20:]
-        assert len(tiledata) == datalen * 2
+        buffer = memoryview(bytes_)[TABLE_HEADER.size:]
+        assert len(buffer) == datalen * 2
+
+        table = cls(buffer, width, height, depth)
+        if not lazy: table.array
+        return table
 
+    @cached_property
+    def array(self) -> np.ndarray:
         # Tiles are arranged so that adjacent tiles have the same depth, height and width, in that
         # order of preference. Since we access the tiles via (x, y, z) coordinates this is
         # "Fortran order"---as you iterate over the data, the fastest-changing indices are the
         # earliest ones.
-        array = np.ndarray(shape=(width, height, depth), dtype='h', buffer=bytes_[20:], order='F')
-        return cls(bytes_, array)
-
-    @property
-    def width(self): return self.array.shape[0]
-
-    @property
-    def height(self): return self.array.shape[1]
-
-    @property
-    def depth(self): return self.array.shape[2]
+        return np.frombuffer(self.buffer, dtype='<i2').reshape(
+            (self.width, self.height, self.depth), order='F'
+        )
 
     def __getitem__(self, indices):
         x, y, z = indices
         return self.array[x, y, z]
 
+    def __getstate__(self):
+        # memoryviews can't be pickled, so the data is copied into a bytes object (and the array,
+        # if it has been built, is left to be rebuilt on the other side)
+        state = self.__dict__.copy()
+        state['buffer'] = self.buffer.tobytes()
+        state.pop('array', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, buffer=memoryview(state['buffer']))
+
     def format(self) -> str:
-        rows = []
+        """Format the tiles as text: for each row (y), a block of lines giving each layer (z) of
+        the row, with the blocks separated by blank lines. Each tile is zero-padded to 5
+        characters."""
+        stream = io.StringIO()
+        self.write_text(stream)
+        return stream.getvalue().removesuffix('\n')
+
+    def write_text(self, stream: TextIO, rows_per_chunk: int=64) -> None:
+        """Write the text produced by `format` (plus a final newline) to `stream`, a few rows at a
+        time, so that the whole text never has to be held in memory."""
+        for y in range(0, self.height, rows_per_chunk):
+            if y: stream.write('\n')
+            stream.write(self.format_rows(y, min(y + rows_per_chunk, self.height)))
+
+    def format_rows(self, y_start: int, y_stop: int) -> str:
+        # in (y, z, x) order, as laid out in the text
+        tiles = self.array[:, y_start:y_stop, :].transpose(1, 2, 0)
+
+        if tiles.size == 0 or tiles.min() < -9999:
+            # The fast way below assumes each tile fits in 5 characters.
+            return '\n'.join(
+                '\n'.join(' '.join(f'{tile:05}' for tile in subrow) for subrow in row) + '\n'
+                for row in tiles.tolist()
+            )
 
-        # maximum size expected is 5 digits
+        # Build the text as an array of characters, 6 for each tile: its 5 digits (the first of
+        # which is replaced with a minus sign if it's negative), and then a space, or a newline for
+        # the last tile in each layer.
+        magnitudes = np.abs(tiles.astype(np.int32))
+        chars = np.empty(tiles.shape + (6,), dtype=np.uint8)
 
-        for y in range(self.height):
-            row = []
+        for i in range(5):
+            chars[..., 4 - i] = magnitudes // 10 ** i % 10 + ord('0')
 
-            for z in range(self.depth):
-                subrow = []
+        chars[..., 0][tiles < 0] = ord('-')
+        chars[..., 5] = ord(' ')
+        chars[..., -1, 5] = ord('\n')
+        return '\n'.join(row.tobytes().decode('ascii') for row in chars)
 
-                for x in range(self.width):
-                    subrow.append(f'{self[x, y, z]:05}')
+    def write_csv(self, stream: TextIO) -> None:
+        """Write the tiles as CSV, with one line for each row of each layer, giving the layer (z),
+        the row (y) and then the tiles in the row. Since each line is labelled with its position,
+        a line diff of two of these files shows where the tiles differ."""
 
-                row.append(' '.join(subrow))
+        # in (z, y, x) order
+        tiles = self.array.transpose(2, 1, 0).reshape(-1, self.width)
+        zs, ys = np.divmod(np.arange(len(tiles)), self.height)
+        np.savetxt(stream, np.column_stack((zs, ys, tiles)), fmt='%d', delimiter=',')
 
-            rows.append('\n'.join(row))
+    def save(self, file: str | Path | BinaryIO) -> None:
+        """Save the tiles in numpy's `.npy` format, which can be loaded with `np.load`."""
+        np.save(file, self.array)
+
+    def diff(self, other: 'Table | np.ndarray') -> np.ndarray:
+        """Return the (x, y, z) positions at which the tiles in `other` (a table, or an array such
+        as one saved by `save`) differ from these, as the rows of an array."""
+        other_array = other.array if isinstance(other, Table) else other
+
+        if other_array.shape != self.array.shape:
+            raise ValueError(
+                f'cannot compare a table of shape {self.array.shape} with one of shape '
+                f'{other_array.shape}'
+            )
 
-        return '\n\n'.join(rows)
+        return np.argwhere(self.array != other_array)
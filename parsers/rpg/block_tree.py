@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+from parsers.rpg.event_command import *
+
+# Event command lists are flat, with their structure given only by the `indent` of each command and
+# by "continuation" commands which carry on from the one before. This turns a command list into a
+# tree of blocks, so that analyses can work with whole scripts, texts and branches at once.
+#
+# Each block starts with one command and covers a range of positions in the command list:
+#
+# - a Script, ShowText, Comment or SetMoveRoute command is merged with the continuation commands
+#   that follow it, and for the first three the text of all of them is collected in `lines`;
+# - a ConditionalBranch, ShowChoices or Loop command has as its children the blocks in its body,
+#   followed by a block for each of its other arms (Else, ShowChoicesWhenChoice,
+#   ShowChoicesWhenCancel), which has the blocks in that arm's body as its children in turn, and
+#   finally a block for the command that closes it (ConditionalBranchEnd, ShowChoicesBranchEnd,
+#   RepeatAbove);
+# - any other command is a block on its own.
+#
+# So walking the tree in pre-order visits the blocks in the order of the list.
+
+# code of the first command -> (code of the continuation commands, name of the text attribute)
+CONTINUATIONS = {
+    101: (401, 'text'), # ShowText, ContinueShowText
+    108: (408, 'text'), # Comment, ContinueComment
+    209: (509, None), # SetMoveRoute, ContinueSetMoveRoute
+    355: (655, 'line'), # Script, ContinueScript
+}
+
+# code of the first command -> (codes of the commands starting the other arms, code of the command
+# closing the structure)
+STRUCTURES = {
+    102: ({402, 403}, 404), # ShowChoices
+    111: ({411}, 412), # ConditionalBranch
+    112: (set(), 413), # Loop
+}
+
+@dataclass
+class Block:
+    command: EventCommand # the first command
+    start: int # the position of the first command in the list
+    end: int # the position just past the last command in the list (including those of children)
+    lines: list[str] = field(default_factory=list)
+    children: list['Block'] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+    def walk(self) -> Iterator['Block']:
+        yield self
+        for child in self.children: yield from child.walk()
+
+    def arms(self) -> list['Block']:
+        """For a ConditionalBranch, ShowChoices or Loop block, return the blocks of its arms other
+        than the first, whose body is this block's children up to the first of these."""
+        structure = STRUCTURES.get(self.command.code)
+        if structure is None: return []
+        arm_codes, _ = structure
+        return [child for child in self.children if child.command.code in arm_codes]
+
+    def closing(self) -> Optional['Block']:
+        """For a ConditionalBranch, ShowChoices or Loop block, return the block of the command that
+        closes it, if there is one."""
+        structure = STRUCTURES.get(self.command.code)
+
+        if structure is not None and self.children:
+            _, end_code = structure
+            last = self.children[-1]
+            if last.command.code == end_code: return last
+
+        return None
+
+def walk(blocks: list[Block]) -> Iterator[Block]:
+    """Yield all the blocks in the given list and their descendants, in command list order."""
+    for block in blocks: yield from block.walk()
+
+def parse(commands: list[EventCommand]) -> list[Block]:
+    blocks, _ = parse_blocks(commands, 0, 0)
+    return blocks
+
+def parse_blocks(commands: list[EventCommand], i: int, indent: int) -> tuple[list[Block], int]:
+    # Parse blocks starting from position i until reaching a command with a lower indent than the
+    # given one, and return them with the position of that command.
+    blocks = []
+
+    while i < len(commands) and commands[i].indent >= indent:
+        block, i = parse_block(commands, i)
+        blocks.append(block)
+
+    return blocks, i
+
+def parse_block(commands: list[EventCommand], i: int) -> tuple[Block, int]:
+    command = commands[i]
+    block = Block(command, i, i + 1)
+    continuation = CONTINUATIONS.get(command.code)
+
+    if continuation is not None:
+        continuation_code, text_attr = continuation
+        j = i + 1
+
+        while j < len(commands) and commands[j].code == continuation_code:
+            j += 1
+
+        if text_attr is not None:
+            block.lines = [getattr(cmd, text_attr) for cmd in commands[i:j]]
+
+        block.end = j
+        return block, j
+
+    block.children, j = parse_blocks(commands, i + 1, command.indent + 1)
+    structure = STRUCTURES.get(command.code)
+
+    if structure is not None:
+        arm_codes, end_code = structure
+
+        while (
+            j < len(commands) and commands[j].indent == command.indent
+            and commands[j].code in arm_codes
+        ):
+            arm, j = parse_block(commands, j)
+            block.children.append(arm)
+
+        if (
+            j < len(commands) and commands[j].indent == command.indent
+            and commands[j].code == end_code
+        ):
+            block.children.append(Block(commands[j], j, j + 1))
+            j += 1
+
+    block.end = j
+    return block, j
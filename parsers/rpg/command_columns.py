@@ -0,0 +1,298 @@
+import array
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Iterator, Optional
+import numpy as np
+
+from parsers import marshal
+from parsers.rpg.basic import *
+from parsers.rpg.move_route import *
+from parsers.rpg.event_command import *
+from parsers.rpg.map import Map
+from reborndb import settings
+
+# A columnar ("struct of arrays") alternative to decoding event commands into `EventCommand`
+# objects, for bulk analysis. Each command is a row in a set of numpy arrays, and its parameters
+# are stored in flat arrays alongside, with strings, audio files and anything more complicated kept
+# in pools which the parameter arrays index into. This makes it possible to filter the commands in
+# a map with vectorized masks, and only decode the `EventCommand` objects for the pages that are
+# actually of interest (see `CommandColumns.commands`).
+
+class ParamKind(Enum):
+    NIL = 0
+    INT = 1 # the value is the integer itself
+    BOOL = 2 # the value is 0 or 1
+    STRING = 3 # the value is an index into `strings`
+    AUDIO_FILE = 4 # the value is an index into `audio_files`
+    OTHER = 5 # the value is an index into `others`, which holds the refs of these parameters
+
+# The position of the subtype code in the parameters of the commands that have one.
+SUBCODE_POSITIONS = {111: 0, 122: 3, 204: 0}
+
+# How the objects that end up in the `others` pool are decoded, by class name. Objects of other
+# classes (there shouldn't be any) are left as refs.
+OTHER_DECODERS = {
+    'RPG::MoveRoute': MoveRoute.get,
+    'RPG::MoveCommand': MoveCommand.get,
+}
+
+@dataclass
+class CommandColumns:
+    """The event commands of a map, or of the common events, in columnar form.
+
+    Row i of the command arrays describes the i-th command overall; `index` is its position in its
+    page's command list. For common events, `event_id` is the common event's ID and `page` is
+    always 0. `subcode` is the branch type, operand type or map setting type for commands 111, 122
+    and 204, and -1 for other commands.
+
+    The parameters of command i are at positions `param_starts[i]` to `param_starts[i + 1]` of
+    `param_kinds` and `param_values`.
+    """
+
+    graph: marshal.MarshalGraph = field(repr=False)
+
+    event_id: np.ndarray
+    page: np.ndarray
+    index: np.ndarray
+    code: np.ndarray
+    subcode: np.ndarray
+    indent: np.ndarray
+
+    param_starts: np.ndarray
+    param_kinds: np.ndarray
+    param_values: np.ndarray
+
+    strings: list[str]
+    audio_files: list[AudioFile]
+    others: list[marshal.MarshalRef] # decoded on demand, by `decode_other`
+
+    # The ref of the command list for each (event ID, page) pair
+    list_refs: dict[tuple[int, int], marshal.MarshalRef] = field(repr=False)
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def mask(self, *codes: int) -> np.ndarray:
+        """Return a boolean array which is true for the commands with any of the given codes."""
+        return np.isin(self.code, codes)
+
+    def row_indices(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        # rows can be given as indices or as a boolean mask
+        if rows is None: return np.arange(len(self))
+        rows = np.asarray(rows)
+        return np.flatnonzero(rows) if rows.dtype == bool else rows
+
+    def param_counts(self) -> np.ndarray:
+        return np.diff(self.param_starts)
+
+    def param_column(
+        self, n: int, rows: Optional[np.ndarray]=None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the kinds and values of the n-th parameter of each of the given rows (as indices
+        or a mask; by default, all of them). For rows with no n-th parameter, the kind is -1."""
+
+        rows = self.row_indices(rows)
+
+        if len(self.param_kinds) == 0:
+            return np.full(len(rows), -1, dtype=np.int8), np.zeros(len(rows), dtype=np.int64)
+
+        positions = self.param_starts[rows] + n
+        present = positions < self.param_starts[rows + 1]
+        safe_positions = np.where(present, positions, 0)
+        kinds = np.where(present, self.param_kinds[safe_positions], -1).astype(np.int8)
+        values = np.where(present, self.param_values[safe_positions], 0)
+        return kinds, values
+
+    def decode_param(self, kind: int, value: int) -> Any:
+        match ParamKind(kind):
+            case ParamKind.NIL: return None
+            case ParamKind.INT: return int(value)
+            case ParamKind.BOOL: return bool(value)
+            case ParamKind.STRING: return self.strings[value]
+            case ParamKind.AUDIO_FILE: return self.audio_files[value]
+            case ParamKind.OTHER: return self.decode_other(self.others[value])
+
+    def decode_other(self, ref: marshal.MarshalRef) -> Any:
+        graph = self.graph
+        vertex = graph[ref]
+
+        if isinstance(vertex, marshal.MarshalRegObj):
+            decoder = OTHER_DECODERS.get(marshal.get_symbol(graph, vertex.cls))
+            return ref if decoder is None else decoder(graph, ref)
+
+        if isinstance(vertex, marshal.MarshalUserData):
+            return bytes(vertex.data) # Tone or Color
+
+        if isinstance(vertex, marshal.MarshalArray):
+            return marshal.get_array(graph, ref, marshal.get_atom) # the choices for Show Choices
+
+        return marshal.get_atom(graph, ref)
+
+    def params(self, row: int) -> list[Any]:
+        start, end = self.param_starts[row], self.param_starts[row + 1]
+
+        return [
+            self.decode_param(kind, value)
+            for kind, value in zip(self.param_kinds[start:end], self.param_values[start:end])
+        ]
+
+    def pages(self, rows: Optional[np.ndarray]=None) -> list[tuple[int, int]]:
+        """Return the distinct (event ID, page) pairs of the given rows (by default, all of them),
+        in the order they first appear."""
+        rows = self.row_indices(rows)
+        return list(dict.fromkeys(zip(self.event_id[rows].tolist(), self.page[rows].tolist())))
+
+    def commands(self, event_id: int, page: int=0) -> list[EventCommand]:
+        """Decode the command list of the given page as ordinary `EventCommand` objects."""
+        list_ref = self.list_refs[event_id, page]
+        return marshal.get_array(self.graph, list_ref, EventCommand.get)
+
+    @classmethod
+    def from_lists(
+        cls, graph: marshal.MarshalGraph,
+        list_refs: Iterator[tuple[int, int, marshal.MarshalRef]]
+    ) -> 'CommandColumns':
+        """Build the columns from the command lists at the given refs, each given along with the
+        event ID and page it belongs to."""
+        builder = CommandColumnsBuilder(graph)
+        for event_id, page, list_ref in list_refs: builder.add_list(event_id, page, list_ref)
+        return builder.build()
+
+    @classmethod
+    def from_map(cls, graph: marshal.MarshalGraph) -> 'CommandColumns':
+        def list_refs():
+            map_vars = marshal.get_inst_vars(graph, graph.root_ref())
+            events = marshal.get_hash(graph, map_vars['@events'], marshal.get_fixnum)
+
+            for event_id, event_ref in events.items():
+                event_vars = marshal.get_inst_vars(graph, event_ref)
+                page_refs = marshal.get_array(graph, event_vars['@pages'])
+
+                for page, page_ref in enumerate(page_refs):
+                    yield event_id, page, marshal.get_inst_vars(graph, page_ref)['@list']
+
+        return cls.from_lists(graph, list_refs())
+
+    @classmethod
+    def from_common_events(cls, graph: marshal.MarshalGraph) -> 'CommandColumns':
+        def list_refs():
+            for ref in marshal.get_array(graph, graph.root_ref())[1:]:
+                inst_vars = marshal.get_inst_vars(graph, ref)
+                yield marshal.get_fixnum(graph, inst_vars['@id']), 0, inst_vars['@list']
+
+        return cls.from_lists(graph, list_refs())
+
+class CommandColumnsBuilder:
+    def __init__(self, graph: marshal.MarshalGraph) -> None:
+        self.graph = graph
+        # event_id, page, index, code, subcode, indent
+        self.rows = [array.array('l') for _ in range(6)]
+        self.param_starts = array.array('l', [0])
+        self.param_kinds = bytearray()
+        self.param_values = array.array('q')
+        self.strings = []
+        self.string_indices = {}
+        self.audio_files = []
+        self.audio_file_indices = {}
+        self.others = []
+        self.list_refs = {}
+
+    def add_list(self, event_id: int, page: int, list_ref: marshal.MarshalRef) -> None:
+        graph = self.graph
+        event_ids, pages, indices, codes, subcodes, indents = self.rows
+        param_kinds = self.param_kinds
+        param_values = self.param_values
+        get_values = EventCommand.decoder.get_values
+        self.list_refs[event_id, page] = list_ref
+
+        for index, ref in enumerate(marshal.get_array(graph, list_ref)):
+            code, indent, arg_refs = get_values(graph, ref)
+            params_start = len(param_kinds)
+            for arg_ref in arg_refs: self.add_param(arg_ref)
+
+            subcode = -1
+            position = SUBCODE_POSITIONS.get(code)
+
+            if (
+                position is not None and position < len(arg_refs)
+                and param_kinds[params_start + position] == ParamKind.INT.value
+            ):
+                subcode = param_values[params_start + position]
+
+            event_ids.append(event_id)
+            pages.append(page)
+            indices.append(index)
+            codes.append(code)
+            subcodes.append(subcode)
+            indents.append(indent)
+            self.param_starts.append(len(param_kinds))
+
+    def add_param(self, ref: marshal.MarshalRef) -> None:
+        graph = self.graph
+        vertex = graph[ref]
+
+        if isinstance(vertex, marshal.RubyFixnum):
+            kind, value = ParamKind.INT, vertex.value
+        elif vertex is marshal.RUBY_NIL:
+            kind, value = ParamKind.NIL, 0
+        elif vertex is marshal.RUBY_TRUE or vertex is marshal.RUBY_FALSE:
+            kind, value = ParamKind.BOOL, int(vertex is marshal.RUBY_TRUE)
+        elif isinstance(vertex, marshal.RubyString):
+            kind, value = ParamKind.STRING, self.intern(
+                marshal.get_string(graph, ref), self.strings, self.string_indices
+            )
+        elif (
+            isinstance(vertex, marshal.MarshalRegObj)
+            and marshal.get_symbol(graph, vertex.cls) == 'RPG::AudioFile'
+        ):
+            audio_file = AudioFile.get(graph, ref)
+            key = audio_file.name, audio_file.volume, audio_file.pitch
+
+            kind, value = ParamKind.AUDIO_FILE, self.intern(
+                audio_file, self.audio_files, self.audio_file_indices, key
+            )
+        else:
+            kind, value = ParamKind.OTHER, len(self.others)
+            self.others.append(ref)
+
+        self.param_kinds.append(kind.value)
+        self.param_values.append(value)
+
+    def intern(self, item: Any, pool: list[Any], indices: dict[Any, int], key: Any=None) -> int:
+        if key is None: key = item
+
+        try:
+            return indices[key]
+        except KeyError:
+            index = indices[key] = len(pool)
+            pool.append(item)
+            return index
+
+    def build(self) -> CommandColumns:
+        event_ids, pages, indices, codes, subcodes, indents = self.rows
+
+        return CommandColumns(
+            self.graph,
+            np.array(event_ids, dtype=np.int32), np.array(pages, dtype=np.int16),
+            np.array(indices, dtype=np.int32), np.array(codes, dtype=np.int16),
+            np.array(subcodes, dtype=np.int16), np.array(indents, dtype=np.int16),
+            np.array(self.param_starts, dtype=np.int64),
+            np.frombuffer(self.param_kinds, dtype=np.int8).copy(),
+            np.array(self.param_values, dtype=np.int64),
+            self.strings, self.audio_files, self.others, self.list_refs
+        )
+
+def load_map(map_id: int) -> CommandColumns:
+    path = settings.REBORN_DATA_PATH / f'Map{map_id:03}.rxdata'
+    graph = marshal.load_file_cached(str(path), settings.MARSHAL_CACHE_PATH).graph
+    return CommandColumns.from_map(graph)
+
+def load_all_maps() -> Iterator[tuple[int, CommandColumns]]:
+    # the maps are parsed and turned into columns in worker processes, so that this doesn't hold
+    # the GIL while other extractors run (see `Map.load_all_parallel`)
+    return Map.load_all_parallel(load=load_map)
+
+def load_common_events() -> CommandColumns:
+    path = settings.REBORN_DATA_PATH / 'CommonEvents.rxdata'
+    graph = marshal.load_file_cached(str(path), settings.MARSHAL_CACHE_PATH).graph
+    return CommandColumns.from_common_events(graph)
@@ -1,9 +1,10 @@
 from dataclasses import dataclass
-from functools import partial
+from functools import cached_property, partial
 from parsers import marshal
-from reborndb import settings
+from parsers.rpg.registry import GAME_DATA
 from parsers.rpg.basic import *
 from parsers.rpg.event_command import *
+from parsers.rpg import block_tree
 
 @dataclass
 class CommonEvent:
@@ -26,25 +27,20 @@ class CommonEvent:
             'list': partial(marshal.get_array, callback=EventCommand.get)
         })
 
-_common_events = None
+    @cached_property
+    def blocks(self) -> list[block_tree.Block]:
+        return block_tree.parse(self.list_)
 
-def load():
-    global _common_events
-
-    if _common_events is None:
-        _common_events = []
+def decode(graph):
+    refs = marshal.get_array(graph, graph.root_ref())
 
-        graph = marshal.load_file(settings.REBORN_DATA_PATH / 'CommonEvents.rxdata').graph
-        refs = marshal.get_array(graph, graph.root_ref())
+    if not graph[refs[0]] == marshal.RUBY_NIL:
+        raise ValueError(f'expected first element of common events array to be nil')
 
-        if not graph[refs[0]] == marshal.RUBY_NIL:
-            raise ValueError(f'expected first element of common events array to be nil')
+    return [CommonEvent.get(graph, ref) for ref in refs[1:]]
 
-        for ref in refs[1:]:
-            event = CommonEvent.get(graph, ref)
-            _common_events.append(event)
-
-    return _common_events
+def load():
+    return GAME_DATA.get('common_events')
 
 def lookup(id_: int):
     common_events = load()
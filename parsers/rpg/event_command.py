@@ -20,26 +20,26 @@ class EventCommand(ABC):
         *arg_refs: marshal.MarshalRef, **kwargs: Any
     ) -> Type[T]:
     
-        def cls(**inst_vars: Any) -> Type['EventCommand']:
-            code = inst_vars.pop('code')
-            
-            try:
-                command_type = COMMAND_TYPES[code]
-            except KeyError:
-                raise ValueError(
-                    f'RPG::EventCommand object at ref {ref} has type code {code}, but this does '
-                    'not correspond to any recognized command type'
-                )
-                
-            command_type_name = command_type[0]
-            subclass = globals()[f'EventCommand_{command_type_name}']
-            arg_refs = inst_vars.pop('parameters')
-            return subclass.get(graph, ref, *arg_refs, **inst_vars)
-            
-        return marshal.get_inst(graph, ref, 'RPG::EventCommand', cls, {
-            'code': marshal.get_fixnum, 'indent': marshal.get_fixnum,
-            'parameters': marshal.get_array
-        })
+        code, indent, arg_refs = EventCommand.decoder.get_values(graph, ref)
+        decode = DECODERS[code] if 0 <= code < len(DECODERS) else None
+
+        if decode is None:
+            raise ValueError(
+                f'RPG::EventCommand object at ref {ref} has type code {code}, but this does '
+                'not correspond to any recognized command type'
+            )
+
+        command = decode(graph, ref, indent, arg_refs)
+        if command is not None: return command
+
+        # The arguments didn't fit. Go the slow way round, which will raise a more helpful error.
+        command_type_name = COMMAND_TYPES[code][0]
+        subclass = globals()[f'EventCommand_{command_type_name}']
+        return subclass.get(graph, ref, *arg_refs, indent=indent)
+
+EventCommand.decoder = marshal.compile_inst('RPG::EventCommand', EventCommand, {
+    'code': marshal.get_fixnum, 'indent': marshal.get_fixnum, 'parameters': marshal.get_array
+})
      
 COMMAND_TYPES = {
     0: ('Blank',),
@@ -115,12 +115,12 @@ COMMAND_TYPES = {
     222: ('ExecuteTransition', ('name', marshal.get_string)),
     223: (
         'ChangeScreenColorTone',
-        ('tone', partial(marshal.get_user_data, class_name='Tone')),
+        ('tone', partial(get_user_data_bytes, class_name='Tone')),
         ('duration', marshal.get_fixnum) # units = frames / 2
     ),
     224: (
         'ScreenFlash',
-        ('color', partial(marshal.get_user_data, class_name='Color')),
+        ('color', partial(get_user_data_bytes, class_name='Color')),
         ('duration', marshal.get_fixnum) # units = frames / 2
     ),
     225: (
@@ -212,7 +212,12 @@ for code, (name, *params_with_lookups) in COMMAND_TYPES.items():
         
     globals()[full_name] = make_dataclass(
         full_name, params_with_types, bases=(EventCommand,),
-        namespace={'code': code, 'short_type_name': name, 'get': make_getter(params_with_lookups)}
+        namespace={
+            # the class would otherwise be attributed to the `abc` module, since `EventCommand`'s
+            # metaclass is `ABCMeta`, and so couldn't be pickled
+            '__module__': __name__,
+            'code': code, 'short_type_name': name, 'get': make_getter(params_with_lookups)
+        }
     )
 
 @dataclass
@@ -299,6 +304,7 @@ for subcode, (name, *params_with_lookups) in CONDITIONAL_BRANCH_TYPES.items():
     globals()[full_name] = make_dataclass(
         full_name, params_with_types, bases=(EventCommand_ConditionalBranch,),
         namespace={
+            '__module__': __name__,
             'subcode': subcode, 'short_subtype_name': name,
             'get': make_conditionalbranch_getter(params_with_lookups)
         }
@@ -389,6 +395,7 @@ for subcode, (name, *params_with_lookups) in OPERAND_TYPES.items():
     globals()[full_name] = make_dataclass(
         full_name, params_with_types, bases=(EventCommand_ControlVariables,),
         namespace={
+            '__module__': __name__,
             'operand_type_code': subcode, 'operand_type_name': name,
             'get': make_controlvariables_getter(params_with_lookups)
         }
@@ -471,6 +478,7 @@ for subcode, (name, *params_with_lookups) in MAP_SETTING_TYPES.items():
     globals()[full_name] = make_dataclass(
         full_name, params_with_types, bases=(EventCommand_ChangeMapSettings,),
         namespace={
+            '__module__': __name__,
             'setting_type_code': subcode, 'setting_type_name': name,
             'get': make_changemapsettings_getter(params_with_lookups)
         }
@@ -492,4 +500,62 @@ for cmdtype_code, cmdtype in OPERAND_TYPES.items():
 
 for cmdtype_code, cmdtype in MAP_SETTING_TYPES.items():
     cmdtype_name, *params = cmdtype
-    COMMAND_TYPES_AND_SUBTYPES[204, cmdtype_code] = 'ChangeMapSettings', cmdtype_name, *params
\ No newline at end of file
+    COMMAND_TYPES_AND_SUBTYPES[204, cmdtype_code] = 'ChangeMapSettings', cmdtype_name, *params
+
+# A table of decoders, indexed by command code, used by `EventCommand.get` so that it doesn't have
+# to look up the command type, find the subclass and check the arguments against the parameter list
+# afresh for each command. Each decoder takes the graph, the command's ref, its indent and its
+# argument refs, and returns the command, or None if the arguments don't fit its type.
+#
+# Commands with subtypes (111, 122 and 204) get a decoder which reads the subtype code and then
+# hands over to the decoder for the subtype. The subclasses' fields are the indent, followed by the
+# fields for any arguments before the subtype code, followed by the parameters of the subtype, so
+# they can be constructed positionally.
+
+def compile_decoder(subclass, params_with_lookups):
+    lookups = [lookup for _, lookup in params_with_lookups]
+    param_count = len(lookups)
+
+    def decode(graph, ref, indent, arg_refs, *prefix):
+        if len(arg_refs) != param_count: return None
+
+        return subclass(indent, *prefix, *[
+            lookup(graph, arg_ref) for lookup, arg_ref in zip(lookups, arg_refs)
+        ])
+
+    return decode
+
+def compile_subtype_decoder(subclass_prefix, subtypes, prefix_lookups=()):
+    decoders = {
+        subcode: compile_decoder(globals()[f'{subclass_prefix}_{name}'], params_with_lookups)
+        for subcode, (name, *params_with_lookups) in subtypes.items()
+    }
+
+    prefix_count = len(prefix_lookups)
+
+    def decode(graph, ref, indent, arg_refs):
+        if len(arg_refs) <= prefix_count: return None
+        subtype_decode = decoders.get(marshal.get_fixnum(graph, arg_refs[prefix_count]))
+        if subtype_decode is None: return None
+
+        return subtype_decode(graph, ref, indent, arg_refs[prefix_count + 1:], *[
+            lookup(graph, arg_ref) for lookup, arg_ref in zip(prefix_lookups, arg_refs)
+        ])
+
+    return decode
+
+DECODERS = [None] * (max(COMMAND_TYPES) + 1)
+
+for code, (name, *params_with_lookups) in COMMAND_TYPES.items():
+    DECODERS[code] = compile_decoder(globals()[f'EventCommand_{name}'], params_with_lookups)
+
+DECODERS[111] = compile_subtype_decoder(
+    'EventCommand_ConditionalBranch', CONDITIONAL_BRANCH_TYPES
+)
+
+DECODERS[122] = compile_subtype_decoder(
+    'EventCommand_ControlVariables', OPERAND_TYPES,
+    (marshal.get_fixnum, marshal.get_fixnum, AssignType.get)
+)
+
+DECODERS[204] = compile_subtype_decoder('EventCommand_ChangeMapSettings', MAP_SETTING_TYPES)
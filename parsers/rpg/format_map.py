@@ -2,10 +2,9 @@ from dataclasses import fields
 from enum import Enum
 import io
 import parsers.rpg.map as rpg
+from parsers.rpg import block_tree
 from parsers.rpg import system
 
-SYSTEM = system.load()
-
 class Printer:
     def __init__(self):
         self.stream = io.StringIO()
@@ -17,10 +16,10 @@ class Printer:
         return ['off', 'on'][value]
 
     def format_var(self, id_):
-        return f'[{id_}:{SYSTEM.variable_name(id_)}]'
+        return f'[{id_}:{system.load().variable_name(id_)}]'
 
     def format_switch(self, id_):
-        return f'[{id_}:{SYSTEM.switch_name(id_)}]'
+        return f'[{id_}:{system.load().switch_name(id_)}]'
 
     def format_enum(self, val):
         return val.name.lower()
@@ -84,6 +83,17 @@ class Printer:
 
             self.print('Character {} [{}]'.format(graphic.character_name, ', '.join(parts)))
 
+    def print_blocks(self, blocks: list[block_tree.Block]):
+        # A command and its continuation commands are printed together, with the continuation
+        # commands' text on the lines after
+        for block in block_tree.walk(blocks):
+            indent = ' ' * block.command.indent
+            numbers = str(block.start) if block.end - block.start == 1 else f'{block.start}-{block.end - 1}'
+            self.print(f'{indent}{numbers} {self.format_cmd(block.command)}')
+
+            for line in block.lines[1:]:
+                self.print(f'{indent}  | {line}')
+
     def print_map(self, m: rpg.Map):
         self.print(f'Tileset ID: {m.tileset_id}')
         self.print(f'Dimensions: {m.width} x {m.height}')
@@ -126,9 +136,7 @@ class Printer:
                 if page.list_:
                     self.print('Commands:')
 
-                    for command_number, command in enumerate(page.list_):
-                        indent = ' ' * command.indent
-                        self.print(f'{indent}{command_number} {self.format_cmd(command)}')
+                    self.print_blocks(page.blocks)
                 else:
                     self.print('No commands')
 
@@ -1,7 +1,11 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 import itertools as it
-from functools import partial
+from functools import cached_property, partial
+import multiprocessing
+import os
 from typing import Any, Optional, Type, TypeVar
 from typing import get_args as type_get_args
 
@@ -9,6 +13,7 @@ from parsers import marshal
 from parsers.rpg.basic import *
 from parsers.rpg.move_route import *
 from parsers.rpg.event_command import *
+from parsers.rpg import block_tree
 from reborndb import settings
 
 T = TypeVar('T')
@@ -27,14 +32,18 @@ class EventPageCondition:
     
     @classmethod
     def get(cls: Type[T], graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> Type[T]:
-        return marshal.get_inst(graph, ref, 'RPG::Event::Page::Condition', cls, {
-            'switch1_valid': marshal.get_bool, 'switch2_valid': marshal.get_bool,
-            'variable_valid': marshal.get_bool, 'self_switch_valid': marshal.get_bool,
-            'switch1_id': marshal.get_fixnum, 'switch2_id': marshal.get_fixnum,
-            'variable_id': marshal.get_fixnum, 'variable_value': marshal.get_fixnum,
-            'self_switch_ch': SelfSwitchName.get,
-        })
-        
+        return cls.decoder(graph, ref)
+
+EventPageCondition.decoder = marshal.compile_inst(
+    'RPG::Event::Page::Condition', EventPageCondition, {
+        'switch1_valid': marshal.get_bool, 'switch2_valid': marshal.get_bool,
+        'variable_valid': marshal.get_bool, 'self_switch_valid': marshal.get_bool,
+        'switch1_id': marshal.get_fixnum, 'switch2_id': marshal.get_fixnum,
+        'variable_id': marshal.get_fixnum, 'variable_value': marshal.get_fixnum,
+        'self_switch_ch': SelfSwitchName.get,
+    }
+)
+
 @dataclass
 class EventPageGraphic:
     tile_id: int
@@ -47,12 +56,14 @@ class EventPageGraphic:
     
     @classmethod
     def get(cls: Type[T], graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> Type[T]:
-        return marshal.get_inst(graph, ref, 'RPG::Event::Page::Graphic', cls, {
-            'tile_id': marshal.get_fixnum, 'character_name': marshal.get_string,
-            'character_hue': marshal.get_fixnum, 'direction': Direction.get,
-            'pattern': marshal.get_fixnum, 'opacity': marshal.get_fixnum,
-            'blend_type': marshal.get_fixnum
-        })
+        return cls.decoder(graph, ref)
+
+EventPageGraphic.decoder = marshal.compile_inst('RPG::Event::Page::Graphic', EventPageGraphic, {
+    'tile_id': marshal.get_fixnum, 'character_name': marshal.get_string,
+    'character_hue': marshal.get_fixnum, 'direction': Direction.get,
+    'pattern': marshal.get_fixnum, 'opacity': marshal.get_fixnum,
+    'blend_type': marshal.get_fixnum
+})
     
 @dataclass
 class EventPage:
@@ -76,19 +87,21 @@ class EventPage:
     
     @classmethod
     def get(cls, graph, ref):
-        def cls2(**inst_vars):
-            inst_vars['list_'] = inst_vars.pop('list')
-            return cls(**inst_vars)
-            
-        return marshal.get_inst(graph, ref, 'RPG::Event::Page', cls2, {
-            'condition': EventPageCondition.get, 'graphic': EventPageGraphic.get,
-            'move_type': MoveType.get, 'move_speed': MoveSpeed.get,
-            'move_frequency': MoveFrequency.get, 'move_route': MoveRoute.get,
-            'walk_anime': marshal.get_bool, 'step_anime': marshal.get_bool,
-            'direction_fix': marshal.get_bool, 'through': marshal.get_bool,
-            'always_on_top': marshal.get_bool, 'trigger': EventPageTrigger.get,
-            'list': partial(marshal.get_array, callback=EventCommand.get)
-        })
+        return cls.decoder(graph, ref)
+
+    @cached_property
+    def blocks(self) -> list[block_tree.Block]:
+        return block_tree.parse(self.list_)
+
+EventPage.decoder = marshal.compile_inst('RPG::Event::Page', EventPage, {
+    'condition': EventPageCondition.get, 'graphic': EventPageGraphic.get,
+    'move_type': MoveType.get, 'move_speed': MoveSpeed.get,
+    'move_frequency': MoveFrequency.get, 'move_route': MoveRoute.get,
+    'walk_anime': marshal.get_bool, 'step_anime': marshal.get_bool,
+    'direction_fix': marshal.get_bool, 'through': marshal.get_bool,
+    'always_on_top': marshal.get_bool, 'trigger': EventPageTrigger.get,
+    'list': partial(marshal.get_array, callback=EventCommand.get)
+}, renames={'list': 'list_'})
         
 @dataclass
 class Event:
@@ -100,15 +113,13 @@ class Event:
     
     @classmethod
     def get(cls, graph, ref):
-        def cls2(**inst_vars):
-            inst_vars['id_'] = inst_vars.pop('id')
-            return cls(**inst_vars)
-                    
-        return marshal.get_inst(graph, ref, 'RPG::Event', cls2, {
-            'id': marshal.get_fixnum, 'name': marshal.get_string,
-            'x': marshal.get_fixnum, 'y': marshal.get_fixnum,
-            'pages': partial(marshal.get_array, callback=EventPage.get)
-        })
+        return cls.decoder(graph, ref)
+
+Event.decoder = marshal.compile_inst('RPG::Event', Event, {
+    'id': marshal.get_fixnum, 'name': marshal.get_string,
+    'x': marshal.get_fixnum, 'y': marshal.get_fixnum,
+    'pages': partial(marshal.get_array, callback=EventPage.get)
+}, renames={'id': 'id_'})
     
 @dataclass
 class Map:
@@ -144,63 +155,115 @@ class Map:
     
     @classmethod
     def get(cls, graph, ref):
-        return marshal.get_inst(graph, ref, 'RPG::Map', cls, {
-            'tileset_id': marshal.get_fixnum,
-            'width': marshal.get_fixnum, 'height': marshal.get_fixnum, 
-            'autoplay_bgm': marshal.get_bool, 'bgm': AudioFile.get,
-            'autoplay_bgs': marshal.get_bool, 'bgs': AudioFile.get,
-            'encounter_list': partial(marshal.get_array, callback=lambda graph, ref: ref),
-            'encounter_step': marshal.get_fixnum,
-            'data': partial(Table.get, expected_dimcount=3),
-            'events': partial(
-                marshal.get_hash, key_callback=marshal.get_fixnum, value_callback=Event.get
-            )
-        })    
+        return cls.decoder(graph, ref)
         
+    @staticmethod
+    def path(map_id):
+        return settings.REBORN_DATA_PATH / f'Map{map_id:03}.rxdata'
+
     @classmethod
     def load(cls, map_id):
-        path = settings.REBORN_DATA_PATH / f'Map{map_id:03}.rxdata'
-        data = marshal.load_file(str(path))
+        data = marshal.load_file_cached(str(cls.path(map_id)), settings.MARSHAL_CACHE_PATH)
         return cls.get(data.graph, data.graph.root_ref())
 
     @classmethod
-    def load_all(cls):
-        for map_id in it.count(1):
+    def load_all(cls, map_ids=None):
+        """Yield the ID of each map and the map, for the given IDs, or by default for every map
+        (i.e. from 1 up to the first ID with no map file)."""
+
+        if map_ids is not None:
+            for map_id in map_ids: yield map_id, cls.load(map_id)
+            return
+
+        # (checking for the file rather than catching FileNotFoundError from `load`, so that any
+        # other missing file isn't mistaken for the end of the maps)
+        for map_id in it.takewhile(lambda map_id: cls.path(map_id).exists(), it.count(1)):
+            yield map_id, cls.load(map_id)
+
+    @classmethod
+    def load_all_parallel(cls, workers=None, prefetch=None, map_ids=None, load=None):
+        """Like `load_all`, but the maps are loaded by a pool of `workers` processes (by default,
+        `settings.MAP_LOAD_WORKERS`). They are still yielded in the same order. No more than
+        `prefetch` maps (by default, twice the number of workers) are loaded ahead of the one that
+        is to be yielded next, so memory use stays bounded if the caller is slower than the
+        workers.
+
+        If `load` is given, it's called with each map ID in the workers instead of `Map.load`, and
+        what it returns is yielded instead of the map, so that more of the work on each map can be
+        done there. It has to be a module-level function, so that it can be pickled.
+
+        The workers are started with the "spawn" method, not by forking, since this is called from
+        the extractor threads of `scripts.refresh_database`: a forked child gets copies of any locks
+        that other threads hold at the time (such as the database connection's), which then never
+        get released. So they see the settings as they are in `reborndb.settings`, not as changed
+        at runtime."""
+
+        if workers is None: workers = settings.MAP_LOAD_WORKERS
+        if not workers: workers = os.cpu_count() or 1
+        if prefetch is None: prefetch = 2 * workers
+        if load is None: load = cls.load
+
+        # a missing map file marks the end of the maps only if we weren't given the IDs
+        if map_ids is None:
+            ids = it.takewhile(lambda map_id: cls.path(map_id).exists(), it.count(1))
+        else:
+            ids = iter(map_ids)
+
+        if workers == 1:
+            for map_id in ids: yield map_id, load(map_id)
+            return
+
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            pending = deque(
+                (map_id, executor.submit(load, map_id))
+                for map_id in it.islice(ids, max(prefetch, 1))
+            )
+
             try:
-                yield map_id, cls.load(map_id)
-            except FileNotFoundError:
-                return
+                while pending:
+                    map_id, future = pending.popleft()
+
+                    result = future.result()
+                    next_map_id = next(ids, None)
+
+                    if next_map_id is not None:
+                        pending.append((next_map_id, executor.submit(load, next_map_id)))
+
+                    yield map_id, result
+            finally:
+                for _, future in pending: future.cancel()
+
+Map.decoder = marshal.compile_inst('RPG::Map', Map, {
+    'tileset_id': marshal.get_fixnum,
+    'width': marshal.get_fixnum, 'height': marshal.get_fixnum, 
+    'autoplay_bgm': marshal.get_bool, 'bgm': AudioFile.get,
+    'autoplay_bgs': marshal.get_bool, 'bgs': AudioFile.get,
+    'encounter_list': partial(marshal.get_array, callback=lambda graph, ref: ref),
+    'encounter_step': marshal.get_fixnum,
+    'data': partial(Table.get, expected_dimcount=3, lazy=True),
+    'events': partial(
+        marshal.get_hash, key_callback=marshal.get_fixnum, value_callback=Event.get
+    )
+})
 
 if __name__ == '__main__':
     import sys
-    from PIL import Image
-    from parsers.rpg import tilesets
+    from parsers.rpg import map_image, tilesets
 
     if len(sys.argv) == 1:
         maps = Map.load_all()
     else:
         map_id = int(sys.argv[1])
         map_ = Map.load(map_id)
-
-        data = map_.data
         tileset = tilesets.lookup(map_.tileset_id)
-        tileset_img = Image.open(settings.REBORN_GRAPHICS_PATH / 'Tilesets' / f'{tileset.tileset_name}.png')
-
-        def split_image(img, width_per_part, height_per_part):
-            for y in range(0, img.height, height_per_part):
-                for x in range(0, img.width, width_per_part):
-                    cropped = img.crop((x, y, x + width_per_part, y + height_per_part))
-                    yield cropped
-
-        # we will solve autotiles... later
-        basictiles = list(split_image(tileset_img, 32, 32))
-        img = Image.new(tileset_img.mode, (data.width * 32, data.height * 32))
-
-        for z in range(data.depth):
-            for x in range(data.width):
-                for y in range(data.height):
-                    tile_id = data[x, y, z]
-
-                    if tile_id >= 384:
-                        tile = basictiles[tile_id - 384]
-                        img.paste(tile, (x * 32, y * 32), tile)
+        tileset_png = (settings.REBORN_GRAPHICS_PATH / 'Tilesets' / f'{tileset.tileset_name}.png').read_bytes()
+
+        autotile_pngs = {
+            index: (settings.REBORN_GRAPHICS_PATH / 'Autotiles' / f'{name}.png').read_bytes()
+            for index, name in enumerate(tileset.autotile_names) if name
+        }
+
+        atlas = map_image.load_atlas_cached(
+            f'Tileset{map_.tileset_id:03}', tileset_png, autotile_pngs, settings.ATLAS_CACHE_PATH
+        )
+        map_image.render_image(map_.data.array, atlas).save(f'Map{map_id:03}.png')
@@ -0,0 +1,180 @@
+import hashlib
+import io
+from pathlib import Path
+from typing import Mapping, Optional
+import numpy as np
+from PIL import Image
+from parsers import marshal
+
+# Renders maps as images, by compositing their tiles. Each tileset is turned into an "atlas": an
+# array of shape (number of tile IDs, 32, 32, 4) giving the RGBA pixels of the tile with each ID,
+# so that all the tiles of a layer of a map can be looked up at once by indexing the atlas with the
+# layer's tile IDs.
+#
+# The first 384 tile IDs are for autotiles, 48 for each of 8 autotiles, of which the first is
+# always blank and the other 7 are given by the tileset's autotile names. The rest are the tiles of
+# the tileset file, left-to-right, top-to-bottom. So tile ID 0 is always blank, and it's used for
+# tile IDs that are out of range too.
+
+TILE_SIZE = 32
+AUTOTILE_VARIANTS = 48
+AUTOTILE_IDS = 8 * AUTOTILE_VARIANTS
+
+def image_tiles(image: Image.Image) -> np.ndarray:
+    """Split an image into 32 x 32 tiles, left-to-right, top-to-bottom, returning them as an array
+    of shape (number of tiles, 32, 32, 4). If the image's size isn't a multiple of 32 then the
+    tiles at the edges are padded with transparent pixels."""
+
+    pixels = np.asarray(image.convert('RGBA'))
+    rows = -(-pixels.shape[0] // TILE_SIZE)
+    cols = -(-pixels.shape[1] // TILE_SIZE)
+
+    padded = np.zeros((rows * TILE_SIZE, cols * TILE_SIZE, 4), dtype=np.uint8)
+    padded[:pixels.shape[0], :pixels.shape[1]] = pixels
+
+    return (
+        padded.reshape(rows, TILE_SIZE, cols, TILE_SIZE, 4)
+        .transpose(0, 2, 1, 3, 4)
+        .reshape(-1, TILE_SIZE, TILE_SIZE, 4)
+    )
+
+def autotile_tile(image: Image.Image) -> np.ndarray:
+    # At the moment we don't understand how autotiles work exactly (the 48 variants are pieced
+    # together from parts of the autotile file), so we're just going to choose one arbitrarily and
+    # use it for all of them.
+    #
+    # todo: perhaps the order of the autotile variants in the image here:
+    # https://forums.rpgmakerweb.com/index.php?threads/some-tricks-to-optimize-the-autotile-slots.138589/
+    # is a clue?
+    if image.height == 32:
+        box = (0, 0, 32, 32)
+    elif image.height == 128:
+        box = (32, 64, 64, 96)
+    else:
+        raise ValueError(f'unexpected autotile image height {image.height}')
+
+    return np.asarray(image.convert('RGBA').crop(box))
+
+def tileset_atlas(
+    tileset_image: Image.Image, autotile_images: Mapping[int, Image.Image]
+) -> np.ndarray:
+    """Build the atlas for a tileset, given the image of its tileset file and the images of its
+    autotiles, keyed by their index in the tileset's autotile names (0 to 6)."""
+
+    tiles = image_tiles(tileset_image)
+    atlas = np.zeros((AUTOTILE_IDS + len(tiles), TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    atlas[AUTOTILE_IDS:] = tiles
+
+    for index, image in autotile_images.items():
+        start = (index + 1) * AUTOTILE_VARIANTS
+        atlas[start:start + AUTOTILE_VARIANTS] = autotile_tile(image)
+
+    return atlas
+
+# The version of the format of the atlases cached by `load_atlas_cached`. This should be bumped
+# whenever anything changes about the atlases that `tileset_atlas` produces, so that existing cache
+# entries are no longer used.
+ATLAS_CACHE_VERSION = 1
+
+def load_atlas_cached(
+    name: str, tileset_png: bytes, autotile_pngs: Mapping[int, bytes],
+    cache_dir: Optional[str | Path]
+) -> np.ndarray:
+    """Build the atlas for a tileset as `tileset_atlas` does, given the contents of its image files,
+    or memory-map it from `cache_dir` if it was built from the same files before. Entries are
+    `.npy` files named after `name` (which should identify the tileset) and a hash of the files,
+    and are written with `marshal.write_cache_entry`, which also drops the entry for the tileset's
+    previous files.
+
+    If `cache_dir` is None, the atlas is just built without caching."""
+
+    def build():
+        return tileset_atlas(
+            Image.open(io.BytesIO(tileset_png)),
+            {index: Image.open(io.BytesIO(png)) for index, png in autotile_pngs.items()}
+        )
+
+    if cache_dir is None:
+        return build()
+
+    # each file is prefixed with its index and length, so that different sets of files can't hash
+    # the same
+    hash_ = hashlib.blake2b(digest_size=16)
+    hash_.update(f'tileset:{len(tileset_png)}:'.encode())
+    hash_.update(tileset_png)
+
+    for index, png in sorted(autotile_pngs.items()):
+        hash_.update(f'autotile{index}:{len(png)}:'.encode())
+        hash_.update(png)
+
+    prefix = name + '.'
+    entry_name = f'{prefix}{ATLAS_CACHE_VERSION}.{hash_.hexdigest()}.npy'
+
+    try:
+        return np.load(Path(cache_dir) / entry_name, mmap_mode='r')
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        print(f'WARNING: ignoring unreadable cache entry {entry_name}: {e}')
+
+    atlas = build()
+    marshal.write_cache_entry(
+        cache_dir, prefix, entry_name, lambda f: np.save(f, atlas, allow_pickle=False)
+    )
+    return atlas
+
+def blend(dst: np.ndarray, src: np.ndarray) -> np.ndarray:
+    """Alpha-blend arrays of RGBA pixels `src` on top of `dst`, in the same way as `Image.paste`
+    does when the pasted image is also used as the mask, i.e. each channel (alpha included) becomes
+    (src * alpha + dst * (255 - alpha)) / 255, rounded."""
+
+    # (the alpha is repeated for each channel rather than broadcast, which numpy does much faster
+    # over such a short last axis)
+    alpha = np.repeat(src[..., 3:], 4, axis=-1)
+    result = np.multiply(dst, 255 - alpha, dtype=np.uint16)
+    result += np.multiply(src, alpha, dtype=np.uint16)
+
+    # division by 255 with rounding, done as in PIL
+    result += 128
+    result += result >> 8
+    result >>= 8
+    return result.astype(np.uint8)
+
+def render(tile_ids: np.ndarray, atlas: np.ndarray) -> np.ndarray:
+    """Render a map, given its tile IDs (an array of shape (width, height, depth), as in a map's
+    `Table`) and its tileset's atlas, returning its RGBA pixels as an array of shape
+    (height * 32, width * 32, 4). The result is the same as pasting each tile in turn, layer by
+    layer, using the tile as the mask."""
+
+    width, height, depth = tile_ids.shape
+    alpha = atlas[..., 3]
+    opaque = (alpha == 255).all(axis=(1, 2))
+    blank = (alpha == 0).all(axis=(1, 2))
+    blank[0] = True
+
+    # (height, width, depth), so that indexing the tiles below with (y, x) pairs gives rows of
+    # tiles in the same order as the pixels
+    ids = tile_ids.transpose(1, 0, 2)
+    ids = np.where((ids >= 0) & (ids < len(atlas)), ids, 0)
+    tiles = np.zeros((height, width, TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+
+    for z in range(depth):
+        layer = ids[:, :, z]
+
+        # Opaque tiles simply replace what's beneath them, and blank tiles leave it as it is, so
+        # only the tiles in between have to be blended.
+        ys, xs = np.nonzero(opaque[layer])
+        tiles[ys, xs] = atlas[layer[ys, xs]]
+
+        ys, xs = np.nonzero(~opaque[layer] & ~blank[layer])
+        tiles[ys, xs] = blend(tiles[ys, xs], atlas[layer[ys, xs]])
+
+    return tiles.transpose(0, 2, 1, 3, 4).reshape(height * TILE_SIZE, width * TILE_SIZE, 4)
+
+def render_layers(tile_ids: np.ndarray, atlas: np.ndarray) -> np.ndarray:
+    """Render each layer of a map separately, returning an array of shape (depth, height * 32,
+    width * 32, 4)."""
+    return np.stack([render(tile_ids[:, :, z:z + 1], atlas) for z in range(tile_ids.shape[2])])
+
+def render_image(tile_ids: np.ndarray, atlas: np.ndarray) -> Image.Image:
+    return Image.fromarray(render(tile_ids, atlas), 'RGBA')
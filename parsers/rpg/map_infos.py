@@ -0,0 +1,34 @@
+from dataclasses import dataclass
+from parsers import marshal
+from parsers.rpg.registry import GAME_DATA
+
+@dataclass
+class MapInfo:
+    name: str
+    parent_id: int # 0 if the map is at the top level
+    order: int # the position of the map in the editor's map tree
+    expanded: bool # whether the map's children are shown in the editor's map tree
+    scroll_x: int
+    scroll_y: int
+
+    @classmethod
+    def get(cls, graph, ref):
+        return cls.decoder(graph, ref)
+
+MapInfo.decoder = marshal.compile_inst('RPG::MapInfo', MapInfo, {
+    'name': marshal.get_string, 'parent_id': marshal.get_fixnum,
+    'order': marshal.get_fixnum, 'expanded': marshal.get_bool,
+    'scroll_x': marshal.get_fixnum, 'scroll_y': marshal.get_fixnum
+})
+
+def decode(graph):
+    return marshal.get_hash(graph, graph.root_ref(), marshal.get_fixnum, MapInfo.get)
+
+def load() -> dict[int, MapInfo]:
+    return GAME_DATA.get('map_infos')
+
+def lookup(id_: int):
+    return load()[id_]
+
+if __name__ == '__main__':
+    map_infos = load()
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, make_dataclass
+from dataclasses import dataclass, fields, make_dataclass
 from functools import partial
 import inspect
 from typing import Any, Type, TypeVar
@@ -9,30 +9,30 @@ from parsers.rpg.basic import *
 
 T = TypeVar('T')
 
-@dataclass
+# Move commands are immutable, so that identical ones can share an instance (see
+# `MoveCommandCache`).
+@dataclass(frozen=True)
 class MoveCommand(ABC):
     @staticmethod
     def get(graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> Type['MoveCommand']:
-        def cls(**inst_vars: Any) -> Type['MoveCommand']:
-            code = inst_vars.pop('code')
-            
-            try:
-                command_type = COMMAND_TYPES[code]
-            except KeyError:
-                raise ValueError(
-                    f'RPG::MoveCommand object at ref {ref} has type code {code}, but this does '
-                    'not correspond to any recognized command type'
-                )
-                
-            command_type_name = command_type[0]
-            subclass = globals()[f'MoveCommand_{command_type_name}']
-            arg_refs = inst_vars.pop('parameters')
-            inst_vars |= subclass.get_params(graph, ref, *arg_refs)
-            return subclass(**inst_vars)
+        return MOVE_COMMAND_CACHE.get(graph, ref)
+
+    @staticmethod
+    def decode(graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> Type['MoveCommand']:
+        """Decode a new instance, bypassing the cache."""
+        code, arg_refs = MoveCommand.decoder.get_values(graph, ref)
+
+        try:
+            command_type = COMMAND_TYPES[code]
+        except KeyError:
+            raise ValueError(
+                f'RPG::MoveCommand object at ref {ref} has type code {code}, but this does '
+                'not correspond to any recognized command type'
+            )
             
-        return marshal.get_inst(graph, ref, 'RPG::MoveCommand', cls, {
-            'code': marshal.get_fixnum, 'parameters': marshal.get_array
-        })
+        command_type_name = command_type[0]
+        subclass = globals()[f'MoveCommand_{command_type_name}']
+        return subclass(**subclass.get_params(graph, ref, *arg_refs))
         
     @abstractmethod
     def get_params(
@@ -40,6 +40,10 @@ class MoveCommand(ABC):
     ) -> dict[str, Any]:
         ...
 
+MoveCommand.decoder = marshal.compile_inst('RPG::MoveCommand', MoveCommand, {
+    'code': marshal.get_fixnum, 'parameters': marshal.get_array
+})
+
 COMMAND_TYPES = {
     0: ('Blank',),
     1: ('MoveDown',),
@@ -124,10 +128,73 @@ for code, (name, *params_with_lookups) in COMMAND_TYPES.items():
         }      
     
     globals()[full_name] = make_dataclass(
-        full_name, params_with_types, bases=(MoveCommand,),
-        namespace={'code': code, 'short_type_name': name, 'get_params': get_params}
+        full_name, params_with_types, bases=(MoveCommand,), frozen=True,
+        namespace={
+            '__module__': __name__, # rather than `abc`, which would make the class unpicklable
+            'code': code, 'short_type_name': name, 'get_params': get_params
+        }
     )
 
+class MoveCommandCache:
+    """Makes decoded move commands shared, in two ways. Commands with the same type and parameters
+    are decoded to the same instance (most move routes consist of a few parameterless commands,
+    repeated), and each command object in a graph is only decoded once (the same move commands are
+    referenced from a SetMoveRoute command and the ContinueSetMoveRoute commands after it). The
+    latter is kept separately for each graph (see `marshal.PerGraph`).
+
+    Either way, the commands are the same as those decoded by `MoveCommand.decode`. Here the first
+    two are the same object, and the third is an identical one:
+
+    >>> graph = marshal.load(bytes([
+    ...     4, 8, 91, 9, 111, 58, 21, 82, 80, 71, 58, 58, 77, 111, 118, 101, 67, 111, 109, 109, 97,
+    ...     110, 100, 7, 58, 10, 64, 99, 111, 100, 101, 105, 20, 58, 16, 64, 112, 97, 114, 97, 109,
+    ...     101, 116, 101, 114, 115, 91, 6, 105, 9, 64, 6, 111, 59, 0, 7, 59, 6, 105, 20, 59, 7, 91,
+    ...     6, 105, 9, 111, 59, 0, 7, 59, 6, 105, 6, 59, 7, 91, 0
+    ... ])).graph
+    >>> refs = graph[graph.root_ref()].items
+    >>> cache = MoveCommandCache()
+    >>> commands = [cache.get(graph, ref) for ref in refs]
+    >>> commands
+    [MoveCommand_Wait(count=4), MoveCommand_Wait(count=4), MoveCommand_Wait(count=4), MoveCommand_MoveDown()]
+    >>> commands == [MoveCommand.decode(graph, ref) for ref in refs]
+    True
+    >>> commands[0] is commands[1] is commands[2]
+    True
+    """
+
+    # (type code, *parameters) -> the instance for that command
+    instances: dict[tuple, MoveCommand]
+
+    # for each graph: object index -> the instance for that object
+    by_index: marshal.PerGraph
+
+    def __init__(self) -> None:
+        self.instances = {}
+        self.by_index = marshal.PerGraph(dict)
+
+    def get(self, graph: marshal.MarshalGraph, ref: marshal.MarshalRef) -> MoveCommand:
+        by_index = self.by_index.get(graph)
+        is_object = ref.type_ is marshal.MarshalRefType.OBJECT
+
+        if is_object:
+            try:
+                return by_index[ref.index]
+            except KeyError:
+                pass
+
+        command = MoveCommand.decode(graph, ref)
+        key = (command.code, *(getattr(command, field.name) for field in fields(command)))
+
+        try:
+            command = self.instances.setdefault(key, command)
+        except TypeError: # the parameters aren't hashable (only the case for PlaySE's AudioFile)
+            pass
+
+        if is_object: by_index[ref.index] = command
+        return command
+
+MOVE_COMMAND_CACHE = MoveCommandCache()
+
 @dataclass
 class MoveRoute:
     repeat: bool
@@ -136,14 +203,12 @@ class MoveRoute:
     
     @classmethod
     def get(cls, graph, ref):
-        def cls2(**inst_vars):
-            inst_vars['list_'] = inst_vars.pop('list')
-            return cls(**inst_vars)
-        
-        return marshal.get_inst(graph, ref, 'RPG::MoveRoute', cls2, {
-            'repeat': marshal.get_bool, 'skippable': marshal.get_bool,
-            'list': partial(marshal.get_array, callback=MoveCommand.get)
-        })
+        return cls.decoder(graph, ref)
+
+MoveRoute.decoder = marshal.compile_inst('RPG::MoveRoute', MoveRoute, {
+    'repeat': marshal.get_bool, 'skippable': marshal.get_bool,
+    'list': partial(marshal.get_array, callback=MoveCommand.get)
+}, renames={'list': 'list_'})
     
 def unpack_move_command(cmd):
     cmd_type, *params = COMMAND_TYPES[cmd.code]
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+import importlib
+import os
+import threading
+from typing import Any, Optional
+from parsers import marshal
+from reborndb import settings
+
+# A single place to get the decoded contents of the game's global data files (as opposed to the
+# per-map files), so that they're only parsed once per process. Each file is loaded when it's first
+# asked for, and reloaded if its modification time or size has changed since, so that long-running
+# processes pick up edits to the game data without having to be restarted.
+#
+# The `load` functions in the modules for each file (e.g. `parsers.rpg.system.load`) go through
+# this, so usually there's no need to use it directly, except to call `invalidate`.
+
+@dataclass
+class Entry:
+    filename: str # relative to settings.REBORN_DATA_PATH
+    module: str # the module with the `decode` function for the file; imported on first use
+    stamp: Optional[tuple[str, int, int]] = None # path, mtime (ns) and size when it was loaded
+    value: Any = None
+
+class GameDataRegistry:
+    def __init__(self, entries: dict[str, Entry]) -> None:
+        self.entries = entries
+        self.lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        entry = self.entries[name]
+        path = settings.REBORN_DATA_PATH / entry.filename
+        stat = os.stat(path)
+        stamp = str(path), stat.st_mtime_ns, stat.st_size
+
+        with self.lock:
+            if entry.stamp != stamp:
+                decode = importlib.import_module(entry.module).decode
+                graph = marshal.load_file_cached(path, settings.MARSHAL_CACHE_PATH).graph
+                entry.value = decode(graph)
+                entry.stamp = stamp
+
+            return entry.value
+
+    def invalidate(self, name: Optional[str]=None) -> None:
+        """Forget the cached value for the given file (by default, all of them), so that it's
+        decoded again the next time it's asked for."""
+
+        with self.lock:
+            for entry in self.entries.values() if name is None else [self.entries[name]]:
+                entry.stamp = entry.value = None
+
+GAME_DATA = GameDataRegistry({
+    'system': Entry('System.rxdata', 'parsers.rpg.system'),
+    'map_infos': Entry('MapInfos.rxdata', 'parsers.rpg.map_infos'),
+    'tilesets': Entry('tilesets.rxdata', 'parsers.rpg.tilesets'),
+    'common_events': Entry('CommonEvents.rxdata', 'parsers.rpg.common_events'),
+})
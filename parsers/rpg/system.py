@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from parsers import marshal
-from reborndb import settings
+from parsers.rpg.registry import GAME_DATA
     
 @dataclass
 class System:
@@ -45,7 +45,9 @@ class System:
 
         return cls(**arrays)
 
+def decode(graph):
+    return System.get(graph, graph.root_ref())
+
 def load():
-    data = marshal.load_file(settings.REBORN_DATA_PATH / 'System.rxdata')
-    return System.get(data.graph, data.graph.root_ref())
+    return GAME_DATA.get('system')
 
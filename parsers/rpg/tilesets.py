@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from functools import partial
 from parsers import marshal
-from reborndb import settings
+from parsers.rpg.registry import GAME_DATA
 from parsers.rpg.basic import *
     
 # Each tile is a 32 x 32 section of the tileset file.
@@ -46,30 +46,21 @@ class Tileset:
             'fog_zoom': marshal.get_fixnum,
             'fog_sx': marshal.get_fixnum, 'fog_sy': marshal.get_fixnum,
             'battleback_name': marshal.get_string,
-            'passages': partial(Table.get, expected_dimcount=1),
-            'priorities': partial(Table.get, expected_dimcount=1),
-            'terrain_tags': partial(Table.get, expected_dimcount=1)
+            'passages': partial(Table.get, expected_dimcount=1, lazy=True),
+            'priorities': partial(Table.get, expected_dimcount=1, lazy=True),
+            'terrain_tags': partial(Table.get, expected_dimcount=1, lazy=True)
         })
 
-_tilesets = None
+def decode(graph):
+    refs = marshal.get_array(graph, graph.root_ref())
 
-def load():
-    global _tilesets
-
-    if _tilesets is None:
-        _tilesets = []
-
-        graph = marshal.load_file(settings.REBORN_DATA_PATH / 'tilesets.rxdata').graph
-        refs = marshal.get_array(graph, graph.root_ref())
+    if not graph[refs[0]] == marshal.RUBY_NIL:
+        raise ValueError(f'expected first element of tileset array to be nil')
 
-        if not graph[refs[0]] == marshal.RUBY_NIL:
-            raise ValueError(f'expected first element of tileset array to be nil')
+    return [Tileset.get(graph, ref) for ref in refs[1:]]
 
-        for ref in refs[1:]:
-            tileset = Tileset.get(graph, ref)
-            _tilesets.append(tileset)
-
-    return _tilesets
+def load():
+    return GAME_DATA.get('tilesets')
 
 def lookup(id_: int):
     tilesets = load()
@@ -6,26 +6,7 @@
 import itertools as it
 import json
 import re
-
-def lexer(*patterns):
-	patterns, callbacks = zip(*patterns)
-	patterns = [re.compile(pattern, re.DOTALL) for pattern in patterns]
-
-	def lex(source):
-		i = 0
-
-		while i < len(source):
-			for pattern, callback in zip(patterns, callbacks):
-				m = pattern.match(source, i)
-
-				if m is not None:
-					yield from callback(*m.groups())
-					i = m.end()
-					break
-			else:
-				raise ValueError(f'input at index {i} does not match any pattern recognized by the lexer\n---\n{source[i:i + 25]}...\n---')
-
-	return lex
+from reborndb.script import lexer # compiles the patterns into one alternation
 
 WHITESPACE = r'\s+'
 COMMENT = r'#[^\n]*'
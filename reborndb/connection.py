@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+import threading
 import apsw
 
 class Connection:
@@ -8,6 +9,12 @@ class Connection:
         self.apsw.load_extension('C:/programs/sqlean/stats')
         self.apsw.load_extension('C:/programs/sqlean/regexp')
         self.apsw.load_extension('C:/programs/sqlean/define')
+        # Held for the duration of each transaction, and while executing each query and fetching
+        # its rows, so that the connection can be shared between threads (see
+        # `scripts.refresh_database`): a query from one thread can't end up inside another
+        # thread's transaction, or run while another thread's statement is still being stepped.
+        self.lock = threading.RLock()
+
         self.exec('pragma foreign_keys = 1')
         
         # i don't remember why i commented this out#
@@ -41,8 +48,13 @@ class Connection:
 
         As far as I can tell, there is no appreciable performance benefit to reusing cursors
         between queries, so you might as well always use this method and forget that cursors
-        exist."""
-        return self.apsw.cursor().execute(query, params)
+        exist.
+
+        The rows are all fetched (while the connection is locked) and returned as a list, since
+        fetching rows from the cursor later would step the statement outside the lock, possibly
+        while another thread is using the connection."""
+        with self.lock:
+            return self.apsw.cursor().execute(query, params).fetchall()
 
     def execscript(self, path, params=None):
         with open(path, encoding='utf-8') as f:
@@ -76,19 +88,23 @@ class Connection:
         to encourage the user to do the enabled or disabling at the transaction boundary in order
         to avoid nasty surprises."""
 
-        foreign_keys_already_enabled = None
+        with self.lock:
+            foreign_keys_already_enabled = None
 
-        if foreign_keys_enabled is not None:
-            foreign_keys_already_enabled = bool(self.exec11(f'pragma foreign_keys'))
+            if foreign_keys_enabled is not None:
+                foreign_keys_already_enabled = bool(self.exec11(f'pragma foreign_keys'))
 
-            if foreign_keys_already_enabled != foreign_keys_enabled:
-                self.exec(f'pragma foreign_keys = {int(foreign_keys_enabled)}')
+                if foreign_keys_already_enabled != foreign_keys_enabled:
+                    self.exec(f'pragma foreign_keys = {int(foreign_keys_enabled)}')
 
-        with self.apsw:
-            yield None
+            with self.apsw:
+                yield None
 
-        if foreign_keys_enabled is not None and foreign_keys_already_enabled != foreign_keys_enabled:
-            self.exec(f'pragma foreign_keys = {int(foreign_keys_already_enabled)}')
+            if (
+                foreign_keys_enabled is not None
+                and foreign_keys_already_enabled != foreign_keys_enabled
+            ):
+                self.exec(f'pragma foreign_keys = {int(foreign_keys_already_enabled)}')
 
     def drop_all_views(self, exceptions=()):
         exception_placeholders = ', '.join('?' for _ in exceptions)
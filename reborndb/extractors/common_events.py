@@ -2,7 +2,9 @@ import io
 import numpy as np
 from parsers.rpg import common_events
 from reborndb import DB
-from reborndb.extractors.event_commands import unpack_event_command, create_event_command
+from reborndb.extractors.event_commands import (
+    unpack_event_command, create_event_command, delete_unreferenced_commands
+)
 
 def extract():
     common_event_list = common_events.load()
@@ -70,9 +72,16 @@ def extract():
             common_event_command_rows.append((event_id, cmd_i, indent, cmd_id))
 
     with DB.H.transaction():
+        # this table belongs to map_data too, so it's kept when the common events are rebuilt but the
+        # map data isn't (see `scripts.refresh_database`)
+        DB.H.exec('delete from "common_event_command"')
+
         DB.H.bulk_insert(
             'common_event_command',
             ('common_event_id', 'command_number', 'indent', 'command'),
             common_event_command_rows
         )
-        
\ No newline at end of file
+
+    # the commands from the last time the common events were extracted, if the command tables were
+    # kept
+    delete_unreferenced_commands()
@@ -202,3 +202,50 @@ def create_event_command(cmd_type, cmd_subtype, args):
                 raise ValueError(f'unrecognized arg type {arg_type}')    
 
     return cmd_id
+
+def delete_unreferenced_commands():
+    """Delete the event commands that no longer belong to a map event page or a common event, along
+    with their arguments, and then the move commands that no longer belong to an event page's move
+    route or to an event command.
+
+    Commands are never shared, so this is how the commands of events that have been deleted (by
+    dropping or deleting from `event_page_command` or `common_event_command`) get cleaned up."""
+
+    with DB.H.transaction():
+        DB.H.exec('''
+            create temp table "unreferenced_event_command" as
+            select "id" from "event_command"
+            where "id" not in (select "command" from "event_page_command")
+            and "id" not in (select "command" from "common_event_command")
+        ''')
+
+        DB.H.exec('''
+            delete from "event_command_move_route_argument_move_command"
+            where "event_command" in (select "id" from "unreferenced_event_command")
+        ''')
+
+        for arg_type in list(DB.H.exec1('select "name" from "parameter_type"')):
+            DB.H.exec(f'''
+                delete from "event_command_{arg_type}_argument"
+                where "command" in (select "id" from "unreferenced_event_command")
+            ''')
+
+        DB.H.exec('delete from "event_command" where "id" in (select "id" from "unreferenced_event_command")')
+        DB.H.exec('drop table "unreferenced_event_command"')
+
+        DB.H.exec('''
+            create temp table "unreferenced_move_command" as
+            select "id" from "move_command"
+            where "id" not in (select "command" from "event_page_move_command")
+            and "id" not in (select "move_command" from "event_command_move_command_argument")
+            and "id" not in (select "move_command" from "event_command_move_route_argument_move_command")
+        ''')
+
+        for arg_type in ('integer', 'text', 'audio_file', 'direction'):
+            DB.H.exec(f'''
+                delete from "move_command_{arg_type}_argument"
+                where "command" in (select "id" from "unreferenced_move_command")
+            ''')
+
+        DB.H.exec('delete from "move_command" where "id" in (select "id" from "unreferenced_move_command")')
+        DB.H.exec('drop table "unreferenced_move_command"')
@@ -1,6 +1,8 @@
+from collections import defaultdict
 import re
+from parsers.rpg import block_tree
+from parsers.rpg import command_columns
 from parsers.rpg import common_events as rpg_common_events
-from parsers.rpg import map as rpg_map
 from parsers.rpg.basic import AssignType, Comparison, SwitchState
 from parsers.rpg.event_command import EventCommand_Script
 from reborndb import DB, settings
@@ -159,31 +161,6 @@ def parse_encounter_modifiers():
 
     return result
 
-def cmds_with_unified_scripts(cmds):
-    new_cmds = []
-    script = None
-
-    for cmd in cmds:
-        if script is None:
-            if cmd.short_type_name == 'Script':
-                script = cmd.line
-            else:
-                yield cmd
-        else:
-            if cmd.short_type_name == 'ContinueScript':
-                script += '\n' + cmd.line
-            else:
-                yield EventCommand_Script(indent=cmd.indent, line=script)
-                script = None
-
-                if cmd.short_type_name == 'Script':
-                    script = cmd.line
-                else:
-                    yield cmd
-
-    if script is not None:
-        yield EventCommand_Script(indent=0, line=script)
-
 WILD_RE = re.compile(
     r'''pbWildBattle\s*\(
         \s*(?P<species>.*?)\s*,
@@ -228,7 +205,10 @@ INTERESTING_PATS = (WILD_RE, TRADE_RE, GIFT_RE, GIFT_RE2, EGG_RE)
 def script_is_interesting(script):
     return any(re.search(pat, script) is not None for pat in INTERESTING_PATS)
     
-def interesting_scripts(cmds):
+def interesting_scripts(blocks):
+    """Yield the interesting scripts in the given block tree of a command list. The start and end
+    positions yielded are positions in the command list."""
+
     start_cmd = None
     appendix_start_cmd = None
 
@@ -248,9 +228,15 @@ def interesting_scripts(cmds):
             appendix = None
             appendix_cur_outcome = None
 
-    i = 0
+    block = None
+
+    for block in block_tree.walk(blocks):
+        # a Script command and its ContinueScript commands form one block, so `cmd.line` is the
+        # whole script
+        i = block.start
+        cmd = block.command
+        if cmd.short_type_name == 'Script': cmd = EventCommand_Script(cmd.indent, block.text)
 
-    for i, cmd in enumerate(cmds_with_unified_scripts(cmds)):
         if (
             cmd.short_type_name == 'ControlVariables'
             and 232 in range(cmd.var_id_lo, cmd.var_id_hi + 1)
@@ -298,7 +284,7 @@ def interesting_scripts(cmds):
             if cmd.short_type_name == 'Script' and re.search(TRADE_MOD_RE, cmd.line) is not None:
                 # yes but it's just an extra script
                 appendix = cmd.line
-                yield from flush_script(i + 1)
+                yield from flush_script(block.end)
             elif (
                 cmd.short_type_name == 'ControlVariables'
                 and 62 in range(cmd.var_id_lo, cmd.var_id_hi + 1)
@@ -340,7 +326,35 @@ def interesting_scripts(cmds):
             else: # cmd.short_type_name == 'ConditionalBranchEnd':
                 yield from flush_script(i)
 
-    yield from flush_script(i)
+    yield from flush_script(block.end if block is not None else 0)
+
+def interesting_pages(columns):
+    """Yield the (event ID, page) pairs for which `interesting_scripts` might yield something,
+    going by the columnar form of the commands, so that we only have to decode those pages.
+
+    For each page, all the script lines and conditional branch script expressions are joined
+    together and checked with `script_is_interesting`. Any unified script is a substring of the
+    result, so no interesting page is missed (though the check may let through some pages which
+    turn out not to be interesting after all)."""
+
+    texts = defaultdict(list)
+
+    for rows, param_index in (
+        (columns.mask(355, 655), 0), # Script, ContinueScript: the line
+        (columns.mask(111) & (columns.subcode == 12), 1), # ConditionalBranch_Script: the expr
+    ):
+        rows = rows.nonzero()[0]
+        kinds, values = columns.param_column(param_index, rows)
+
+        for row, kind, value in zip(rows.tolist(), kinds.tolist(), values.tolist()):
+            if kind == command_columns.ParamKind.STRING.value:
+                page = columns.event_id[row].item(), columns.page[row].item()
+                texts[page].append((row, columns.strings[value]))
+
+    for page in columns.pages():
+        if page in texts:
+            script = '\n'.join(text for _, text in sorted(texts[page]))
+            if script_is_interesting(script): yield page
 
 def iterscriptlines(script):
     delimiter_stack = []
@@ -576,8 +590,8 @@ def extract():
 
         return False
         
-    def process_commands(cmds, base_datum):
-        for start_cmd, end_cmd, wild_mod_val, script, egg_trade, appendix in interesting_scripts(cmds):
+    def process_commands(blocks, base_datum):
+        for start_cmd, end_cmd, wild_mod_val, script, egg_trade, appendix in interesting_scripts(blocks):
             print('>>>>>>>>>>>', wild_mod_val, egg_trade)
             print(script)
             print('<<<<<<<<<<<')
@@ -618,27 +632,28 @@ def extract():
 
     for event in rpg_common_events.load():
         print(f'Common event {event.id_}')
-        process_commands(event.list_, {'event_id': event.id_})
+        process_commands(event.blocks, {'event_id': event.id_})
 
     # print(rows)
     # print(common_event_rows)
     # print(ot_rows)
     # print(move_rows)
 
-    for map_id, map_ in rpg_map.Map.load_all():
-    # for map_id, map_ in [
-    #     #(353, rpg_map.Map.load(353)),
-    #     #(11, rpg_map.Map.load(11)),
-    #     #(153, rpg_map.Map.load(153)),
-    #     #(412, rpg_map.Map.load(412)), # absol isn't picking up the wildmod
-    #     (154, rpg_map.Map.load(154)) # mime jr isn't getting all its moves
+    for map_id, columns in command_columns.load_all_maps():
+    # for map_id, columns in [
+    #     #(353, command_columns.load_map(353)),
+    #     #(11, command_columns.load_map(11)),
+    #     #(153, command_columns.load_map(153)),
+    #     #(412, command_columns.load_map(412)), # absol isn't picking up the wildmod
+    #     (154, command_columns.load_map(154)) # mime jr isn't getting all its moves
     # ]:
         print(f'Map {map_id}')
 
-        for event_id, event in map_.events.items():
-            for page_number, page in enumerate(event.pages):
-                #print(f'MAP {map_id}, EVENT {event_id}, PAGE {page_number}')
-                process_commands(page.list_, {'map_id': map_id, 'event_id': event_id, 'event_page': page_number})
+        # pages without any interesting scripts don't produce anything, so skip decoding them
+        for event_id, page_number in interesting_pages(columns):
+            #print(f'MAP {map_id}, EVENT {event_id}, PAGE {page_number}')
+            blocks = block_tree.parse(columns.commands(event_id, page_number))
+            process_commands(blocks, {'map_id': map_id, 'event_id': event_id, 'event_page': page_number})
 
     with DB.H.transaction(foreign_keys_enabled=False):
         for table in (
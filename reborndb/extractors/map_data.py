@@ -1,93 +1,80 @@
-# Since this script takes a lot longer to run than the other extractor scripts, I'm currently
-# running it manually via
+# Since this script takes a lot longer to run than the other extractor scripts, it only re-extracts
+# the maps whose files have changed since the last time it was run (going by the hashes stored in
+# "marshal_mapdata"), unless its tables don't exist yet. `scripts.refresh_database` keeps its tables
+# when only the map files have changed, so that this can happen. It can also be run manually via
 #
 #   env\Scripts\python -m reborndb.extractors.map_data 
-#
-# when necessary. At some point I need to rework the build process to incorporate this step.
 
-# TODO: speed this up! And put the images in the database maybe.
+# TODO: put the images in the database maybe.
 
+import hashlib
 import io
-from PIL import Image
+import itertools as it
 import numpy as np
 from parsers.rpg.map import Map
+from parsers.rpg import map_image
 from reborndb import DB, settings
 from scripts import populate_event_command_type_tables
 
 from reborndb.extractors.event_commands import (
     unpack_move_command, unpack_event_command,
-    create_move_command, create_event_command
+    create_move_command, create_event_command, delete_unreferenced_commands
 )
 
-def load_image(bytes_):
-    stream = io.BytesIO()
-    stream.write(bytes_)
-    stream.seek(0)
-    return Image.open(stream)
-
-def load_tilesets():
-    tileset_images = {}
-
-    for name, tileset_file in DB.H.exec('select "name", "content" from "tileset_file"'):
-        img = load_image(tileset_file).convert('RGBA')
-        tiles = []
-
-        # these assertions fail --- will that cause issues?
-        # assert img.height % 32 == 0, (name, img.height)
-        # assert img.width % 32 == 0, (name, img.width)
-
-        for y in range(0, img.height, 32):
-            for x in range(0, img.width, 32):
-                cropped = img.crop((x, y, x + 32, y + 32))
-                tiles.append(cropped)
+# The tables with rows for each map, in an order that they can be deleted from in.
+MAP_TABLES = [
+    'event_page_command', 'event_page_move_command', 'event_page_character', 'event_page_tile',
+    'event_page_self_switch_condition', 'event_page_variable_condition',
+    'event_page_switch_condition', 'event_page', 'map_event', 'marshal_mapdata'
+]
 
-        tileset_images[name] = {'mode': img.mode, 'tiles': tiles}
+def load_tilesets(tileset_ids=None):
+    """Return a dictionary mapping the ID of each tileset (or of each of the given ones) to its
+    atlas, for rendering with `parsers.rpg.map_image`. The atlases are cached in
+    `settings.ATLAS_CACHE_PATH`, so the tileset images only need decoding when they change."""
 
+    tileset_files = {}
     tilesets = {}
 
-    for id_, name, filename in DB.H.exec('select "id", "name", "file" from "tileset"'):
-        autotiles = [None] * 384
+    for id_, name, filename in list(DB.H.exec('select "id", "name", "file" from "tileset"')):
+        if tileset_ids is not None and id_ not in tileset_ids: continue
 
-        for index, atfile in DB.H.exec('''
+        if filename not in tileset_files:
+            (tileset_files[filename],), = DB.H.exec(
+                'select "content" from "tileset_file" where "name" = ?', (filename,)
+            )
+
+        autotile_files = dict(DB.H.exec('''
             select "tileset_autotile"."index", "autotile"."image"
             from "tileset_autotile"
             join "autotile" on "autotile"."name" = "tileset_autotile"."autotile"
             where "tileset_autotile"."tileset" = ?
-        ''', (name,)):
-            # at the moment we don't understand how autotiles work exactly
-            # so we're just going to choose one arbitrarily
-            #
-            # todo: perhaps the order of the autotile variants in the image here:
-            # https://forums.rpgmakerweb.com/index.php?threads/some-tricks-to-optimize-the-autotile-slots.138589/
-            # is a clue?
-            atimg = load_image(atfile).convert('RGBA')
-            start = (index + 1) * 48
-            end = start + 48
-
-            if atimg.height == 32:
-                cropped = atimg.crop((0, 0, 32, 32))
-            elif atimg.height == 128:
-                cropped = atimg.crop((32, 64, 64, 96))
-            else:
-                assert False
-
-            autotiles[start:end] = [cropped] * 48
-
-        tileset_image = tileset_images[filename]
-        
-        tilesets[id_] = {
-            'mode': tileset_image['mode'],
-            'tiles': autotiles + tileset_image['tiles']
-        }
+        ''', (name,)))
+
+        tilesets[id_] = map_image.load_atlas_cached(
+            f'Tileset{id_:03}', tileset_files[filename], autotile_files, settings.ATLAS_CACHE_PATH
+        )
 
     return tilesets
 
-def chonks():
+def map_hashes():
+    """Return a dictionary mapping the ID of each map (the same maps as `Map.load_all`) to the
+    content hash of its file."""
+    hashes = {}
+
+    for map_id in it.count(1):
+        try:
+            with Map.path(map_id).open('rb') as f:
+                hashes[map_id] = hashlib.file_digest(f, 'blake2b').digest()
+        except FileNotFoundError:
+            return hashes
+
+def chonks(map_ids):
     # one transaction per chonk
     chonk = []
     count = 0
 
-    for map_id, mapdata in Map.load_all():
+    for map_id, mapdata in Map.load_all_parallel(map_ids=map_ids):
         chonk.append((map_id, mapdata))
         count += 1
 
@@ -98,7 +85,7 @@ def chonks():
     if count % 25:
         yield chonk
 
-def extract():
+def create_tables():
     with DB.H.transaction():
         DB.H.exec('drop table if exists "event_command_weather_argument"')
         DB.H.exec('drop table if exists "event_command_bound_type_argument"')
@@ -145,11 +132,37 @@ def extract():
         DB.H.exec('drop table if exists "marshal_mapdata"')
         DB.H.execscript('schemas/map_event.sql')
         populate_event_command_type_tables.run()
-        tilesets = load_tilesets()
 
-    rows = []
+def delete_maps(map_ids):
+    with DB.H.transaction():
+        for map_id in map_ids:
+            for table in MAP_TABLES:
+                DB.H.exec(f'delete from "{table}" where "map_id" = ?', (map_id,))
+
+    delete_unreferenced_commands()
 
-    for chonk in chonks():
+def extract():
+    hashes = map_hashes()
+    columns = [name for _, name, *_ in DB.H.exec('pragma table_info("marshal_mapdata")')]
+
+    if 'hash' in columns:
+        stored_hashes = dict(DB.H.exec('select "map_id", "hash" from "marshal_mapdata"'))
+        map_ids = [map_id for map_id, hash_ in hashes.items() if stored_hashes.get(map_id) != hash_]
+        removed_map_ids = sorted(stored_hashes.keys() - hashes.keys())
+        print(f'{len(map_ids)} maps changed, {len(removed_map_ids)} removed')
+        delete_maps(map_ids + removed_map_ids)
+
+        for map_id in removed_map_ids:
+            (settings.SITE_PATH / 'img' / 'area' / f'{map_id}.png').unlink(missing_ok=True)
+    else:
+        create_tables()
+        map_ids = list(hashes)
+
+    if not map_ids: return
+    tilesets = load_tilesets()
+
+    for chonk in chonks(map_ids):
+        mapdata_rows = []
         event_rows = []
         page_rows = []
         switch_rows = []
@@ -169,9 +182,9 @@ def extract():
             bgm = (None,) * 3 if not mapdata.autoplay_bgm or mapdata.bgm is None else (mapdata.bgm.name, mapdata.bgm.volume, mapdata.bgm.pitch)
             bgs = (None,) * 3 if not mapdata.autoplay_bgs or mapdata.bgs is None else (mapdata.bgs.name, mapdata.bgs.volume, mapdata.bgs.pitch)
 
-            rows.append((
+            mapdata_rows.append((
                 map_id, mapdata.tileset_id, mapdata.width, mapdata.height, databytes,
-                *bgm, *bgs
+                *bgm, *bgs, hashes[map_id]
             ))
 
             for event in mapdata.events.values():
@@ -272,30 +285,13 @@ def extract():
                 event_page_command_rows
             )
 
-    with DB.H.transaction():
-        DB.H.dump_as_table( 'marshal_mapdata', ('map_id', 'tileset', 'width', 'height', 'data',
-            'bgm_file', 'bgm_volume', 'bgm_pitch', 'bgs_file', 'bgs_volume', 'bgs_pitch'
-        ), rows)
+            # last, since the hash marks the map as extracted
+            DB.H.bulk_insert('marshal_mapdata', ('map_id', 'tileset', 'width', 'height', 'data',
+                'bgm_file', 'bgm_volume', 'bgm_pitch', 'bgs_file', 'bgs_volume', 'bgs_pitch', 'hash'
+            ), mapdata_rows)
 
 def save_map_tiles(map_id, mapdata, tilesets):
-    data = mapdata.data
-    tileset = tilesets[mapdata.tileset_id]
-    tiles = tileset['tiles']
-    img = Image.new('RGBA', (data.width * 32, data.height * 32))
-
-    for z in range(data.depth):
-        for x in range(data.width):
-            for y in range(data.height):
-                tile_id = data[x, y, z]
-
-                try:
-                    tile = tiles[tile_id]
-                except IndexError:
-                    print(map_id, tile_id) # idk why this happens
-
-                if tile is not None:
-                    img.paste(tile, (x * 32, y * 32), tile)
-
+    img = map_image.render_image(mapdata.data.array, tilesets[mapdata.tileset_id])
     img.save(settings.SITE_PATH / 'img' / 'area' / f'{map_id}.png')
 
 if __name__ == '__main__':
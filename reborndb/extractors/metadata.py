@@ -1,13 +1,113 @@
 from collections import defaultdict
-from parsers import marshal
+from parsers.rpg import map_infos
 from reborndb import DB
-from reborndb import settings
 from reborndb import pbs
 
 def remove_ogg_ext(s: str) -> str:
     return s.removesuffix('.ogg')
 
+def insert_maps():
+    # (the maps that are already there are left alone, for `update_maps`)
+    DB.H.exec('''
+        insert into "map" (
+            "id", "name", "pbs_name", "desc", "parent_id", "order", "expanded",
+            "scroll_x", "scroll_y", "region_id", "x", "y", "has_location_signpost",
+            "battle_backdrop", "outdoor", "bicycle_usable", "bicycle_required", "flashable",
+            "sets_teleport_map", "sets_teleport_x", "sets_teleport_y", "underwater_map", "weather",
+            "weather_chance", "in_safari_zone", "bicycle_music", "surf_music",
+            "wild_battle_music", "wild_win_music", "trainer_battle_music", "trainer_win_music",
+            "tileset", "width", "height", "data"
+        )
+        select
+            "mapinfo"."map_id", "mapinfo"."name", "metadata"."__comment__", NULL,
+            nullif("mapinfo"."parent_id", 0), "mapinfo"."order", "mapinfo"."expanded",
+            "mapinfo"."scroll_x", "mapinfo"."scroll_y",
+            "metadata"."map_position" -> '$[0]',
+            "metadata"."map_position" -> '$[1]', "metadata"."map_position" -> '$[2]',
+            case when "metadata"."ShowArea" = 'true' then 1 else 0 end,
+            nullif("metadata"."BattleBack", ''),
+            case when "metadata"."Outdoor" = 'true' then 1 else 0 end,
+            case
+                when "metadata"."Bicycle" = 'true' then 1
+                when "metadata"."Bicycle" = 'false' then 0
+                when "metadata"."Outdoor" = 'true' then 1
+                else 0
+            end,
+            case when "metadata"."BicycleAlways" = 'true' then 1 else 0 end,
+            case when "metadata"."DarkMap" = 'true' then 1 else 0 end,
+            "metadata"."teleport" -> '$[0]', "metadata"."teleport" -> '$[1]', "metadata"."teleport" -> '$[2]',
+            nullif("metadata"."DiveMap", ''),
+            "metadata"."weather_fields" -> '$[0]', "metadata"."weather_fields" -> '$[1]',
+            case when "metadata"."SafariMap" = 'true' then 1 else 0 end,
+            ifnull(nullif("metadata"."BicycleBGM", ''), "global_metadata"."BicycleBGM"),
+            ifnull(nullif("metadata"."SurfBGM", ''), "global_metadata"."SurfBGM"),
+            ifnull(nullif("metadata"."WildBattleBGM", ''), "global_metadata"."WildBattleBGM"),
+            ifnull(nullif("metadata"."WildVictoryME", ''), "global_metadata"."WildVictoryME"),
+            ifnull(nullif("metadata"."TrainerBattleBGM", ''), "global_metadata"."TrainerBattleBGM"),
+            ifnull(nullif("metadata"."TrainerVictoryME", ''), "global_metadata"."TrainerVictoryME"),
+            "tileset"."name", "mapdata"."width", "mapdata"."height", "mapdata"."data"
+        from "marshal_mapinfo" as "mapinfo"
+        -- there are several mapinfos which don't have a corresponding metadata,
+        -- but not the other way round (except for the global metadata)
+        left join
+        (
+            select
+                "pbs_metadata".*,
+                json('[' || "pbs_metadata"."MapPosition" || ']') as "map_position",
+                json('[' || "pbs_metadata"."HealingSpot" || ']') as "teleport",
+                json('[' || "pbs_metadata"."Weather" || ']') as "weather_fields"
+            from "pbs_metadata"
+        ) as "metadata" on (
+            "mapinfo"."map_id" = cast("metadata"."__header__" as integer)
+        )
+        join "pbs_metadata" as "global_metadata" on cast("global_metadata"."__header__" as integer) = 0
+        join "marshal_mapdata" as "mapdata" on "mapdata"."map_id" = "mapinfo"."map_id"
+        join "tileset" on "tileset"."id" = "mapdata"."tileset"
+        where "mapinfo"."map_id" not in (select "id" from "map")
+    ''')
+
+def insert_map_music():
+    DB.H.exec('''
+        insert into "map_bgm" ("map", "file", "volume", "pitch")
+        select "map_id", "bgm_file", "bgm_volume", "bgm_pitch" from "marshal_mapdata"
+        where "bgm_file" is not null
+    ''')
+
+    DB.H.exec('''
+        insert into "map_bgs" ("map", "file", "volume", "pitch")
+        select "map_id", "bgs_file", "bgs_volume", "bgs_pitch" from "marshal_mapdata"
+        where "bgs_file" is not null
+    ''')
+
+def update_maps():
+    """Update the columns of "map" that come from "marshal_mapdata", and the music of the maps, to
+    match the map data after `reborndb.extractors.map_data` has updated it, adding and removing
+    maps as needed."""
+
+    with DB.H.transaction():
+        DB.H.exec('delete from "map_bgm"')
+        DB.H.exec('delete from "map_bgs"')
+        DB.H.exec('delete from "map" where "id" not in (select "map_id" from "marshal_mapdata")')
+
+        DB.H.exec('''
+            update "map" set
+                "tileset" = "tileset"."name", "width" = "mapdata"."width",
+                "height" = "mapdata"."height", "data" = "mapdata"."data"
+            from "marshal_mapdata" as "mapdata"
+            join "tileset" on "tileset"."id" = "mapdata"."tileset"
+            where "mapdata"."map_id" = "map"."id"
+        ''')
+
+        insert_maps()
+        insert_map_music()
+
 def extract():
+    # `scripts.refresh_database` keeps this extractor's tables when only the map data has changed,
+    # in which case the maps are just updated to match it
+    if DB.H.exec('pragma table_info("marshal_mapinfo")'):
+        update_maps()
+        return
+
     pbs_sections = pbs.load('metadata')
     pbs_cols_set = set()
 
@@ -41,93 +141,21 @@ def extract():
     with DB.H.transaction():
         DB.H.dump_as_table('pbs_metadata', ('__header__', '__comment__', *pbs_cols), pbs_rows)
 
-    mapinfo = marshal.load_file(settings.REBORN_DATA_PATH / 'MapInfos.rxdata').graph
     marshal_mapinfo_cols = ('name', 'scroll_x', 'scroll_y', 'order', 'expanded', 'parent_id')
     marshal_mapinfo_rows = []
 
-    for map_id, mapinfo_for_id_ref in marshal.get_hash(mapinfo, mapinfo.root_ref(), marshal.get_fixnum).items():
-        mapinfo_for_id = marshal.get_inst(mapinfo, mapinfo_for_id_ref, 'RPG::MapInfo', dict, {
-            'scroll_x': marshal.get_fixnum, 'scroll_y': marshal.get_fixnum, 'name': marshal.get_string,
-            'expanded': marshal.get_bool, 'order': marshal.get_fixnum, 'parent_id': marshal.get_fixnum
-        })
-
+    for map_id, mapinfo_for_id in map_infos.load().items():
         marshal_mapinfo_rows.append((
             map_id,
-            *(mapinfo_for_id[field] for field in marshal_mapinfo_cols)
+            *(getattr(mapinfo_for_id, field) for field in marshal_mapinfo_cols)
         ))
 
     with DB.H.transaction():
         DB.H.dump_as_table('marshal_mapinfo', ('map_id', *marshal_mapinfo_cols), marshal_mapinfo_rows)
         DB.H.exec('create index "marshal_mapinfo_idx_map_id" on "marshal_mapinfo" ("map_id")')
         
-        DB.H.exec('''
-            insert into "map" (
-                "id", "name", "pbs_name", "desc", "parent_id", "order", "expanded",
-                "scroll_x", "scroll_y", "region_id", "x", "y", "has_location_signpost",
-                "battle_backdrop", "outdoor", "bicycle_usable", "bicycle_required", "flashable",
-                "sets_teleport_map", "sets_teleport_x", "sets_teleport_y", "underwater_map", "weather",
-                "weather_chance", "in_safari_zone", "bicycle_music", "surf_music",
-                "wild_battle_music", "wild_win_music", "trainer_battle_music", "trainer_win_music",
-                "tileset", "width", "height", "data"
-            )
-            select
-                "mapinfo"."map_id", "mapinfo"."name", "metadata"."__comment__", NULL,
-                nullif("mapinfo"."parent_id", 0), "mapinfo"."order", "mapinfo"."expanded",
-                "mapinfo"."scroll_x", "mapinfo"."scroll_y",
-                "metadata"."map_position" -> '$[0]',
-                "metadata"."map_position" -> '$[1]', "metadata"."map_position" -> '$[2]',
-                case when "metadata"."ShowArea" = 'true' then 1 else 0 end,
-                nullif("metadata"."BattleBack", ''),
-                case when "metadata"."Outdoor" = 'true' then 1 else 0 end,
-                case
-                    when "metadata"."Bicycle" = 'true' then 1
-                    when "metadata"."Bicycle" = 'false' then 0
-                    when "metadata"."Outdoor" = 'true' then 1
-                    else 0
-                end,
-                case when "metadata"."BicycleAlways" = 'true' then 1 else 0 end,
-                case when "metadata"."DarkMap" = 'true' then 1 else 0 end,
-                "metadata"."teleport" -> '$[0]', "metadata"."teleport" -> '$[1]', "metadata"."teleport" -> '$[2]',
-                nullif("metadata"."DiveMap", ''),
-                "metadata"."weather_fields" -> '$[0]', "metadata"."weather_fields" -> '$[1]',
-                case when "metadata"."SafariMap" = 'true' then 1 else 0 end,
-                ifnull(nullif("metadata"."BicycleBGM", ''), "global_metadata"."BicycleBGM"),
-                ifnull(nullif("metadata"."SurfBGM", ''), "global_metadata"."SurfBGM"),
-                ifnull(nullif("metadata"."WildBattleBGM", ''), "global_metadata"."WildBattleBGM"),
-                ifnull(nullif("metadata"."WildVictoryME", ''), "global_metadata"."WildVictoryME"),
-                ifnull(nullif("metadata"."TrainerBattleBGM", ''), "global_metadata"."TrainerBattleBGM"),
-                ifnull(nullif("metadata"."TrainerVictoryME", ''), "global_metadata"."TrainerVictoryME"),
-                "tileset"."name", "mapdata"."width", "mapdata"."height", "mapdata"."data"
-            from "marshal_mapinfo" as "mapinfo"
-            -- there are several mapinfos which don't have a corresponding metadata,
-            -- but not the other way round (except for the global metadata)
-            left join
-            (
-                select
-                    "pbs_metadata".*,
-                    json('[' || "pbs_metadata"."MapPosition" || ']') as "map_position",
-                    json('[' || "pbs_metadata"."HealingSpot" || ']') as "teleport",
-                    json('[' || "pbs_metadata"."Weather" || ']') as "weather_fields"
-                from "pbs_metadata"
-            ) as "metadata" on (
-                "mapinfo"."map_id" = cast("metadata"."__header__" as integer)
-            )
-            join "pbs_metadata" as "global_metadata" on cast("global_metadata"."__header__" as integer) = 0
-            join "marshal_mapdata" as "mapdata" on "mapdata"."map_id" = "mapinfo"."map_id"
-            join "tileset" on "tileset"."id" = "mapdata"."tileset"
-        ''')
-
-        DB.H.exec('''
-            insert into "map_bgm" ("map", "file", "volume", "pitch")
-            select "map_id", "bgm_file", "bgm_volume", "bgm_pitch" from "marshal_mapdata"
-            where "bgm_file" is not null
-        ''')
-
-        DB.H.exec('''
-            insert into "map_bgs" ("map", "file", "volume", "pitch")
-            select "map_id", "bgs_file", "bgs_volume", "bgs_pitch" from "marshal_mapdata"
-            where "bgs_file" is not null
-        ''')
+        insert_maps()
+        insert_map_music()
 
     # pbs_data = pbs.load('metadata')
     # rows = []
@@ -15,7 +15,9 @@ from parsers import marshal
 from reborndb import DB, settings
 
 def extract():
-    graph = marshal.load_file(settings.REBORN_DATA_PATH / 'trainerlists.dat').graph
+    graph = marshal.load_file_cached(
+        settings.REBORN_DATA_PATH / 'trainerlists.dat', settings.MARSHAL_CACHE_PATH
+    ).graph
     rows = defaultdict(lambda: [])
 
     lists_ = marshal.get_array(graph, graph.root_ref())
@@ -79,7 +79,9 @@ def extract():
     for pbs_order, ((type_, name, id_), trainer) in enumerate(pbs_trainers.items()):
         pbs_trainer_rows.append((type_, name, id_, pbs_order))
 
-    graph = marshal.load_file(settings.REBORN_DATA_PATH / 'trainers.dat').graph
+    graph = marshal.load_file_cached(
+        settings.REBORN_DATA_PATH / 'trainers.dat', settings.MARSHAL_CACHE_PATH
+    ).graph
     rows = defaultdict(lambda: [])
     
     trainers = marshal.get_array(graph, graph.root_ref())
@@ -3,31 +3,42 @@
 # particular purpose we can get away with simply tokenizing it, ignoring any problematic parts, and
 # converting the tokens to JSON.
 
+import hashlib
 import itertools as it
 import json
 import re
 from reborndb.settings import REBORN_INSTALL_PATH
 
 def lexer(*patterns):
+	# The patterns are combined into a single alternation, with each one wrapped in a named group, so
+	# that each token is found with one `match` call, and the name of the group that matched tells us
+	# which pattern it was. Since the alternatives are tried in order, this matches the same as trying
+	# each pattern in turn would.
 	patterns, callbacks = zip(*patterns)
-	patterns = [re.compile(pattern, re.DOTALL) for pattern in patterns]
+	combined = re.compile('|'.join(f'(?P<t{i}>{pattern})' for i, pattern in enumerate(patterns)), re.DOTALL)
+
+	# group name -> (callback, index of the pattern's own first group in `Match.groups()`, number of
+	# groups in the pattern)
+	rules = {
+		f't{i}': (callback, combined.groupindex[f't{i}'], re.compile(pattern, re.DOTALL).groups)
+		for i, (pattern, callback) in enumerate(zip(patterns, callbacks))
+	}
 
 	def lex(source):
 		i = 0
-		line_i = 0
+		match = combined.match
 
 		while i < len(source):
-			for pattern, callback in zip(patterns, callbacks):
-				m = pattern.match(source, i)
-
-				if m is not None:
-					yield from callback(*m.groups())
-					i = m.end()
-					line_i += m.group(0).count('\n')
-					break
-			else:
+			m = match(source, i)
+
+			if m is None:
+				line_i = source.count('\n', 0, i)
 				raise ValueError(f'input at line {line_i}, index {i} does not match any pattern recognized by the lexer\n---\n{source[i:i + 25]}...\n---')
 
+			callback, first_group, group_count = rules[m.lastgroup]
+			yield from callback(*m.groups()[first_group:first_group + group_count])
+			i = m.end()
+
 	return lex
 
 WHITESPACE = r'\s+'
@@ -67,11 +78,25 @@ def without_trailing_commas(tokens):
 def get_path(script_name):
 	return REBORN_INSTALL_PATH / 'Scripts' / script_name
 
+# path -> (hash of the file's content, parsed result)
+_parsed = {}
+
 def parse(path):
+	"""Parse the script at `path`. The result is cached for as long as the file's content stays
+	the same, so parsing the same script again (e.g. MultipleForms.rb, which is used by several
+	extractors) returns the same object; don't modify it."""
+
 	with open(path, encoding='utf-8') as f:
 		source = f.read()
 
+	digest = hashlib.blake2b(source.encode('utf-8'), digest_size=16).hexdigest()
+	cached = _parsed.get(str(path))
+
+	if cached is not None and cached[0] == digest:
+		return cached[1]
+
 	tokens = without_trailing_commas(lex(source))
 	source_json = ''.join(tokens)
-	return json.loads(source_json, strict=False)
-	
\ No newline at end of file
+	result = json.loads(source_json, strict=False)
+	_parsed[str(path)] = digest, result
+	return result
@@ -7,3 +7,8 @@ REBORN_DB_PATH = Path('C:/mystuff/mycode/reborn-db')
 SITE_PATH = REBORN_DB_PATH / 'reborn-db-site'
 DB_PATH = SITE_PATH / 'db.sqlite'
 DB_ANALYSIS_LIMIT = 0 # 0 for no limit
+MARSHAL_CACHE_PATH = REBORN_DB_PATH / 'marshal-cache' # set to None to disable the cache
+ATLAS_CACHE_PATH = REBORN_DB_PATH / 'atlas-cache' # tileset atlases for map images; None to disable
+BENCHMARK_RESULTS_PATH = REBORN_DB_PATH / 'benchmarks'
+MAP_LOAD_WORKERS = 0 # processes used by `Map.load_all_parallel`; 0 for one per CPU
+EXTRACTOR_WORKERS = 4 # extractors run at once by `scripts.refresh_database`; 0 for one per CPU
@@ -17,13 +17,13 @@
 -------------------
 
 -- Move damage classes (physical, special, or status).
-create table "damage_class" (
+create table if not exists "damage_class" (
 	"name" text primary key
 	,"order" integer not null unique
 ) without rowid;
 
 -- Pokémon types.
-create table "type" (
+create table if not exists "type" (
 	"id" text primary key
 	,"name" text not null unique
 	,"code" integer not null unique
@@ -36,7 +36,7 @@ create table "type" (
 
 -- [An {attacking_type} move hitting a Pokémon with the single type {defending_type} will
 -- have a damage multiplier of {multiplier}.]
-create table "type_effect" (
+create table if not exists "type_effect" (
 	"attacking_type" text
 	,"defending_type" text
 	,"multiplier" real check ("multiplier" in (0, 0.5, 2))
@@ -45,7 +45,7 @@ create table "type_effect" (
 	,foreign key ("defending_type") references "type" ("id")
 ) without rowid;
 
-create index "type_effect_idx_multiplier" on "type_effect" ("multiplier");
+create index if not exists "type_effect_idx_multiplier" on "type_effect" ("multiplier");
 
 -------------------
 -- POKÉMON MOVES --
@@ -54,20 +54,20 @@ create index "type_effect_idx_multiplier" on "type_effect" ("multiplier");
 -- Move 'functions', which are just values that determine what additional effects a move has,
 -- besides the defaults determined by its other attrbutes (e.g. status effects, stat changes).
 -- Each move has exactly one function.
-create table `move_function` (
+create table if not exists `move_function` (
 	`code` text primary key,
 	`desc` text not null
 ) without rowid;
 
 -- Values that determine what targets can be selected for a move (e.g. 'any single Pokémon on the
 -- field', 'always targets all opponents', 'may target self or ally')
-create table `move_target` (
+create table if not exists `move_target` (
 	`code` text primary key,
 	`desc` text not null
 ) without rowid;
 
 -- Moves.
-create table `move` (
+create table if not exists `move` (
 	`id` text primary key,
 	`name` text not null, -- note: not unique because of Hidden Power/Judgement/Multi-Attack
 	`code` integer not null unique,
@@ -89,13 +89,13 @@ create table `move` (
 
 -- Flags used to indicate binary attributes of moves (e.g. is a contact move, is a biting move,
 -- can be reflected by Magic Coat). A move can have many flags; the pivot table is `move_flag_set`.
-create table `move_flag` (
+create table if not exists `move_flag` (
 	`code` text primary key,
 	`desc` text not null
 ) without rowid;
 
 -- `move` to `move_flag` pivot table.
-create table `move_flag_set` (
+create table if not exists `move_flag_set` (
 	`move` text not null,
 	`flag` text not null,
 	primary key (`move`, `flag`),
@@ -108,14 +108,14 @@ create table `move_flag_set` (
 -----------
 
 -- Bag pockets.
-create table `pocket` (
+create table if not exists `pocket` (
 	"name" text primary key
 	,"code" integer not null unique
 ) without rowid;
 
 -- Values specifying how an item is used outside of battle---whether it's on a specific Pokémon or
 -- not, whether it's reusable, etc.
-create table `item_out_battle_usability` (
+create table if not exists `item_out_battle_usability` (
 	`name` text primary key,
 	`code` integer not null unique,
 	`desc` text not null
@@ -123,20 +123,20 @@ create table `item_out_battle_usability` (
 
 -- Values specifying how an item is used in battle---whether it's on a specific Pokémon or not,
 -- whether it's reusable, etc.
-create table `item_in_battle_usability` (
+create table if not exists `item_in_battle_usability` (
 	`name` text primary key,
 	`code` integer not null unique,
 	`desc` text not null
 ) without rowid;
 
 -- Item types, to more specificity than supplied by the bag pocket (e.g. evolution stone, fossil).
-create table "item_type" (
+create table if not exists "item_type" (
 	"name" text primary key,
 	"code" integer not null unique
 ) without rowid;
 
 -- Items.
-create table `item` (
+create table if not exists `item` (
 	`id` text primary key,
 	`name` text not null,
 	`code` integer not null unique,
@@ -154,7 +154,7 @@ create table `item` (
 );
 
 -- Moves taught by TM(X)s.
-create table "machine_item" (
+create table if not exists "machine_item" (
 	"item" text primary key,
 	"pocket" text check ("pocket" = 'TMs & HMs'),
 	"type" text not null check ("type" in ('tm', 'tmx')),
@@ -171,7 +171,7 @@ create table "machine_item" (
 
 -- Pokémon growth rates (these affect how a Pokémon's level is determined from its total EXP
 -- gained).
-create table "growth_rate" (
+create table if not exists "growth_rate" (
 	"name" text primary key
 	,"pbs_name" text not null unique
 	,"order" integer not null unique
@@ -183,7 +183,7 @@ create table "growth_rate" (
 
 -- [A Pokémon with growth rate {growth_rate} requires exactly {exp} EXP in total (including all the
 -- EXP required to attain previous levels) in order to reach level {level}.]
-create table "level_exp" (
+create table if not exists "level_exp" (
 	"growth_rate" text
 	,"level" integer
 	,"exp" integer not null
@@ -195,7 +195,7 @@ create table "level_exp" (
 -- 0--100.
 
 -- Pokémon habitats (as recorded in the FireRed/LeafGreen Pokédex).
-create table "habitat" (
+create table if not exists "habitat" (
 	"name" text primary key
 	,"pbs_name" text not null unique
 	,"order" integer not null unique
@@ -203,7 +203,7 @@ create table "habitat" (
 
 -- Pokémon (non-form-specific data). Note that all Pokémon have at least one form (a Pokémon with
 -- no form differences is one that has only one form).
-create table "pokemon" (
+create table if not exists "pokemon" (
 	"id" text primary key
 	,"name" text not null unique
 	,"number" integer not null unique
@@ -223,14 +223,14 @@ create table "pokemon" (
 ) without rowid;
 
 -- Pokémon egg groups.
-create table "egg_group" (
+create table if not exists "egg_group" (
 	"name" text primary key
 	,"pbs_name" text not null unique
 	,"order" integer not null unique
 ) without rowid;
 
 -- [{egg_group} is one of {pokemon}'s egg groups.]
-create table "pokemon_egg_group" (
+create table if not exists "pokemon_egg_group" (
 	"pokemon" text
 	,"egg_group" not null
 	,primary key ("pokemon", "egg_group")
@@ -238,19 +238,19 @@ create table "pokemon_egg_group" (
 	,foreign key ("egg_group") references "egg_group" ("name")
 ) without rowid;
 
-create index "pokemon_egg_group_idx_egg_group" on "pokemon_egg_group" ("egg_group");
+create index if not exists "pokemon_egg_group_idx_egg_group" on "pokemon_egg_group" ("egg_group");
 
 -- Cry files are found in the directory Audio/SE within the Reborn installation. The file name
 -- matches the glob ???Cry*.ogg. The first three characters give the Pokédex number of the Pokémon
 -- while the part after "Cry" gives the form index. This second part may be missing, in which case
 -- the file gives the default cry for all forms for which there exists no form-specific cry file.
-create table "cry" (
+create table if not exists "cry" (
 	"id" text primary key,	
 	"content" blob not null
 ) without rowid;
 
 -- Pokémon forms.
-create table "pokemon_form" (
+create table if not exists "pokemon_form" (
 	"pokemon" text,
 	"name" text,
 	"order" integer,
@@ -285,7 +285,7 @@ create table "pokemon_form" (
 --     oh, the two are just the two frames---generally second is one pixel lower than first
 --     also, egg sprites only for non-evolutions
 
-create table "pokemon_sprite" (
+create table if not exists "pokemon_sprite" (
 	"pokemon" text,
 	"form" text,
 	-- icon1/icon2 are the first and second frame for the in-party icons
@@ -305,11 +305,11 @@ create table "pokemon_sprite" (
 -- genderless.
 
 -- Pokémon type slots (first, second).
-create table "type_slot" ("index" integer primary key) without rowid;
+create table if not exists "type_slot" ("index" integer primary key) without rowid;
 
 -- Pivot table between `pokemon_form` and `type`, with `type_slot` limiting the number of `type`s
 -- per `pokemon_form`.
-create table `pokemon_type` (
+create table if not exists `pokemon_type` (
 	`pokemon` text,
 	`form` text,
 	`index` integer,
@@ -323,7 +323,7 @@ create table `pokemon_type` (
 -- Unenforced constraint: each `pokemon_form` must have at least one related `pokemon_type`.
 
 -- Pokémon abilities.
-create table `ability` (
+create table if not exists `ability` (
 	`id` text primary key,
 	`name` text not null unique,
 	`code` integer unique not null,
@@ -331,14 +331,14 @@ create table `ability` (
 );
 
 -- Pokémon ability slots (first, second, Hidden).
-create table `ability_slot` (
+create table if not exists `ability_slot` (
 	`index` integer primary key,
 	`name` text not null unique
 ) without rowid;
 
 -- Pivot table between `pokemon_form` and `type`, with `ability_slot` limiting the number of
 -- `ability`s per `pokemon_form`.
-create table "pokemon_ability" (
+create table if not exists "pokemon_ability" (
 	"pokemon" text,
 	"form" text,
 	"index" integer,
@@ -352,7 +352,7 @@ create table "pokemon_ability" (
 -- Unenforced constraint: each `pokemon_form` must have at least one related `pokemon_ability`.
 
 -- Pokémon wild held item rarities (always held, common, uncommon, rare).
-create table "wild_held_item_rarity" (
+create table if not exists "wild_held_item_rarity" (
 	"name" text primary key,
 	"order" integer not null unique,
 	"percentage" integer not null unique
@@ -360,7 +360,7 @@ create table "wild_held_item_rarity" (
 
 -- Pivot table between `pokemon_form` and `item`, with `wild_held_item_rarity` limiting the number
 -- of `items` per "pokemon_form".
-create table "wild_held_item" (
+create table if not exists "wild_held_item" (
 	"pokemon" text,
 	"form" text,
 	"always_held_item" text not null check ("always_held_item" = 'DUMMY'),
@@ -375,14 +375,14 @@ create table "wild_held_item" (
 ) without rowid;
 
 -- The six primary stats (HP, Attack, Defense, Special Attack, Special Defense, Speed).
-create table "stat" (
+create table if not exists "stat" (
 	"id" text primary key,
 	"name" text not null unique,
 	"order" integer not null
 ) without rowid;
 
 -- [{pokemon} ({form} form) has a base {stat} value of {value}.]
-create table "base_stat" (
+create table if not exists "base_stat" (
 	"pokemon" text,
 	"form" text,
 	"stat" text,
@@ -393,7 +393,7 @@ create table "base_stat" (
 ) without rowid;
 
 -- [{pokemon} ({form} form) yields {value} EVs in {stat} when defeated.]
-create table "ev_yield" (
+create table if not exists "ev_yield" (
 	"pokemon" text,
 	"form" text,
 	"stat" text,
@@ -404,7 +404,7 @@ create table "ev_yield" (
 ) without rowid;
 
 -- Moves learned when a Pokémon reaches a particular level.
-create table "level_move" (
+create table if not exists "level_move" (
 	"pokemon" text,
 	"form" text,
 	"level" integer check ("level" >= 0), -- 0 = move learnt on evolution
@@ -419,10 +419,10 @@ create table "level_move" (
 	foreign key ("move") references "move" ("id")
 ) without rowid;
 
-create index "level_move_idx_move" on "level_move" ("move");
+create index if not exists "level_move_idx_move" on "level_move" ("move");
 
 -- Egg moves.
-create table "egg_move" (
+create table if not exists "egg_move" (
 	"pokemon" text,
 	"form" text,
 	"move" text not null,
@@ -431,10 +431,10 @@ create table "egg_move" (
 	foreign key ("move") references "move" ("id")
 ) without rowid;
 
-create index "egg_move_idx_move" on "egg_move" ("move");
+create index if not exists "egg_move_idx_move" on "egg_move" ("move");
 
 -- Moves learnable via TM(X)s.
-create table "machine_move" (
+create table if not exists "machine_move" (
 	"pokemon" text,
 	"form" text,
 	"move" text,
@@ -443,12 +443,12 @@ create table "machine_move" (
 	foreign key ("move") references "move" ("id")
 ) without rowid;
 
-create index "machine_move_idx_move" on "machine_move" ("move");
+create index if not exists "machine_move_idx_move" on "machine_move" ("move");
 
 -- Moves learnable from Move Tutors. (As listed in the tm.txt PBS file. This includes some moves 
 -- for which there isn't actually an existing move tutor NPC in-game, so that they are effectively 
 -- not learnable.)
-create table "tutor_move" (
+create table if not exists "tutor_move" (
 	"pokemon" text,
 	"form" text,
 	"move" text,
@@ -457,9 +457,9 @@ create table "tutor_move" (
 	foreign key ("move") references "move" ("id")
 ) without rowid;
 
-create index "tutor_move_idx_move" on "tutor_move" ("move");
+create index if not exists "tutor_move_idx_move" on "tutor_move" ("move");
 
-create table "move_learn_method" (
+create table if not exists "move_learn_method" (
 	"name" text primary key,
 	"order" integer not null unique
 ) without rowid;
@@ -473,12 +473,12 @@ create table "move_learn_method" (
 -- create table "music_effect" ("name" text primary key) without rowid;
 -- create table "sound_effect" ("name" text primary key) without rowid;
 
-create table "background_music" ("name" text);
-create table "background_sound" ("name" text);
-create table "music_effect" ("name" text);
-create table "sound_effect" ("name" text);
+create table if not exists "background_music" ("name" text);
+create table if not exists "background_sound" ("name" text);
+create table if not exists "music_effect" ("name" text);
+create table if not exists "sound_effect" ("name" text);
 
-create table "map" (
+create table if not exists "map" (
 	"id" integer primary key,
 	"name" text not null, -- name from the MapInfos.rxdata file (appears to reflect in-game name)
 	"pbs_name" text, -- name from the PBS metadata.txt file
@@ -523,9 +523,9 @@ create table "map" (
 	foreign key ("underwater_map") references "map" ("id")
 );
 
-create index "map_idx_parent_id" on "map" ("parent_id");
+create index if not exists "map_idx_parent_id" on "map" ("parent_id");
 
-create table "map_bgm" (
+create table if not exists "map_bgm" (
 	"map" integer primary key,
 	"file" text not null,
 	"volume" integer not null,
@@ -533,7 +533,7 @@ create table "map_bgm" (
 	foreign key ("map") references "map" ("id")
 );
 
-create table "map_bgs" (
+create table if not exists "map_bgs" (
 	"map" integer primary key,
 	"file" text not null,
 	"volume" integer not null,
@@ -541,23 +541,23 @@ create table "map_bgs" (
 	foreign key ("map") references "map" ("id")
 );
 
-create table "field_effect" (
+create table if not exists "field_effect" (
 	"name" text primary key
 	,"code" integer unique not null
 	,"backdrop" text unique not null
 ) without rowid;
 
-create table "tileset_file" (
+create table if not exists "tileset_file" (
 	"name" text primary key,
 	"content" blob not null
 ) without rowid;
 
-create table "panorama" (
+create table if not exists "panorama" (
 	"name" text primary key,
 	"image" blob not null
 ) without rowid;
 
-create table "tileset" (
+create table if not exists "tileset" (
 	"name" text primary key,
 	"id" integer not null unique,
 	"file" text not null,
@@ -571,12 +571,12 @@ create table "tileset" (
 	foreign key ("panorama") references "panorama" ("name")
 ) without rowid;
 
-create table "autotile" (
+create table if not exists "autotile" (
 	"name" text primary key,
 	"image" blob not null
 ) without rowid;
 
-create table "tileset_autotile" (
+create table if not exists "tileset_autotile" (
 	"tileset" text,
 	"index" integer check ("index" >= 0 and "index" < 7),
 	"autotile" text,
@@ -590,7 +590,7 @@ create table "tileset_autotile" (
 -------------------------------
 
 -- Times of day (day, night or dusk---note that dusk is a sub-period of day).
-create table "time_of_day" (
+create table if not exists "time_of_day" (
 	"name" text primary key
 	,"desc" text not null
 	,"order" integer not null unique
@@ -598,10 +598,10 @@ create table "time_of_day" (
 ) without rowid;
 
 -- Pokémon genders.
-create table "gender" ("name" text primary key, "code" integer not null unique) without rowid;
+create table if not exists "gender" ("name" text primary key, "code" integer not null unique) without rowid;
 
 -- Weathers that may occur in the overworld.
-create table "weather" (
+create table if not exists "weather" (
 	"name" text primary key
 	,"desc" text not null
 	,"order" integer not null unique
@@ -609,9 +609,9 @@ create table "weather" (
 
 -- The 'base method' for a evolving a Pokémon--either levelling up, using an item on it, or trading
 -- it. Further requirements are added to these base methods to encode a full evolution method.
-create table "evolution_base_method" ("name" text primary key) without rowid;
+create table if not exists "evolution_base_method" ("name" text primary key) without rowid;
 
-create table "evolution_method" (
+create table if not exists "evolution_method" (
 	"id" text primary key,
 	"pbs_name" text,
 	"base_method" text not null,
@@ -619,7 +619,7 @@ create table "evolution_method" (
 	foreign key ("base_method") references "evolution_base_method" ("name")
 ) without rowid;
 
-create table "evolution_requirement_kind" ("name" text primary key) without rowid;
+create table if not exists "evolution_requirement_kind" ("name" text primary key) without rowid;
 
 -- Evolution requirements. Each requirement represents an atomic proposition; they can be ANDed
 -- together by adding them to the same `evolution_method`, or they can be ORed together by adding
@@ -630,7 +630,7 @@ create table "evolution_requirement_kind" ("name" text primary key) without rowi
 -- specific to the kind. The argument values are set up so that it would be impossible or
 -- meaningless to satisfy two requirements of the same kind (hence we can use (`method`, `kind`) as
 -- the primary key for `evolution_requirement`).
-create table `evolution_requirement` (
+create table if not exists `evolution_requirement` (
 	`method` integer,
 	`kind` text,
 	primary key (`method`, `kind`),
@@ -638,7 +638,7 @@ create table `evolution_requirement` (
 ) without rowid;
 
 -- The Pokémon must have reached a certain level.
-create table `evolution_requirement_level` (
+create table if not exists `evolution_requirement_level` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'level'),
 	`level` integer not null check (`level` >= 0),
@@ -646,7 +646,7 @@ create table `evolution_requirement_level` (
 ) without rowid;
 
 -- A specific item must be used on the Pokémon.
-create table `evolution_requirement_item` (
+create table if not exists `evolution_requirement_item` (
 	`method` integer primary key,
 	`base_method` text not null check (`base_method` = 'item'),
 	`kind` text check (`kind` = 'item'),
@@ -660,7 +660,7 @@ create table `evolution_requirement_item` (
 -- have 'item' as its `base_method`.
 
 -- The Pokémon must hold a specific item.
-create table `evolution_requirement_held_item` (
+create table if not exists `evolution_requirement_held_item` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'held_item'),
 	`item` text not null,
@@ -669,7 +669,7 @@ create table `evolution_requirement_held_item` (
 ) without rowid;
 
 -- The evolution must take place at a specific time of day.
-create table `evolution_requirement_time` (
+create table if not exists `evolution_requirement_time` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'time'),
 	`time` text not null,
@@ -678,7 +678,7 @@ create table `evolution_requirement_time` (
 ) without rowid;
 
 -- The Pokémon must have two stats in a certain order relation.
-create table `evolution_requirement_stat_cmp` (
+create table if not exists `evolution_requirement_stat_cmp` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'stat_cmp'),
 	`stat1` text not null,
@@ -689,7 +689,7 @@ create table `evolution_requirement_stat_cmp` (
 	foreign key (`stat2`) references `stat` (`id`)
 ) without rowid;
 
-create table `evolution_requirement_coin_flip` (
+create table if not exists `evolution_requirement_coin_flip` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'coin_flip'),
 	`value` integer not null check (`value` in (0, 1)),
@@ -697,7 +697,7 @@ create table `evolution_requirement_coin_flip` (
 ) without rowid;
 
 -- The Pokémon must have a certain gender.
-create table `evolution_requirement_gender` (
+create table if not exists `evolution_requirement_gender` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'gender'),
 	`gender` text not null,
@@ -706,7 +706,7 @@ create table `evolution_requirement_gender` (
 ) without rowid;
 
 -- The Pokémon must have a certain Pokémon as a teammate.
-create table `evolution_requirement_teammate` (
+create table if not exists `evolution_requirement_teammate` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'teammate'),
 	`pokemon` text not null,
@@ -715,7 +715,7 @@ create table `evolution_requirement_teammate` (
 ) without rowid;
 
 -- The Pokémon must know a certain move.
-create table `evolution_requirement_move` (
+create table if not exists `evolution_requirement_move` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'move'),
 	`move` text not null,
@@ -724,7 +724,7 @@ create table `evolution_requirement_move` (
 ) without rowid;
 
 -- The evolution must take place within a certain map.
-create table `evolution_requirement_map` (
+create table if not exists `evolution_requirement_map` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'map'),
 	`map` integer not null,
@@ -733,7 +733,7 @@ create table `evolution_requirement_map` (
 ) without rowid;
 
 -- The Pokémon must be traded with a certain other Pokémon.
-create table `evolution_requirement_trademate` (
+create table if not exists `evolution_requirement_trademate` (
 	`method` integer primary key,
 	`base_method` text not null check (`base_method` = 'trade'),
 	`kind` text check (`kind` = 'trademate'),
@@ -744,7 +744,7 @@ create table `evolution_requirement_trademate` (
 ) without rowid;
 
 -- The Pokémon must have a Pokémon of a certain type as a teammate.
-create table `evolution_requirement_teammate_type` (
+create table if not exists `evolution_requirement_teammate_type` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'teammate_type'),
 	`type` text not null,
@@ -753,7 +753,7 @@ create table `evolution_requirement_teammate_type` (
 ) without rowid;
 
 -- The Pokémon must know a move of a certain type.
-create table `evolution_requirement_move_type` (
+create table if not exists `evolution_requirement_move_type` (
 	`method` integer primary key,
 	`kind` text check (`kind` = 'move_type'),
 	`type` text not null,
@@ -762,7 +762,7 @@ create table `evolution_requirement_move_type` (
 ) without rowid;
 
 -- The evolution must take place at a time and place where the overworld weather is of a certain type.
-create table `evolution_requirement_weather` (
+create table if not exists `evolution_requirement_weather` (
 	"method" integer primary key,
 	`kind` text check (`kind` = 'weather'),
 	`weather` text not null,
@@ -771,7 +771,7 @@ create table `evolution_requirement_weather` (
 ) without rowid;
 
 -- Determines the method for evolving one Pokémon into another.
-create table `pokemon_evolution_method` (
+create table if not exists `pokemon_evolution_method` (
 	`from` text,
 	`from_form` text,
 	`to` text not null,
@@ -784,7 +784,7 @@ create table `pokemon_evolution_method` (
 	foreign key (`method`) references `evolution_method` (`id`)
 ) without rowid;
 
-create index "pokemon_evolution_method_from_to_idx" on "pokemon_evolution_method" (
+create index if not exists "pokemon_evolution_method_from_to_idx" on "pokemon_evolution_method" (
 	"from", "to", "from_form", "to_form"
 );
 
@@ -793,7 +793,7 @@ create index "pokemon_evolution_method_from_to_idx" on "pokemon_evolution_method
 --------------------------------------
 
 -- Pokémon natures.
-create table `nature` (
+create table if not exists `nature` (
 	`increased_stat` text,
 	`decreased_stat` text,
 	`id` text not null unique,
@@ -805,13 +805,13 @@ create table `nature` (
 ) without rowid;
 
 -- Pokémon move slots (first, second, third, fourth).
-create table "move_slot" ("index" integer primary key) without rowid;
+create table if not exists "move_slot" ("index" integer primary key) without rowid;
 
 ----------------------
 -- POKÉMON TRAINERS --
 ----------------------
 
-create table "trainer_type" (
+create table if not exists "trainer_type" (
 	"id" text primary key,
 	"name" text not null,
 	"code" integer not null unique,
@@ -830,7 +830,7 @@ create table "trainer_type" (
 	foreign key ("gender") references "gender" ("name")
 ) without rowid;
 
-create table "trainer" (
+create table if not exists "trainer" (
 	"type" text,
 	"name" text,
 	"party_id" integer,
@@ -839,7 +839,7 @@ create table "trainer" (
 	foreign key ("type") references "trainer_type" ("id")
 ) without rowid;
 
-create table "trainer_item" (
+create table if not exists "trainer_item" (
 	"trainer_type" text,
 	"trainer_name" text,
 	"party_id" integer,
@@ -850,7 +850,7 @@ create table "trainer_item" (
 	foreign key ("item") references "item" ("id")
 ) without rowid;
 
-create table "trainer_pokemon" (
+create table if not exists "trainer_pokemon" (
 	"trainer_type" text,
 	"trainer_name" text,
 	"party_id" integer,
@@ -886,7 +886,7 @@ create table "trainer_pokemon" (
 -- on personal id), some can only have first/second but not hidden
 -- also arcade star carol's meowstic, which has variable gender and hence form, will choose from a different
 -- set of abilities accordingly!
-create table "trainer_pokemon_ability" (
+create table if not exists "trainer_pokemon_ability" (
 	"trainer_type" text,
 	"trainer_name" text,
 	"party_id" integer,
@@ -897,7 +897,7 @@ create table "trainer_pokemon_ability" (
 	foreign key ("ability") references "ability_slot" ("index")
 ) without rowid;
 
-create table "trainer_pokemon_move" (
+create table if not exists "trainer_pokemon_move" (
 	"trainer_type" text,
 	"trainer_name" text,
 	"party_id" integer,
@@ -910,7 +910,7 @@ create table "trainer_pokemon_move" (
 	foreign key ("move") references "move" ("id")
 ) without rowid;
 
-create table "trainer_pokemon_ev" (
+create table if not exists "trainer_pokemon_ev" (
 	"trainer_type" text,
 	"trainer_name" text,
 	"party_id" integer,
@@ -922,7 +922,7 @@ create table "trainer_pokemon_ev" (
 	foreign key ("stat") references "stat" ("id")
 ) without rowid;
 
-create table "trainer_pokemon_iv" (
+create table if not exists "trainer_pokemon_iv" (
 	"trainer_type" text,
 	"trainer_name" text,
 	"party_id" integer,
@@ -934,14 +934,14 @@ create table "trainer_pokemon_iv" (
 	foreign key ("stat") references "stat" ("id")
 ) without rowid;
 
-create table "trainer_list" (
+create table if not exists "trainer_list" (
 	"id" integer primary key
 	,"trainers_file" text not null
 	,"pokemon_file" text not null
 	,"is_default" integer not null check ("is_default" in (0, 1))
 );
 
-create table "battle_facility_trainer" (
+create table if not exists "battle_facility_trainer" (
 	"list" integer
 	,"index" integer
 	,"type" text not null
@@ -955,7 +955,7 @@ create table "battle_facility_trainer" (
 	-- ,unique ("type", "name")
 ) without rowid;
 
-create table "battle_facility_trainer_pokemon" (
+create table if not exists "battle_facility_trainer_pokemon" (
 	"list" integer
 	,"trainer_index" integer
 	,"pokemon_index" integer
@@ -967,7 +967,7 @@ create table "battle_facility_trainer_pokemon" (
 
 -- Pokémon sets for use in battle facilities.
 -- Depends on "pokemon_form", "item", "nature" and "ability_slot".
-create table "battle_facility_set" (
+create table if not exists "battle_facility_set" (
 	"list" integer
 	,"index" integer
 	,"pokemon" text not null
@@ -985,7 +985,7 @@ create table "battle_facility_set" (
 
 -- Determines what move a Pokémon set from "battle_facility_set" in a particular slot.
 -- Depends on "battle_facility_set", "move_slot" and "move".
-create table "battle_facility_set_move" (
+create table if not exists "battle_facility_set_move" (
 	"list" integer
 	,"set_index" integer
 	,"move_index" integer
@@ -1003,7 +1003,7 @@ create table "battle_facility_set_move" (
 -- (The amounts are not specified; the Pokémon's 510 available EVs will be evenly distributed
 -- between the stats that are to have EVs in them as designated by this table.)
 -- Depends on "battle_facility_set", "stat".
-create table "battle_facility_set_ev_stat" (
+create table if not exists "battle_facility_set_ev_stat" (
 	"list" integer
 	,"set_index" integer
 	,"stat" text
@@ -1016,10 +1016,10 @@ create table "battle_facility_set_ev_stat" (
 -- EVENTS --
 ------------
 
-create table "game_switch" ("id" integer primary key, "name" text not null);
-create table "game_variable" ("id" integer primary key, "name" text not null);
+create table if not exists "game_switch" ("id" integer primary key, "name" text not null);
+create table if not exists "game_variable" ("id" integer primary key, "name" text not null);
 
-create table "direction" ("name" text primary key, "code" integer not null unique) without rowid;
+create table if not exists "direction" ("name" text primary key, "code" integer not null unique) without rowid;
 insert into "direction" ("name", "code")
 values
 ('none', 0),
@@ -1028,7 +1028,7 @@ values
 ('right', 6),
 ('up', 8);
 
-create table "move_type" ("name" text primary key, "code" integer not null unique) without rowid;
+create table if not exists "move_type" ("name" text primary key, "code" integer not null unique) without rowid;
 insert into "move_type" ("name", "code")
 values
 ('fixed', 0),
@@ -1036,7 +1036,7 @@ values
 ('approach', 2),
 ('custom', 3);
 
-create table "move_speed" ("name" text primary key, "code" integer not null unique) without rowid;
+create table if not exists "move_speed" ("name" text primary key, "code" integer not null unique) without rowid;
 insert into "move_speed" ("name", "code")
 values
 ('slowest', 1), -- the superior unit system
@@ -1046,7 +1046,7 @@ values
 ('faster', 5),
 ('fastest', 6);
 
-create table "move_frequency" ("name" text primary key, "code" integer not null unique) without rowid;
+create table if not exists "move_frequency" ("name" text primary key, "code" integer not null unique) without rowid;
 insert into "move_frequency" ("name", "code")
 values
 ('lowest', 1),
@@ -1065,19 +1065,19 @@ create table if not exists "common_event" (
 	foreign key ("switch") references "game_switch" ("id")
 );
 
-create table "common_event_trigger" ("name" text primary key, "code" integer not null unique) without rowid;
+create table if not exists "common_event_trigger" ("name" text primary key, "code" integer not null unique) without rowid;
 insert into "common_event_trigger" ("name", "code")
 values
 ('none', 0),
 ('autorun', 1),
 ('parallel', 2);
 
-create table "character_file" (
+create table if not exists "character_file" (
 	"name" text primary key,
 	"content" blob not null
 ) without rowid;
 
-create table "character_image" (
+create table if not exists "character_image" (
 	"file" text,
 	"direction" text check ("direction" != 'none'),
 	"pattern" integer check ("pattern" between 0 and 3),
@@ -1093,13 +1093,13 @@ create table "character_image" (
 
 -- The three types of terrain on a map, which are distinguished with respect to encounter rates
 -- (grass, cave and water).
-create table "terrain" ("name" text primary key, "order" integer not null unique) without rowid;
+create table if not exists "terrain" ("name" text primary key, "order" integer not null unique) without rowid;
 
 -- The chance of encountering a wild Pokémon per step (as a fraction of 250), for each map and
 -- terrain type. This is for any Pokémon; the chances of encountering each specific Pokémon,
 -- conditional on an encounter having started already, are given in `pokemon_encounter_rate`.
 -- Depends on `map` and `terrain`.
-create table `map_encounter_rate` (
+create table if not exists `map_encounter_rate` (
 	`map` integer,
 	`terrain` text not null, 
 	`rate` integer not null check (`rate` >= 0 and `rate` <= 250),
@@ -1113,7 +1113,7 @@ create table `map_encounter_rate` (
 
 -- The various methods of initiating an encounter (e.g. walking on the ground, using the Old Rod,
 -- headbutting a tree).
-create table "encounter_method" (
+create table if not exists "encounter_method" (
 	"name" text primary key,
 	"order" integer not null unique,
 	"desc" text not null
@@ -1122,7 +1122,7 @@ create table "encounter_method" (
 -- The chance of encountering a given wild Pokémon, given that an encounter has started, for each
 -- map, encounter method and level.
 -- Depends on `map`, `encounter_method` and `pokemon_form`.
-create table "pokemon_encounter_rate" (
+create table if not exists "pokemon_encounter_rate" (
 	"map" integer,
 	"method" text,
 	"pokemon" text,
@@ -1136,12 +1136,12 @@ create table "pokemon_encounter_rate" (
 	foreign key ("pokemon", "form") references "pokemon_form" ("pokemon", "name")
 );
 
-create index "pokemon_encounter_rate_idx" on "pokemon_encounter_rate" (
+create index if not exists "pokemon_encounter_rate_idx" on "pokemon_encounter_rate" (
 	"map", "method", "pokemon", "form", "rate" collate "frac" desc
 );
 
 -- Verbal notes to explain how an encounter's form is determined, if not by area.
-create table "pokemon_encounter_form_note" (
+create table if not exists "pokemon_encounter_form_note" (
 	"pokemon" text
 	,"note" text not null
 	,primary key ("pokemon")
@@ -1235,7 +1235,7 @@ create table if not exists "encounter_map_event" (
 	foreign key ("map") references "map" ("id")
 );
 
-create table "roam_path" (
+create table if not exists "roam_path" (
 	"from_map" integer,
 	"to_map" integer,
 	primary key ("from_map", "to_map"),
@@ -1243,7 +1243,7 @@ create table "roam_path" (
 	foreign key ("to_map") references "to" ("id")
 ) without rowid;
 
-create table "roam_type" (
+create table if not exists "roam_type" (
 	"name" text primary key,
 	"order" integer not null unique,
 	"desc" text not null
@@ -1257,7 +1257,7 @@ values
 ('Fishing', 3, 'Encountered when fishing.'),
 ('Surfing or fishing', 4, 'Encountered when surfing or fishing.');
 
-create table "roam_type_encounter_method" (
+create table if not exists "roam_type_encounter_method" (
 	"roam_type" text,
 	"method" text,
 	primary key ("roam_type", "method"),
@@ -1265,7 +1265,7 @@ create table "roam_type_encounter_method" (
 	foreign key ("method") references "encounter_method" ("name")
 );
 
-create table "roamer" (
+create table if not exists "roamer" (
 	"id" integer primary key,
 	"pokemon" text not null,
 	"level" integer not null,
@@ -1278,7 +1278,7 @@ create table "roamer" (
 	foreign key ("switch") references "game_switch" ("id")
 ) without rowid;
 
-create table "fossil" (
+create table if not exists "fossil" (
 	"item" text,
 	"pokemon" text,
 	primary key ("item", "pokemon"),
@@ -1290,7 +1290,7 @@ create table "fossil" (
 -- THEME TEAMS --
 -----------------
 
-create table "theme_team" (
+create table if not exists "theme_team" (
 	"trainer_id" integer,
 	"trainer_name" text not null,
 	"team_name" text not null,
@@ -1302,7 +1302,7 @@ create table "theme_team" (
 	foreign key ("field_effect") references "field_effect" ("code")
 ) without rowid;
 
-create table "elite_4_challenger" (
+create table if not exists "elite_4_challenger" (
 	"theme_team_trainer_id" integer primary key,
 	"type" text,
 	"pre_battle_speech" text not null,
@@ -1,3 +1,20 @@
+-- The tiles, tileset and music of each map, and the content hash of the map's file, which is used to
+-- tell which maps have changed since they were extracted (see `reborndb.extractors.map_data`).
+create table "marshal_mapdata" (
+	"map_id" integer primary key,
+	"tileset" integer,
+	"width" integer,
+	"height" integer,
+	"data" blob, -- the tiles, as a numpy array saved in .npy format
+	"bgm_file" text,
+	"bgm_volume" integer,
+	"bgm_pitch" integer,
+	"bgs_file" text,
+	"bgs_volume" integer,
+	"bgs_pitch" integer,
+	"hash" blob not null
+);
+
 create table "map_event" (
 	"map_id" integer, 
 	"event_id" integer,
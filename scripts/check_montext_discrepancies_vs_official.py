@@ -346,7 +346,7 @@ def run(game):
 
     query_result = altconnect(VEEKUN_PATH).execscript(
         settings.REBORN_DB_PATH / 'queries' / 'extern' / 'veekun-montext.sql'
-    ).fetchall()[0][0]
+    )[0][0]
 
     veekun_data = normalize_veekun_data(json.loads(query_result))
 
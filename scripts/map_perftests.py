@@ -0,0 +1,85 @@
+# Compares the speed of building `Map` objects from already-loaded Marshal graphs using the
+# compiled `InstDecoder`s against the plain `get_inst` path, over every map in the Reborn
+# installation.
+#
+#   env\Scripts\python -m scripts.map_perftests
+#
+# Only `Map.get` is timed; the Marshal data is loaded beforehand.
+
+import itertools as it
+import statistics
+import time
+from parsers import marshal
+from parsers.rpg.map import Map
+from reborndb import settings
+
+REPEATS = 3
+
+# Stand-ins for the methods of `InstDecoder`, which go through `get_inst` instead.
+
+def call_uncompiled(decoder, graph, ref):
+    def ctor(**inst_vars):
+        return decoder.ctor(**{decoder.renames.get(name, name): value for name, value in inst_vars.items()})
+
+    return marshal.get_inst(graph, ref, decoder.class_name, ctor, decoder.inst_var_callbacks)
+
+def get_values_uncompiled(decoder, graph, ref):
+    def ctor(**inst_vars):
+        return [inst_vars[name] for name in decoder.names]
+
+    return marshal.get_inst(graph, ref, decoder.class_name, ctor, decoder.inst_var_callbacks)
+
+def load_graphs():
+    for map_id in it.count(1):
+        path = settings.REBORN_DATA_PATH / f'Map{map_id:03}.rxdata'
+
+        try:
+            graph = marshal.load_file(str(path), fast=True).graph
+        except FileNotFoundError:
+            return
+
+        yield map_id, graph
+
+def timeit(callback):
+    ts = []
+
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        result = callback()
+        t1 = time.perf_counter()
+        ts.append(t1 - t0)
+
+    return result, statistics.mean(ts)
+
+def run():
+    totals = {'compiled': 0.0, 'uncompiled': 0.0}
+    compiled_methods = marshal.InstDecoder.__call__, marshal.InstDecoder.get_values
+
+    for map_id, graph in load_graphs():
+        get_map = lambda: Map.get(graph, graph.root_ref())
+        marshal.InstDecoder.__call__ = call_uncompiled
+        marshal.InstDecoder.get_values = get_values_uncompiled
+
+        try:
+            uncompiled, uncompiled_t = timeit(get_map)
+        finally:
+            marshal.InstDecoder.__call__, marshal.InstDecoder.get_values = compiled_methods
+
+        compiled, compiled_t = timeit(get_map)
+
+        if repr(compiled) != repr(uncompiled):
+            raise AssertionError(f'the decoders produced different maps for map {map_id}')
+
+        totals['compiled'] += compiled_t
+        totals['uncompiled'] += uncompiled_t
+
+        print('Map{:03}: get_inst mean {:.3f} s, compiled mean {:.3f} s ({:.1f}x)'.format(
+            map_id, uncompiled_t, compiled_t, uncompiled_t / compiled_t
+        ))
+
+    print('total: get_inst {:.3f} s, compiled {:.3f} s ({:.1f}x)'.format(
+        totals['uncompiled'], totals['compiled'], totals['uncompiled'] / totals['compiled']
+    ))
+
+if __name__ == '__main__':
+    run()
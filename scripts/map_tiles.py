@@ -0,0 +1,56 @@
+# Exports the tile data of every map, so that the maps of two versions of the game can be compared.
+#
+#   env\Scripts\python -m scripts.map_tiles export <output directory> [csv]
+#   env\Scripts\python -m scripts.map_tiles diff <old export directory> <new export directory>
+#
+# `export` saves each map's tiles as `Map<id>.npy` (see `Table.save`), plus `Map<id>.csv` (see
+# `Table.write_csv`) if `csv` is given, for diffing with ordinary text tools. `diff` compares two
+# sets of `.npy` files and reports the maps that were added, removed, resized or changed, with the
+# number of tiles that changed in each layer.
+
+from pathlib import Path
+import sys
+import numpy as np
+from parsers.rpg.map import Map
+
+def export(output_dir, fmt=None):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for map_id, map_ in Map.load_all_parallel():
+        map_.data.save(output_dir / f'Map{map_id:03}.npy')
+
+        if fmt == 'csv':
+            with (output_dir / f'Map{map_id:03}.csv').open('w', encoding='ascii', newline='') as f:
+                map_.data.write_csv(f)
+
+    print(f'exported map tiles to {output_dir}')
+
+def diff(old_dir, new_dir):
+    old_paths = {path.name: path for path in Path(old_dir).glob('Map*.npy')}
+    new_paths = {path.name: path for path in Path(new_dir).glob('Map*.npy')}
+
+    for name in sorted(old_paths.keys() | new_paths.keys()):
+        if name not in new_paths:
+            print(f'{name}: removed')
+            continue
+
+        if name not in old_paths:
+            print(f'{name}: added')
+            continue
+
+        old, new = np.load(old_paths[name]), np.load(new_paths[name])
+
+        if old.shape != new.shape:
+            print(f'{name}: resized from {old.shape} to {new.shape}')
+            continue
+
+        # number of changed tiles in each layer
+        changed = (old != new).sum(axis=(0, 1))
+
+        if changed.any():
+            print(f'{name}: changed tiles per layer: {", ".join(map(str, changed.tolist()))}')
+
+if __name__ == '__main__':
+    command, *args = sys.argv[1:]
+    {'export': export, 'diff': diff}[command](*args)
@@ -0,0 +1,150 @@
+# Times the Marshal loaders and `Map.get` on the synthetic corpus from `scripts.marshal_corpus`,
+# so that the numbers don't depend on which version of the game happens to be installed.
+#
+#   env\Scripts\python -m scripts.marshal_benchmarks [tier names]
+#
+# Loading (`marshal.load` in each of its modes) and decoding (`Map.get` on an already-loaded graph)
+# are timed separately. The corpus is generated in memory before timing starts.
+#
+# The results are saved as JSON in `settings.BENCHMARK_RESULTS_PATH`, one file per run, named after
+# the time and the commit that was checked out, and compared against the previous run's file so
+# that regressions are easy to spot.
+
+from datetime import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from parsers import marshal
+from parsers.rpg.map import Map
+from reborndb import settings
+from scripts import marshal_corpus
+
+REPEATS = 5
+
+DEFAULT_TIERS = ['small', 'medium', 'large']
+
+LOAD_MODES = {
+    'fast': {'fast': True},
+    'lazy': {'lazy': True},
+    'compact': {'compact': True},
+}
+
+# `Map.get` is timed on graphs from these load modes
+GET_MODES = ['fast', 'compact']
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+    return commit, bool(dirty)
+
+def timeit(callback):
+    ts = []
+
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        result = callback()
+        t1 = time.perf_counter()
+        ts.append(t1 - t0)
+
+    return result, {'mean': statistics.mean(ts), 'min': min(ts)}
+
+def run_tier(tier_name):
+    results = {'files': {}, 'get': {}}
+
+    for filename, data in marshal_corpus.generate(tier_name).items():
+        file_results = results['files'][filename] = {'size': len(data), 'load': {}}
+        graphs = {}
+
+        for mode, kwargs in LOAD_MODES.items():
+            loaded, file_results['load'][mode] = timeit(lambda: marshal.load(data, **kwargs))
+            graphs[mode] = loaded.graph
+
+            print('{} {} ({} KiB): load ({}) mean {:.4f} s'.format(
+                tier_name, filename, len(data) // 1024, mode, file_results['load'][mode]['mean']
+            ))
+
+        if not filename.startswith('Map'):
+            continue
+
+        for mode in GET_MODES:
+            graph = graphs[mode]
+            _, results['get'][mode] = timeit(lambda: Map.get(graph, graph.root_ref()))
+
+            print('{} {}: Map.get ({}) mean {:.4f} s'.format(
+                tier_name, filename, mode, results['get'][mode]['mean']
+            ))
+
+    return results
+
+def previous_results():
+    paths = sorted(settings.BENCHMARK_RESULTS_PATH.glob('marshal-*.json'))
+    if not paths: return None
+    return json.loads(paths[-1].read_text(encoding='utf-8'))
+
+def compare(old, new):
+    """Prints how the mean times in `new` compare to those in `old`, for whatever they have in
+    common."""
+
+    print('compared with {} (commit {}):'.format(old['timestamp'], old['commit']))
+
+    for tier_name, tier in new['tiers'].items():
+        old_tier = old['tiers'].get(tier_name)
+        if old_tier is None: continue
+        timings = []
+
+        for filename, file_results in tier['files'].items():
+            for mode, t in file_results['load'].items():
+                try:
+                    old_t = old_tier['files'][filename]['load'][mode]
+                except KeyError:
+                    continue
+
+                timings.append((f'{filename} load ({mode})', old_t, t))
+
+        for mode, t in tier['get'].items():
+            if mode in old_tier['get']:
+                timings.append((f'Map.get ({mode})', old_tier['get'][mode], t))
+
+        for label, old_t, t in timings:
+            print('  {} {}: {:.4f} s -> {:.4f} s ({:+.1f}%)'.format(
+                tier_name, label, old_t['mean'], t['mean'],
+                100 * (t['mean'] - old_t['mean']) / old_t['mean']
+            ))
+
+def run(*tier_names):
+    commit, dirty = git_commit()
+    timestamp = datetime.now().replace(microsecond=0)
+
+    results = {
+        'timestamp': timestamp.isoformat(), 'commit': commit, 'dirty': dirty,
+        'python': platform.python_version(), 'repeats': REPEATS,
+        'tiers': {tier_name: run_tier(tier_name) for tier_name in tier_names or DEFAULT_TIERS},
+    }
+
+    old = previous_results()
+    if old is not None: compare(old, results)
+
+    settings.BENCHMARK_RESULTS_PATH.mkdir(parents=True, exist_ok=True)
+
+    path = settings.BENCHMARK_RESULTS_PATH / 'marshal-{}-{}.json'.format(
+        timestamp.strftime('%Y%m%d-%H%M%S'), (commit or 'unknown')[:10]
+    )
+
+    path.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print(f'results saved to {path}')
+
+if __name__ == '__main__':
+    run(*sys.argv[1:])
@@ -0,0 +1,419 @@
+# Generates synthetic Marshal files for benchmarking the parsers, without needing a copy of the
+# game (or a Ruby interpreter).
+#
+#   env\Scripts\python -m scripts.marshal_corpus <output directory> [tier names]
+#
+# For each size tier this writes a MapXXX.rxdata file, shaped like the ones RPG Maker XP produces
+# (events with pages with lists of commands, a big Table of tile IDs, move routes whose commands
+# are shared with the following "continue set move route" commands, and so on) which
+# `parsers.rpg.map.Map.get` is able to decode, plus a MiscXXX.rxdata file containing the kinds of
+# values that don't appear in maps but that the loaders still need to handle quickly: bignums,
+# floats, lots of symbol links and object links.
+#
+# The output is deterministic for a given tier, so the files can be regenerated from scratch
+# rather than being kept around.
+
+from dataclasses import dataclass
+import math
+from pathlib import Path
+import random
+import struct
+import sys
+from typing import Any, NamedTuple
+
+### Ruby-ish values ###############################################################################
+
+class Symbol(str):
+    """A Ruby symbol. Ordinary Python strings are written as Ruby strings."""
+
+@dataclass(eq=False)
+class Object:
+    class_name: str
+    inst_vars: dict[str, Any] # names without the leading @
+
+@dataclass(eq=False)
+class UserData:
+    class_name: str
+    data: bytes
+
+### Writer ########################################################################################
+
+# Ruby fixnums are 31-bit on the platforms RPG Maker runs on, so anything outside this range is
+# written as a bignum.
+FIXNUM_MIN = -2 ** 30
+FIXNUM_MAX = 2 ** 30 - 1
+
+class Writer:
+    """Writes values in the Marshal format.
+
+    Object links are created for any value (other than a fixnum, nil or boolean) that is written
+    more than once, going by identity, so to get a link you just need to reuse the same Python
+    object. Note that this includes strings---CPython will often share equal string constants,
+    which is fine, since the result is still valid Marshal data. Floats are the exception: they
+    are linked whenever they're equal, since that's what Ruby does (most floats are immediate
+    values in Ruby, like fixnums, so two equal floats are the same object).
+
+    >>> Writer().dump([Symbol('a'), Symbol('a'), 2 ** 40, 1.5])
+    b'\\x04\\x08[\\t:\\x06a;\\x00l+\\x08\\x00\\x00\\x00\\x00\\x00\\x01f\\x081.5'
+    """
+
+    def __init__(self) -> None:
+        self.out = bytearray()
+        self.symbols: dict[str, int] = {}
+
+        # id (or the repr, for floats) -> (index, value); the value is stored so that the id can't
+        # be reused while we're still writing
+        self.objects: dict[int | str, tuple[int, Any]] = {}
+
+    def dump(self, value: Any) -> bytes:
+        self.out += b'\x04\x08'
+        self.write(value)
+        return bytes(self.out)
+
+    def write_long(self, x: int) -> None:
+        if x == 0:
+            self.out.append(0)
+        elif 0 < x < 123:
+            self.out.append(x + 5)
+        elif -124 < x < 0:
+            self.out.append((x - 5) & 0xff)
+        else:
+            bytes_ = bytearray()
+
+            for size in range(1, 5):
+                bytes_.append(x & 0xff)
+                x >>= 8
+
+                if x == 0:
+                    self.out.append(size)
+                    break
+
+                if x == -1:
+                    self.out.append(256 - size)
+                    break
+            else:
+                raise ValueError('value is too large to be written as a long')
+
+            self.out += bytes_
+
+    def write_byte_seq(self, bytes_: bytes) -> None:
+        self.write_long(len(bytes_))
+        self.out += bytes_
+
+    def write_symbol(self, name: str) -> None:
+        try:
+            index = self.symbols[name]
+        except KeyError:
+            self.symbols[name] = len(self.symbols)
+            self.out += b':'
+            self.write_byte_seq(name.encode('utf-8'))
+        else:
+            self.out += b';'
+            self.write_long(index)
+
+    def write_inst_vars(self, inst_vars: dict[str, Any]) -> None:
+        self.write_long(len(inst_vars))
+
+        for name, value in inst_vars.items():
+            self.write_symbol(f'@{name}')
+            self.write(value)
+
+    def write(self, value: Any) -> None:
+        if value is None:
+            self.out += b'0'
+        elif value is True:
+            self.out += b'T'
+        elif value is False:
+            self.out += b'F'
+        elif isinstance(value, int) and FIXNUM_MIN <= value <= FIXNUM_MAX:
+            self.out += b'i'
+            self.write_long(value)
+        elif isinstance(value, Symbol):
+            self.write_symbol(value)
+        else:
+            key = repr(value) if isinstance(value, float) else id(value)
+
+            if key in self.objects:
+                self.out += b'@'
+                self.write_long(self.objects[key][0])
+            else:
+                self.objects[key] = len(self.objects), value
+                self.write_object(value)
+
+    def write_object(self, value: Any) -> None:
+        if isinstance(value, int):
+            magnitude = abs(value).to_bytes((abs(value).bit_length() + 7) // 8, 'little')
+            word_length = (len(magnitude) + 1) // 2
+            self.out += b'l+' if value >= 0 else b'l-'
+            self.write_long(word_length)
+            self.out += magnitude.ljust(word_length * 2, b'\x00')
+        elif isinstance(value, float):
+            self.out += b'f'
+
+            if math.isnan(value):
+                self.write_byte_seq(b'nan')
+            elif math.isinf(value):
+                self.write_byte_seq(b'inf' if value > 0 else b'-inf')
+            else:
+                self.write_byte_seq(repr(value).encode('ascii'))
+        elif isinstance(value, str):
+            # Strings from RPG Maker are UTF-8, which Ruby records with an E instance variable
+            self.out += b'I"'
+            self.write_byte_seq(value.encode('utf-8'))
+            self.write_long(1)
+            self.write_symbol('E')
+            self.out += b'T'
+        elif isinstance(value, bytes):
+            self.out += b'"'
+            self.write_byte_seq(value)
+        elif isinstance(value, list):
+            self.out += b'['
+            self.write_long(len(value))
+            for item in value: self.write(item)
+        elif isinstance(value, dict):
+            self.out += b'{'
+            self.write_long(len(value))
+
+            for key, item in value.items():
+                self.write(key)
+                self.write(item)
+        elif isinstance(value, Object):
+            self.out += b'o'
+            self.write_symbol(value.class_name)
+            self.write_inst_vars(value.inst_vars)
+        elif isinstance(value, UserData):
+            self.out += b'u'
+            self.write_symbol(value.class_name)
+            self.write_byte_seq(value.data)
+        else:
+            raise TypeError(f'cannot write value of type {type(value).__name__}')
+
+def dump(value: Any) -> bytes:
+    return Writer().dump(value)
+
+### RPG Maker objects #############################################################################
+
+def table(dims: list[int], values: list[int]) -> UserData:
+    width, height, depth = dims + [1] * (3 - len(dims))
+    header = struct.pack('<5l', len(dims), width, height, depth, width * height * depth)
+    return UserData('Table', header + struct.pack(f'<{len(values)}h', *values))
+
+def audio_file(name: str, volume: int = 100, pitch: int = 100) -> Object:
+    return Object('RPG::AudioFile', {'name': name, 'volume': volume, 'pitch': pitch})
+
+def move_command(code: int, *parameters: Any) -> Object:
+    return Object('RPG::MoveCommand', {'code': code, 'parameters': [*parameters]})
+
+def move_route(commands: list[Object], repeat: bool = True) -> Object:
+    return Object('RPG::MoveRoute', {'repeat': repeat, 'skippable': False, 'list': commands})
+
+def event_command(code: int, indent: int, *parameters: Any) -> Object:
+    return Object('RPG::EventCommand', {
+        'code': code, 'indent': indent, 'parameters': [*parameters]
+    })
+
+class Tier(NamedTuple):
+    map_id: int
+    width: int
+    height: int
+    event_count: int
+    page_count: int
+    command_count: int # per page, roughly
+    misc_count: int # records in the misc file
+
+TIERS = {
+    'small': Tier(1, 20, 15, 5, 2, 10, 1000),
+    'medium': Tier(2, 60, 50, 40, 3, 30, 10000),
+    'large': Tier(3, 120, 100, 150, 4, 60, 50000),
+    'huge': Tier(4, 250, 250, 400, 4, 120, 200000),
+}
+
+class MapGenerator:
+    """Generates RPG::Map objects. The command lists are made of well-formed blocks (every
+    conditional branch has its else and end, every choice its branches, and so on) so that they
+    make sense to anything that looks at the indentation."""
+
+    CHARACTER_NAMES = ['NPC 01', 'NPC 02', 'trchar000', 'Object ball', '']
+    SWITCH_STATES = [0, 1]
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+
+        # Shared between commands, as RPG Maker does with anything copied and pasted
+        self.sound_effect = audio_file('Choose', 80, 100)
+        self.tone = UserData('Tone', struct.pack('<4d', -34.0, -34.0, 0.0, 68.0))
+        self.color = UserData('Color', struct.pack('<4d', 255.0, 255.0, 255.0, 128.0))
+
+    def simple_command(self, indent: int) -> list[Object]:
+        rng = self.rng
+
+        return rng.choice([
+            lambda: [event_command(106, indent, rng.randrange(1, 40))],
+            lambda: [event_command(117, indent, rng.randrange(1, 200))],
+            lambda: [event_command(
+                122, indent, rng.randrange(1, 100), rng.randrange(1, 100), 0, 0, rng.randrange(100)
+            )],
+            lambda: [event_command(123, indent, 'A', rng.choice(self.SWITCH_STATES))],
+            lambda: [event_command(250, indent, self.sound_effect)],
+            lambda: [event_command(223, indent, self.tone, 20)],
+            lambda: [event_command(224, indent, self.color, 5)],
+            lambda: [event_command(204, indent, 1, 'fog', 0, 64, 0, 200, 0, 0)],
+        ])()
+
+    def block(self, indent: int, depth: int = 0) -> list[Object]:
+        rng = self.rng
+        kind = rng.randrange(7 if depth < 2 else 4)
+
+        if kind == 0:
+            return [
+                event_command(101, indent, f'Hello, \\PN! This is line {rng.randrange(1000)}.'),
+                event_command(401, indent, 'And this is the next line, é.'),
+            ]
+
+        if kind == 1:
+            return [
+                event_command(355, indent, 'pbWildBattle(PBSpecies::PIKACHU,5)'),
+                event_command(655, indent, f'$game_variables[{rng.randrange(1, 100)}] = 1'),
+            ]
+
+        if kind == 2:
+            commands = [
+                move_command(rng.randrange(1, 13)), move_command(15, rng.randrange(1, 10)),
+                move_command(14, rng.randrange(-2, 3), rng.randrange(-2, 3)),
+                move_command(41, rng.choice(self.CHARACTER_NAMES), 0, 2, 0),
+            ]
+
+            # The 509 commands refer to the very same objects as the route does
+            return [
+                event_command(209, indent, -1, move_route([*commands, move_command(0)], False)),
+                *(event_command(509, indent, command) for command in commands),
+            ]
+
+        if kind == 3:
+            return self.simple_command(indent)
+
+        if kind == 4:
+            return [
+                event_command(111, indent, 0, rng.randrange(1, 100), 0),
+                *self.block(indent + 1, depth + 1), event_command(0, indent + 1),
+                event_command(411, indent),
+                *self.block(indent + 1, depth + 1), event_command(0, indent + 1),
+                event_command(412, indent),
+            ]
+
+        if kind == 5:
+            return [
+                event_command(102, indent, ['Yes', 'No'], 2),
+                event_command(402, indent, 0, 'Yes'),
+                *self.block(indent + 1, depth + 1), event_command(0, indent + 1),
+                event_command(402, indent, 1, 'No'),
+                *self.block(indent + 1, depth + 1), event_command(0, indent + 1),
+                event_command(404, indent),
+            ]
+
+        return [
+            event_command(112, indent),
+            *self.block(indent + 1, depth + 1), event_command(113, indent + 1),
+            event_command(0, indent + 1),
+            event_command(413, indent),
+        ]
+
+    def command_list(self, command_count: int) -> list[Object]:
+        commands = []
+
+        while len(commands) < command_count:
+            commands.extend(self.block(0))
+
+        commands.append(event_command(0, 0))
+        return commands
+
+    def page(self, command_count: int) -> Object:
+        rng = self.rng
+
+        condition = Object('RPG::Event::Page::Condition', {
+            'switch1_valid': rng.random() < 0.5, 'switch2_valid': False,
+            'variable_valid': False, 'self_switch_valid': rng.random() < 0.5,
+            'switch1_id': rng.randrange(1, 100), 'switch2_id': 1, 'variable_id': 1,
+            'variable_value': 0, 'self_switch_ch': 'A',
+        })
+
+        graphic = Object('RPG::Event::Page::Graphic', {
+            'tile_id': 0, 'character_name': rng.choice(self.CHARACTER_NAMES),
+            'character_hue': 0, 'direction': rng.choice([2, 4, 6, 8]), 'pattern': 0,
+            'opacity': 255, 'blend_type': 0,
+        })
+
+        return Object('RPG::Event::Page', {
+            'condition': condition, 'graphic': graphic, 'move_type': rng.randrange(3),
+            'move_speed': rng.randrange(1, 7), 'move_frequency': rng.randrange(1, 7),
+            'move_route': move_route([move_command(0)]), 'walk_anime': True,
+            'step_anime': False, 'direction_fix': False, 'through': False,
+            'always_on_top': False, 'trigger': rng.randrange(5),
+            'list': self.command_list(command_count),
+        })
+
+    def map(self, tier: Tier) -> Object:
+        rng = self.rng
+        width, height = tier.width, tier.height
+        tiles = [rng.choice([0, 0, 384, 385, 386, 48, 1537]) for _ in range(width * height * 3)]
+        events = {}
+
+        for event_id in range(1, tier.event_count + 1):
+            events[event_id] = Object('RPG::Event', {
+                'id': event_id, 'name': f'EV{event_id:03}', 'x': rng.randrange(width),
+                'y': rng.randrange(height),
+                'pages': [self.page(tier.command_count) for _ in range(tier.page_count)],
+            })
+
+        return Object('RPG::Map', {
+            'tileset_id': 1, 'width': width, 'height': height, 'autoplay_bgm': True,
+            'bgm': audio_file('Town'), 'autoplay_bgs': False, 'bgs': audio_file('', 80),
+            'encounter_list': [], 'encounter_step': 30,
+            'data': table([width, height, 3], tiles), 'events': events,
+        })
+
+def make_misc(count: int, seed: int) -> list[Any]:
+    """Records full of the values that maps don't have: bignums of various sizes, floats
+    (including the special ones), symbol values, and links to earlier records."""
+
+    rng = random.Random(seed)
+    names = [f'name{i}' for i in range(50)]
+    tags = [Symbol(f'tag_{i}') for i in range(20)]
+    specials = [math.inf, -math.inf, math.nan, 0.0]
+    records = []
+
+    for i in range(count):
+        record = {
+            Symbol('id'): i,
+            Symbol('weight'): rng.choice(specials) if i % 97 == 0 else rng.uniform(-1e6, 1e6),
+            Symbol('seed'): rng.choice([1, -1]) * rng.getrandbits(rng.randrange(31, 200)),
+            Symbol('name'): rng.choice(names),
+            Symbol('tags'): rng.sample(tags, 3),
+            Symbol('parent'): records[rng.randrange(i)] if i else None,
+        }
+
+        records.append(record)
+
+    return records
+
+def generate(tier_name: str) -> dict[str, bytes]:
+    """Returns the contents of the files for the given tier, keyed by file name."""
+
+    tier = TIERS[tier_name]
+
+    return {
+        f'Map{tier.map_id:03}.rxdata': dump(MapGenerator(tier.map_id).map(tier)),
+        f'Misc{tier.map_id:03}.rxdata': dump(make_misc(tier.misc_count, tier.map_id)),
+    }
+
+def run(output_dir, *tier_names):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for tier_name in tier_names or TIERS:
+        for filename, data in generate(tier_name).items():
+            (output_dir / filename).write_bytes(data)
+            print(f'{tier_name}: wrote {filename} ({len(data) // 1024} KiB)')
+
+if __name__ == '__main__':
+    run(*sys.argv[1:])
@@ -0,0 +1,65 @@
+# Compares the speed of the two Marshal loaders (the debugging-friendly `Loader` and the
+# `FastLoader`) on the largest data files in the Reborn installation, and checks that they produce
+# the same graph.
+#
+#   env\Scripts\python -m scripts.marshal_perftests [number of maps]
+#
+# The files are read into memory before timing starts, so disk access isn't included in the times.
+# Note that the ordinary loader records diagnostics when `marshal.DIAGNOSTICS` is on, which adds to
+# its cost.
+
+import statistics
+import sys
+import time
+from parsers import marshal
+from reborndb import settings
+
+REPEATS = 3
+
+def biggest_files(map_count):
+    map_paths = sorted(
+        settings.REBORN_DATA_PATH.glob('Map[0-9][0-9][0-9].rxdata'),
+        key=lambda path: path.stat().st_size, reverse=True
+    )
+
+    return [*map_paths[:map_count], settings.REBORN_DATA_PATH / 'CommonEvents.rxdata']
+
+def timeit(callback):
+    ts = []
+
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        result = callback()
+        t1 = time.perf_counter()
+        ts.append(t1 - t0)
+
+    return result, ts
+
+def run(map_count=5):
+    totals = {'slow': 0.0, 'fast': 0.0}
+
+    for path in biggest_files(map_count):
+        data = path.read_bytes()
+        slow, slow_ts = timeit(lambda: marshal.load(data))
+        fast, fast_ts = timeit(lambda: marshal.load(data, fast=True))
+
+        if (
+            marshal.JsonishFormatter(slow.graph).format()
+            != marshal.JsonishFormatter(fast.graph).format()
+        ):
+            raise AssertionError(f'the loaders produced different graphs for {path.name}')
+
+        totals['slow'] += statistics.mean(slow_ts)
+        totals['fast'] += statistics.mean(fast_ts)
+
+        print('{} ({} KiB): Loader mean {:.3f} s, FastLoader mean {:.3f} s ({:.1f}x)'.format(
+            path.name, len(data) // 1024, statistics.mean(slow_ts), statistics.mean(fast_ts),
+            statistics.mean(slow_ts) / statistics.mean(fast_ts)
+        ))
+
+    print('total: Loader {:.3f} s, FastLoader {:.3f} s ({:.1f}x)'.format(
+        totals['slow'], totals['fast'], totals['slow'] / totals['fast']
+    ))
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:]))
@@ -1,108 +1,492 @@
+import ast
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import cache
+import hashlib
 import importlib
+import itertools as it
 import os
-from reborndb import DB
-
-extractor_names = [
-	'switches_and_variables',
-	'tilesets',
-	'metadata',
-	'types',
-	'abilities',
-	'moves',
-	'items',
-	'cries',
-	'pokemon',
-	'pokemon_sprite',
-	'tm',
-	'encounters',
-	'fossils',
-	'trainertypes',
-	'trainers',
-	'trainerlists',
-	'graphics',
-	'audio',
-]
-
-#extractors = [importlib.import_module(f'.{name}', 'reborndb.extractors') for name in extractor_names]
-
-EXCEPTIONS = [
-	'event_encounter',
-	'encounter_common_event',
-	'encounter_map_event',
-    'event_encounter_ot',
-    'event_encounter_extra_move_set',
-    'event_encounter_form_note',
-    'event_encounter_move',
-	'event_encounter',
-	'event_encounter_iv',
-	'event_encounter_old',
-	'marshal_mapdata',
-	'common_event',
-	'map_event',
-	'event_page_trigger',
-	'event_page',
-	'event_page_switch_condition',
-	'event_page_variable_condition',
-	'event_page_self_switch_condition',
-	'event_page_tile',
-	'event_page_character',
-	'parameter_type',
-	'switch_state',
-	'cancel_type',
-	'appoint_type',
-	'comparison',
-	'bound_type',
-	'diff_type',
-	'text_position',
-	'rpg_weather',
-	'move_command_type',
-	'move_command_parameter',
-	'move_command',
-	'event_page_move_command',
-	'move_command_integer_argument',
-	'move_command_text_argument',
-	'move_command_audio_file_argument',
-	'move_command_direction_argument',
-	'event_command_type',
-	'event_command_subtype',
-	'event_command_parameter',
-	'event_command',
-	'common_event_command',
-	'event_page_command',
-	'event_command_integer_argument',
-	'event_command_text_argument',
-	'event_command_bool_argument',
-	'event_command_audio_file_argument',
-	'event_command_direction_argument',
-	'event_command_choices_array_argument',
-	'event_command_tone_argument',
-	'event_command_color_argument',
-	'event_command_cancel_type_argument',
-	'event_command_text_position_argument',
-	'event_command_switch_state_argument',
-	'event_command_diff_type_argument',
-	'event_command_appoint_type_argument',
-	'event_command_move_command_argument',
-	'event_command_move_route_argument',
-	'event_command_move_route_argument_move_command',
-	'event_command_comparison_argument',
-	'event_command_bound_type_argument',
-	'event_command_weather_argument',
-]
+from pathlib import Path
+import re
+import time
+from reborndb import DB, settings
+
+# The extractors, in the order they'd be run in sequentially, with the tables each one reads and
+# writes, and the files it reads. Tables created by seed.sql aren't listed, and nor are the tables
+# referenced by the foreign keys of the tables an extractor writes, since those are looked up from
+# the schema (see `dependencies`).
+#
+# The files are glob patterns, relative to the Reborn installation for `game_files` and to the
+# working directory (i.e. this repository) for `local_files`. Every extractor also counts as reading
+# schema.sql, seed.sql, its own module and every module of this repository that it imports, directly
+# or not (see `local_input_paths`), so that e.g. a fix to the parsers rebuilds the tables derived
+# from what they parse.
+#
+# An `incremental` extractor updates its existing tables to match its game files itself, so when
+# only those have changed, its tables are kept (see `stale_extractors`). Likewise, an extractor whose
+# `updates_from` tables are updated by an incremental one can update its own tables from them in
+# place, rather than having them rebuilt. And `key_reads` are tables that an extractor only reads
+# the keys of (e.g. which maps there are), so it isn't affected by updates that keep the same rows.
+
+@dataclass
+class Extractor:
+	reads: set[str] = field(default_factory=set)
+	writes: set[str] = field(default_factory=set)
+	game_files: list[str] = field(default_factory=list)
+	local_files: list[str] = field(default_factory=list)
+	incremental: bool = False
+	key_reads: set[str] = field(default_factory=set)
+	updates_from: set[str] = field(default_factory=set)
+
+def tables_created_by(path):
+	with open(path, encoding='utf-8') as f:
+		return set(re.findall(r'^create table (?:if not exists )?"(\w+)"', f.read(), re.MULTILINE))
+
+EXTRACTORS = {
+	'switches_and_variables': Extractor(
+		writes={'game_switch', 'game_variable'}, game_files=['Data/System.rxdata']
+	),
+	'tilesets': Extractor(
+		writes={'tileset', 'tileset_file', 'autotile', 'tileset_autotile', 'panorama'},
+		game_files=[
+			'Data/tilesets.rxdata', 'Graphics/Tilesets/*', 'Graphics/Autotiles/*', 'Graphics/Panoramas/*'
+		]
+	),
+	'map_data': Extractor(
+		reads={'tileset', 'tileset_file', 'autotile', 'tileset_autotile'},
+		writes=tables_created_by('schemas/map_event.sql'),
+		game_files=['Data/Map[0-9][0-9][0-9].rxdata'], local_files=['schemas/map_event.sql'],
+		incremental=True
+	),
+	'common_events': Extractor(
+		reads={'game_switch'}, writes={'common_event', 'common_event_command'},
+		game_files=['Data/CommonEvents.rxdata']
+	),
+	'metadata': Extractor(
+		reads={'marshal_mapdata', 'tileset'},
+		writes={'pbs_metadata', 'marshal_mapinfo', 'map', 'map_bgm', 'map_bgs'},
+		game_files=['Data/MapInfos.rxdata'], local_files=['PBS/metadata.txt'],
+		updates_from={'marshal_mapdata'}
+	),
+	'types': Extractor(
+		writes={'type', 'type_effect'}, game_files=['Graphics/Icons/field*.png'],
+		local_files=['PBS/types.txt']
+	),
+	'abilities': Extractor(writes={'ability'}, local_files=['PBS/abilities.txt']),
+	'moves': Extractor(writes={'move', 'move_flag_set'}, local_files=['PBS/moves.txt']),
+	'items': Extractor(
+		reads={'move'}, writes={'item', 'machine_item'}, game_files=['Scripts/Reborn/Settings.rb'],
+		local_files=['PBS/items.txt']
+	),
+	'cries': Extractor(writes={'cry'}, game_files=['Audio/SE/???Cry*.ogg']),
+	'pokemon': Extractor(
+		reads={'cry', 'item', 'move'}, key_reads={'map'},
+		writes={
+			'pokemon', 'pokemon_form', 'pokemon_egg_group', 'pokemon_type', 'pokemon_ability',
+			'wild_held_item', 'base_stat', 'ev_yield', 'level_move', 'egg_move', 'evolution_method',
+			'evolution_requirement', 'pokemon_evolution_method'
+		},
+		game_files=['Scripts/MultipleForms.rb'], local_files=['PBS/pokemon.txt']
+	),
+	'pokemon_sprite': Extractor(
+		reads={'pokemon', 'pokemon_form'}, writes={'pokemon_sprite', 'pokemon_sprite_raw'},
+		game_files=['Graphics/Battlers/*', 'Graphics/Icons/*']
+	),
+	'tm': Extractor(
+		reads={'pokemon', 'pokemon_form', 'move'},
+		writes={
+			'pbs_tm', 'machine_move', 'tutor_move', 'compatible_move_overrides',
+			'incompatible_move_overrides'
+		},
+		game_files=['Scripts/PokemonItems.rb'], local_files=['PBS/tm.txt']
+	),
+	'encounters': Extractor(
+		reads={'pokemon', 'pokemon_form'}, key_reads={'map'},
+		writes={
+			'map_encounter_rate', 'pbs_pokemon_encounter_rate', 'pokemon_encounter_rate',
+			'pokemon_encounter_form_note'
+		},
+		game_files=['Scripts/MultipleForms.rb'], local_files=['PBS/encounters.txt']
+	),
+	'fossils': Extractor(
+		reads={'item', 'pokemon'}, writes={'fossil'}, game_files=['Data/Map242.rxdata']
+	),
+	'trainertypes': Extractor(
+		writes={'trainer_type'},
+		game_files=['Graphics/Characters/trainer*.png', 'Graphics/Characters/trback*.png'],
+		local_files=['PBS/trainertypes.txt']
+	),
+	'trainers': Extractor(
+		reads={'trainer_type', 'pokemon', 'pokemon_form', 'pokemon_ability', 'level_move', 'item', 'move'},
+		writes={
+			'trainer', 'trainer_item', 'trainer_pokemon', 'trainer_pokemon_ability',
+			'trainer_pokemon_ev', 'trainer_pokemon_iv', 'trainer_pokemon_move', 'marshal_trainer_item',
+			'marshal_trainer_pokemon'
+		},
+		game_files=['Data/trainers.dat'], local_files=['PBS/trainers.txt']
+	),
+	'trainerlists': Extractor(
+		reads={'trainer_type', 'pokemon', 'pokemon_form', 'item', 'move'},
+		writes={
+			'trainer_list', 'trainer_list_challenge', 'battle_facility_trainer',
+			'battle_facility_trainer_pokemon', 'battle_facility_set', 'battle_facility_set_move',
+			'battle_facility_set_ev_stat', 'marshal_battle_facility_trainer',
+			'marshal_battle_facility_pokemon'
+		},
+		game_files=['Data/trainerlists.dat']
+	),
+	'graphics': Extractor(
+		reads={'event_page_character'}, writes={'character_file', 'character_image'},
+		game_files=['Graphics/Characters/*']
+	),
+	'audio': Extractor(
+		writes={'background_music', 'background_sound', 'music_effect', 'sound_effect'},
+		game_files=['Audio/BGM/*', 'Audio/BGS/*', 'Audio/ME/*', 'Audio/SE/*']
+	),
+	'event_encounters': Extractor(
+		reads={'pokemon', 'pokemon_form', 'item', 'move', 'map_event', 'common_event'},
+		key_reads={'map'},
+		writes={
+			'event_encounter', 'event_encounter_raw', 'event_encounter_iv', 'event_encounter_iv_raw',
+			'encounter_common_event', 'encounter_map_event', 'event_encounter_ot',
+			'event_encounter_extra_move_set', 'event_encounter_move', 'event_encounter_form_note'
+		},
+		game_files=[
+			'Data/Map[0-9][0-9][0-9].rxdata', 'Data/CommonEvents.rxdata',
+			'Scripts/PokemonEncounterModifiers.rb'
+		]
+	),
+}
+
+# [the file at {path} had modification time {mtime_ns}, size {size} and content hash {hash} when
+# {extractor} last ran successfully]
+# This table is never dropped, and is what lets `run` skip the extractors whose input hasn't changed.
+MANIFEST_SCHEMA = '''
+create table if not exists "build_manifest" (
+	"extractor" text,
+	"path" text,
+	"mtime_ns" integer not null,
+	"size" integer not null,
+	"hash" blob not null,
+	primary key ("extractor", "path")
+) without rowid
+'''
+
+def module_path(module):
+	"""Return the path of the named module (or package) if it's part of this repository, else None."""
+	path = Path(*module.split('.'))
+
+	for candidate in [path.with_suffix('.py'), path / '__init__.py']:
+		if candidate.is_file(): return candidate
+
+	return None
+
+@cache
+def imported_module_paths(path):
+	"""Return the paths of the modules of this repository that the module at `path` imports,
+	directly or indirectly, including `path` itself. Imports anywhere in a module count, including
+	inside functions, but dynamic ones (via `importlib`) don't."""
+
+	result = {path}
+	package = path.parent.parts
+
+	for node in ast.walk(ast.parse(path.read_text(encoding='utf-8'))):
+		if isinstance(node, ast.Import):
+			modules = [alias.name for alias in node.names]
+		elif isinstance(node, ast.ImportFrom):
+			base = list(package[:len(package) - node.level + 1] if node.level else [])
+			if node.module: base += node.module.split('.')
+			# `from a import b` imports the module a.b if there is one, and a regardless
+			modules = ['.'.join(base)] + ['.'.join([*base, alias.name]) for alias in node.names]
+		else:
+			continue
+
+		for module in modules:
+			parts = module.split('.')
+
+			# importing a module runs its parent packages first
+			for i in range(1, len(parts) + 1):
+				imported = module_path('.'.join(parts[:i]))
+				if imported is not None and imported not in result:
+					result |= imported_module_paths(imported)
+
+	return frozenset(result)
+
+def local_input_paths(name):
+	extractor = EXTRACTORS[name]
+
+	for pattern in ['schema.sql', 'seed.sql', *extractor.local_files]:
+		yield from sorted(path for path in Path().glob(pattern) if path.is_file())
+
+	# (the settings are left out: they only say where things are, and changing e.g. the number of
+	# workers shouldn't rebuild everything)
+	modules = imported_module_paths(Path('reborndb', 'extractors', f'{name}.py'))
+	yield from sorted(modules - {Path('reborndb', 'settings.py')})
+
+def game_input_paths(name):
+	for pattern in EXTRACTORS[name].game_files:
+		yield from sorted(
+			path for path in settings.REBORN_INSTALL_PATH.glob(pattern) if path.is_file()
+		)
+
+def fingerprint(paths, recorded):
+	"""Return a dictionary mapping each of the given paths (as strings) to the file's modification
+	time, size and content hash. `recorded` is a dictionary of the same form from an earlier build;
+	a hash recorded there is reused if the file's modification time and size are unchanged, so only
+	new or modified files actually get read."""
+
+	result = {}
+
+	for path in paths:
+		stat = path.stat()
+		stamp = stat.st_mtime_ns, stat.st_size
+		previous = recorded.get(str(path))
+
+		if previous is not None and previous[:2] == stamp:
+			result[str(path)] = previous
+		else:
+			with path.open('rb') as f:
+				result[str(path)] = (*stamp, hashlib.file_digest(f, 'blake2b').digest())
+
+	return result
+
+def foreign_key_targets():
+	"""Return a dictionary mapping each table in the database to the tables its foreign keys
+	reference."""
+	tables = DB.H.exec1('select "name" from "sqlite_master" where "type" = \'table\' and "name" not like \'sqlite_%\'')
+
+	return {
+		table: {target for _, _, target, *_ in DB.H.exec(f'pragma foreign_key_list("{table}")')}
+		for table in list(tables)
+	}
+
+def touched_tables(fk_targets):
+	"""Return a dictionary mapping each extractor to the tables it reads (including the keys of) or
+	writes, where writing a table counts as reading the tables that it references (according to
+	`fk_targets`, as returned by `foreign_key_targets`)."""
+
+	touches = {}
+
+	for name, extractor in EXTRACTORS.items():
+		referenced = set().union(*(fk_targets.get(table, set()) for table in extractor.writes))
+		touches[name] = extractor.reads | extractor.key_reads | extractor.writes | referenced
+
+	return touches
+
+def dependencies(names):
+	"""Return a dictionary mapping each of the named extractors to the set of those that have to
+	finish before it starts.
+
+	An extractor has to wait for an earlier one (in the order of `names`) if one of them writes a
+	table that the other touches (see `touched_tables`). So any two extractors that could interfere
+	with each other run in the same order as they would sequentially."""
+
+	touches = touched_tables(foreign_key_targets())
+
+	return {
+		name: {
+			earlier for earlier in names[:i]
+			if EXTRACTORS[earlier].writes & touches[name] or EXTRACTORS[name].writes & touches[earlier]
+		}
+		for i, name in enumerate(names)
+	}
+
+def stale_extractors(rebuilt, updated, rekeyed=(), fk_targets=None):
+	"""Given the extractors that have to be rebuilt (i.e. have their tables dropped and be run again)
+	and the incremental extractors that have to update their tables, because their input files have
+	changed, return those two sets extended with the extractors that are affected in turn.
+	`rekeyed` are those of the updated extractors whose updates may add or remove rows, rather than
+	just change them. `fk_targets` is as returned by `foreign_key_targets`, which is called if it
+	isn't given.
+
+	An extractor that touches a table that will be dropped (one written by an extractor that's
+	rebuilt, and by no other) has to be rebuilt, and so does one that reads a table that will be
+	updated, unless that's one of its `updates_from` tables, in which case it updates its tables
+	too. Tables only read for their keys only count if they're dropped or rows may be added to or
+	removed from them. But an incremental extractor only has to update its tables if the tables it's
+	affected by are ones it doesn't read (i.e. it merely references them).
+
+	So when only some map files have changed, the tables derived from the map data are updated,
+	and those that just need to know which maps there are are left alone:
+
+	>>> fk_targets = {'encounter_map_event': {'map_event'}, 'map_event': {'map'}}
+	>>> rebuilt, updated = stale_extractors(set(), {'map_data'}, fk_targets=fk_targets)
+	>>> sorted(rebuilt), sorted(updated)
+	(['event_encounters', 'graphics'], ['map_data', 'metadata'])
+
+	Unless maps have been added or removed:
+
+	>>> rebuilt, updated = stale_extractors(set(), {'map_data'}, {'map_data'}, fk_targets)
+	>>> sorted(rebuilt & {'pokemon', 'pokemon_sprite', 'trainers'}), sorted(updated)
+	(['pokemon', 'pokemon_sprite', 'trainers'], ['map_data', 'metadata'])
+	"""
+
+	if fk_targets is None: fk_targets = foreign_key_targets()
+	touches = touched_tables(fk_targets)
+	rebuilt, updated = set(rebuilt), set(updated) - set(rebuilt)
+	rekeyed = set(rekeyed) & updated
+
+	while True:
+		kept = set().union(*(e.writes for name, e in EXTRACTORS.items() if name not in rebuilt))
+		dropped = set().union(*(EXTRACTORS[name].writes for name in rebuilt)) - kept
+		modified = set().union(*(EXTRACTORS[name].writes for name in updated))
+		modified_keys = set().union(*(EXTRACTORS[name].writes for name in rekeyed))
+		more_rebuilt = set()
+		more_updated = set()
+		more_rekeyed = set()
+
+		for name, extractor in EXTRACTORS.items():
+			if name in rebuilt:
+				continue
+			elif (
+				(extractor.reads | extractor.key_reads) & dropped
+				or extractor.reads & (modified - extractor.updates_from)
+				or extractor.key_reads & modified_keys
+				or touches[name] & dropped and not extractor.incremental
+			):
+				more_rebuilt.add(name)
+			elif extractor.reads & modified:
+				if name not in updated: more_updated.add(name)
+				if extractor.reads & modified_keys and name not in rekeyed: more_rekeyed.add(name)
+			elif touches[name] & dropped and name not in updated:
+				more_updated.add(name)
+
+		if not more_rebuilt and not more_updated and not more_rekeyed: return rebuilt, updated
+		rebuilt |= more_rebuilt
+		updated = (updated | more_updated) - rebuilt
+		rekeyed = (rekeyed | more_rekeyed) & updated
+
+def run_extractors(names, on_finished=None):
+	"""Run the named extractors, running each one as soon as those it depends on have finished, with
+	up to `settings.EXTRACTOR_WORKERS` running at once in threads (the database connection
+	serializes their queries and transactions). If one of them fails, the others that are running
+	are allowed to finish, but no more are started.
+
+	The threads only actually run at the same time where the GIL is released, e.g. in SQLite, file
+	hashing, image decoding and numpy, so the extractors that parse every map do it in worker
+	processes (see `Map.load_all_parallel`). Any such processes must be spawned rather than forked,
+	since forking while other threads hold locks can leave the child deadlocked.
+
+	`on_finished`, if given, is called (from this thread) with the name of each extractor that
+	finishes successfully."""
+
+	deps = dependencies(names)
+	modules = {name: importlib.import_module(f'.{name}', 'reborndb.extractors') for name in names}
+	workers = settings.EXTRACTOR_WORKERS or os.cpu_count() or 1
+	pending = list(names)
+	running = {}
+	finished = set()
+
+	def extract(name):
+		print(f'Extracting {name}...')
+		t0 = time.perf_counter()
+		modules[name].extract()
+		print(f'Extracted {name} in {time.perf_counter() - t0:.1f} s.')
+
+	with ThreadPoolExecutor(workers) as executor:
+		while pending or running:
+			for name in [name for name in pending if deps[name] <= finished]:
+				pending.remove(name)
+				running[executor.submit(extract, name)] = name
+
+			done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+			for future in done:
+				name = running.pop(future)
+
+				if future.exception() is not None:
+					wait(running)
+					raise future.exception()
+
+				finished.add(name)
+				if on_finished is not None: on_finished(name)
 
 def run():
-	DB.H.dropall(exceptions=EXCEPTIONS)
-
-	if os.environ.get('FULL'):
-		extractor_names.append('event_encounters')
-		extractor_names.append('map_data')
-	elif os.environ.get('EVENT_ENCOUNTERS'):
-		extractor_names.append('event_encounters')
-	elif os.environ.get('MAP_DATA'):
-		i = extractor_names.index('metadata')
-		extractor_names.insert(i, 'map_data')
-		extractor_names.insert(i + 1, 'common_events')
-	
+	"""Rebuild the tables of the extractors whose input files have changed since they were last run
+	(or that depend on the tables of one that has to be run again), and have the incremental
+	extractors whose game files have changed update their tables, keeping the rest. All the other
+	tables (those created by schema.sql and seed.sql that aren't written by an extractor, and those
+	created by post_seed.sql) are rebuilt every time.
+
+	Extractors can be run regardless by setting an environment variable named after them in
+	uppercase (e.g. `MAP_DATA`; `__main__.py` sets these from `--` options), or all of them by
+	setting `FULL`."""
+
+	with DB.H.transaction(): DB.H.exec(MANIFEST_SCHEMA)
+
+	print('Checking input files... ', end='')
+	manifest = {}
+
+	for extractor, path, *record in DB.H.exec('select "extractor", "path", "mtime_ns", "size", "hash" from "build_manifest"'):
+		manifest.setdefault(extractor, {})[path] = tuple(record)
+
+	recorded = {path: record for records in manifest.values() for path, record in records.items()}
+	rebuilt = set()
+	updated = set()
+	rekeyed = set()
+
+	fingerprints = {
+		name: fingerprint(it.chain(local_input_paths(name), game_input_paths(name)), recorded)
+		for name in EXTRACTORS
+	}
+
+	for name, extractor in EXTRACTORS.items():
+		new = {path: content_hash for path, (_, _, content_hash) in fingerprints[name].items()}
+		old = {path: content_hash for path, (_, _, content_hash) in manifest.get(name, {}).items()}
+		local_paths = map(str, local_input_paths(name))
+		local_changed = not old or any(old.get(path) != new[path] for path in local_paths)
+
+		if os.environ.get('FULL') or os.environ.get(name.upper()) or local_changed:
+			rebuilt.add(name)
+		elif new != old:
+			(updated if extractor.incremental else rebuilt).add(name)
+
+			# (an incremental extractor's rows are taken to come from its game files, so it can only
+			# add or remove them if files have been added or removed)
+			if new.keys() != old.keys(): rekeyed.add(name)
+
+	rebuilt, updated = stale_extractors(rebuilt, updated, rekeyed)
+	names = [name for name in EXTRACTORS if name in rebuilt | updated]
+	print('done.')
+
+	for name in EXTRACTORS:
+		if name in updated: print(f'{name} will be updated.')
+		elif name not in rebuilt: print(f'{name} is up to date.')
+
+	kept = set().union(*(extractor.writes for name, extractor in EXTRACTORS.items() if name not in rebuilt))
+	DB.H.dropall(exceptions=('build_manifest', *kept))
+
+	def record(name, local_only=False):
+		# replace the extractor's manifest entries with the fingerprints of its input files (or
+		# just its local ones)
+		local_paths = set(map(str, local_input_paths(name)))
+
+		with DB.H.transaction():
+			DB.H.exec('delete from "build_manifest" where "extractor" = ?', (name,))
+			DB.H.bulk_insert(
+				'build_manifest', ('extractor', 'path', 'mtime_ns', 'size', 'hash'),
+				[
+					(name, path, *record) for path, record in fingerprints[name].items()
+					if not local_only or path in local_paths
+				]
+			)
+
+	# The manifest entries of the extractors that are about to run are replaced once they finish.
+	# Until then, those of the non-incremental ones mustn't be left as they were, since their tables
+	# have been dropped (or are being updated from other tables, which won't have changed next
+	# time). But an incremental one that's interrupted can pick up where it left off next time, so
+	# its entries are kept if it's only updating its tables, and if it's rebuilding them, only its
+	# local files are recorded (as its game files are missing, it'll be updated next time).
+	with DB.H.transaction():
+		for name in manifest.keys() - EXTRACTORS.keys():
+			DB.H.exec('delete from "build_manifest" where "extractor" = ?', (name,))
+
+		for name in names:
+			if not EXTRACTORS[name].incremental:
+				DB.H.exec('delete from "build_manifest" where "extractor" = ?', (name,))
+			elif name in rebuilt:
+				record(name, local_only=True)
+
 	print('Creating schema... ', end='')
 	with DB.H.transaction(): DB.H.execscript('schema.sql')
 
@@ -111,11 +495,9 @@ def run():
 
 	print('done.')
 
-	extractors = [importlib.import_module(f'.{name}', 'reborndb.extractors') for name in extractor_names]
-
-	for name, extractor in zip(extractor_names, extractors):
-		print(f'Extracting {name}...')
-		extractor.extract()
+	t0 = time.perf_counter()
+	run_extractors(names, on_finished=record)
+	print(f'Extracted everything in {time.perf_counter() - t0:.1f} s.')
 		
 	print('post-seeding...', end='')
 	with DB.H.transaction(): DB.H.execscript('post_seed.sql')
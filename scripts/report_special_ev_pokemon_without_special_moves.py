@@ -5,7 +5,7 @@ from reborndb import DB, pbs, settings
 with open(settings.REBORN_DB_PATH / 'queries' / 'special_ev_pokemon_without_special_moves.sql') as f:
     query = f.read()
 
-results = DB.H.exec(query).fetchall()
+results = DB.H.exec(query)
 csv = []
 
 with open(f'PBS/trainers.txt', newline='', encoding='utf-8') as f:
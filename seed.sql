@@ -1261,7 +1261,9 @@ values
 (2),
 (3);
 
-insert into `item` (`id`, `name`, `code`, `pocket`, `buy_price`, `desc`, `out_battle_usability`, `in_battle_usability`, `type`)
+-- (`or ignore` because the item table is kept when the items haven't changed; see
+-- `scripts.refresh_database`)
+insert or ignore into `item` (`id`, `name`, `code`, `pocket`, `buy_price`, `desc`, `out_battle_usability`, `in_battle_usability`, `type`)
 values
 ('DUMMY', 'DUMMY', 0, 'Items', 0, 'DUMMY', 'None', 'None', 'Other');
 